@@ -0,0 +1,215 @@
+# common/auth.py
+#
+# Sesiones persistentes. Al iniciar sesión con contraseña se emite un token
+# firmado con HMAC (usuario, rol, caducidad e identificador) que se guarda en
+# una cookie; al recargar la página o reconectar el websocket la sesión se
+# recupera comprobando la firma, sin bcrypt ni consultar la contraseña.
+# Al cerrar sesión el token se revoca (tabla revoked_tokens).
+import hmac
+import json
+import time
+import uuid
+import base64
+import hashlib
+import logging
+import secrets
+from datetime import datetime, timezone
+
+import streamlit as st
+
+from config import AUTH_SECRET, AUTH_COOKIE_NAME, AUTH_TOKEN_TTL_HOURS, AUTH_ROLE_CACHE_TTL, CACHE_BACKEND
+from common.cache import shared_cached
+from common.services.unit_of_work import unit_of_work
+from models import User, RevokedToken
+
+logger = logging.getLogger(__name__)
+
+if AUTH_SECRET:
+    _SECRET = AUTH_SECRET.encode("utf-8")
+else:
+    # Sin clave fija los tokens solo valen en este proceso
+    _SECRET = secrets.token_bytes(32)
+    logger.warning("AUTH_SECRET no definido: las sesiones no sobreviven a un reinicio ni se comparten entre réplicas")
+
+# --------------------------------
+# Tokens
+# --------------------------------
+
+def _b64encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+def _b64decode(text):
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+def _sign(payload):
+    return _b64encode(hmac.new(_SECRET, payload.encode("ascii"), hashlib.sha256).digest())
+
+def _utcnow():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+def issue_token(user_id, user_type, ttl_hours=AUTH_TOKEN_TTL_HOURS):
+    """
+    Token "payload.firma" para el usuario, válido `ttl_hours` horas.
+    """
+    now = int(time.time())
+    claims = {"uid": user_id, "role": user_type, "iat": now, "exp": now + ttl_hours * 3600, "jti": uuid.uuid4().hex}
+    payload = _b64encode(json.dumps(claims, separators=(",", ":")).encode("utf-8"))
+    return f"{payload}.{_sign(payload)}"
+
+def decode_token(token):
+    """
+    Datos del token si la firma es válida y no ha caducado; None si no.
+    No consulta la BD (no comprueba revocaciones).
+    """
+    try:
+        payload, signature = token.split(".")
+        if not hmac.compare_digest(signature, _sign(payload)):
+            return None
+        claims = json.loads(_b64decode(payload))
+    except (AttributeError, ValueError, UnicodeError):
+        return None
+    if claims.get("exp", 0) < time.time():
+        return None
+    return claims
+
+# --------------------------------
+# Revocación y roles
+# --------------------------------
+
+# Con AUTH_SECRET los tokens valen en todas las réplicas, pero la caché en
+# memoria es de cada proceso: un logout en otra réplica no la invalidaría
+# hasta pasados 60 s. En ese caso la revocación se consulta siempre en la BD.
+_CACHE_REVOCATIONS = not (AUTH_SECRET and CACHE_BACKEND == "memory")
+
+@shared_cached(ttl=60, name="auth:revoked", tables=("revoked_tokens",))
+def _revoked_ids():
+    with unit_of_work() as db:
+        rows = db.query(RevokedToken.jti).filter(RevokedToken.expires_at > _utcnow()).all()
+    return frozenset(jti for jti, in rows)
+
+def _is_revoked(jti):
+    if _CACHE_REVOCATIONS:
+        return jti in _revoked_ids()
+    with unit_of_work() as db:
+        return db.query(RevokedToken.jti).filter(RevokedToken.jti == jti).first() is not None
+
+@shared_cached(ttl=AUTH_ROLE_CACHE_TTL, name="auth:role", tables=("users",))
+def user_role(user_id):
+    """
+    Rol actual del usuario ("admin", "coach" o "player"), o None si ya no existe.
+    """
+    with unit_of_work() as db:
+        user_type = db.query(User.user_type).filter(User.user_id == user_id).scalar()
+    return user_type.value if user_type else None
+
+def verify_token(token):
+    """
+    (user_id, user_type) si el token es válido, no está revocado y el usuario
+    sigue existiendo; None si no. El rol es el actual del usuario, no el que
+    tenía al emitirse el token.
+    """
+    claims = decode_token(token)
+    if claims is None or _is_revoked(claims["jti"]):
+        return None
+    role = user_role(claims["uid"])
+    if role is None:
+        return None
+    return claims["uid"], role
+
+def revoke_token(token):
+    """
+    Invalida el token hasta su caducidad y purga las revocaciones ya caducadas.
+    """
+    claims = decode_token(token)
+    if claims is None:
+        return   # Inválido o caducado: ya no abre sesión
+    now = _utcnow()
+    with unit_of_work() as db:
+        db.query(RevokedToken).filter(RevokedToken.expires_at <= now).delete()
+        db.merge(RevokedToken(jti=claims["jti"], user_id=claims["uid"], revoked_at=now,
+                              expires_at=datetime.fromtimestamp(claims["exp"], timezone.utc).replace(tzinfo=None)))
+
+# --------------------------------
+# Sesión de Streamlit y cookie
+# --------------------------------
+
+def start_session(user_id, user_type):
+    """
+    Tras un login con contraseña: guarda el usuario en la sesión y emite el
+    token que se escribirá en la cookie.
+    """
+    st.session_state['user_id'] = user_id
+    st.session_state['user_type'] = user_type
+    st.session_state['auth_token'] = issue_token(user_id, user_type)
+    st.session_state['auth_cookie'] = "set"
+
+def restore_session():
+    """
+    Recupera la sesión desde la cookie si aún no hay usuario (recarga de la
+    página o reconexión). Devuelve True si hay usuario.
+    """
+    if "user_id" in st.session_state:
+        return True
+    token = _request_cookies().get(AUTH_COOKIE_NAME)
+    if not token or token == st.session_state.get("auth_rejected"):
+        return False
+
+    user = verify_token(token)
+    if user is None:
+        # Caducado, revocado o firmado con otra clave: se borra del navegador
+        st.session_state["auth_rejected"] = token
+        st.session_state["auth_cookie"] = "delete"
+        return False
+    st.session_state['user_id'], st.session_state['user_type'] = user
+    st.session_state['auth_token'] = token
+    logger.info("Sesión del usuario %s recuperada desde la cookie", user[0])
+    return True
+
+def end_session():
+    """
+    Cierre de sesión: revoca el token y programa el borrado de la cookie.
+    """
+    token = st.session_state.pop("auth_token", None)
+    if token:
+        revoke_token(token)
+        st.session_state["auth_rejected"] = token
+        st.session_state["auth_cookie"] = "delete"
+
+def sync_cookie():
+    """
+    Escribe o borra la cookie si hay un cambio pendiente. Debe llamarse en
+    una ejecución que no acabe en st.rerun(), para que el componente llegue
+    al navegador.
+    """
+    action = st.session_state.pop("auth_cookie", None)
+    if action is None:
+        return
+    manager = _cookie_manager()
+    if manager is None:
+        return
+    if action == "set":
+        token = st.session_state.get("auth_token")
+        claims = decode_token(token)
+        if claims:
+            # Duración relativa: no depende del reloj ni de la zona horaria del navegador.
+            # Max-Age tiene prioridad sobre el Expires que añade el componente
+            manager.set(AUTH_COOKIE_NAME, token, key="auth_cookie_set",
+                        max_age=max(0, claims["exp"] - int(time.time())))
+    else:
+        manager.cookies.setdefault(AUTH_COOKIE_NAME, None)   # delete() falla si el navegador aún no la ha enviado
+        manager.delete(AUTH_COOKIE_NAME, key="auth_cookie_delete")
+
+def _request_cookies():
+    # Cookies de la petición que abrió el websocket
+    try:
+        return st.context.cookies
+    except Exception:
+        return {}
+
+def _cookie_manager():
+    try:
+        import extra_streamlit_components as stx
+    except ImportError:
+        logger.warning("extra-streamlit-components no está instalado: la sesión no se guarda en una cookie")
+        return None
+    return stx.CookieManager(key="auth_cookies")
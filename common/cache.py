@@ -0,0 +1,414 @@
+# common/cache.py
+#
+# Caché compartida entre procesos de Streamlit. Backends (CACHE_BACKEND en config.py):
+#   - "memory": diccionario en proceso (una sola réplica).
+#   - "sqlite": fichero SQLite compartido por las réplicas de una misma máquina.
+#   - "redis":  servidor compatible con Redis (o tools/fake_redis.py en local).
+import time
+import uuid
+import asyncio
+import inspect
+import socket
+import pickle
+import sqlite3
+import hashlib
+import logging
+import threading
+import functools
+from urllib.parse import urlparse
+
+from config import CACHE_BACKEND, CACHE_SQLITE_PATH, CACHE_REDIS_URL
+from controllers.query_cache import on_tables_bumped
+
+logger = logging.getLogger(__name__)
+
+# --------------------------------
+# Backends
+# --------------------------------
+
+class MemoryBackend:
+    """
+    Backend en memoria del proceso.
+    """
+
+    def __init__(self):
+        self._data = {}   # key -> (expires_at, value)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.time():
+                del self._data[key]
+                return None
+            return entry[1]
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._data[key] = (time.time() + ttl, value)
+
+    def add(self, key, value, ttl):
+        """
+        Guarda solo si la clave no existe. Devuelve True si la ha guardado.
+        """
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[0] >= time.time():
+                return False
+            self._data[key] = (time.time() + ttl, value)
+            return True
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def delete_if(self, key, value):
+        """
+        Borra la clave solo si aún guarda `value` (p. ej. el token de un bloqueo).
+        """
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[1] == value:
+                del self._data[key]
+
+    def incr(self, key, ttl):
+        """
+        Incrementa de forma atómica un contador (texto decimal) y devuelve su valor.
+        """
+        with self._lock:
+            entry = self._data.get(key)
+            value = int(entry[1]) + 1 if entry is not None and entry[0] >= time.time() else 1
+            self._data[key] = (time.time() + ttl, str(value).encode())
+            return value
+
+
+class SQLiteBackend:
+    """
+    Backend sobre un fichero SQLite (modo WAL) compartido entre procesos.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS cache ("
+                         "key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL NOT NULL)")
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        row = self._connection().execute(
+            "SELECT value FROM cache WHERE key = ? AND expires_at >= ?", (key, time.time())).fetchone()
+        return row[0] if row else None
+
+    def set(self, key, value, ttl):
+        self._connection().execute(
+            "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, value, time.time() + ttl))
+
+    def add(self, key, value, ttl):
+        conn = self._connection()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM cache WHERE key = ? AND expires_at < ?", (key, now))
+            added = conn.execute("INSERT OR IGNORE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+                                 (key, value, now + ttl)).rowcount == 1
+            conn.execute("COMMIT")
+            return added
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def delete(self, key):
+        self._connection().execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def delete_if(self, key, value):
+        self._connection().execute("DELETE FROM cache WHERE key = ? AND value = ?", (key, value))
+
+    def incr(self, key, ttl):
+        # Un único UPSERT: dos réplicas que incrementan a la vez no pierden ninguna subida
+        now = time.time()
+        row = self._connection().execute(
+            "INSERT INTO cache (key, value, expires_at) VALUES (?, CAST(1 AS BLOB), ?) "
+            "ON CONFLICT(key) DO UPDATE SET "
+            "value = CAST(CASE WHEN expires_at >= ? THEN CAST(CAST(value AS TEXT) AS INTEGER) + 1 ELSE 1 END AS BLOB), "
+            "expires_at = excluded.expires_at "
+            "RETURNING CAST(CAST(value AS TEXT) AS INTEGER)", (key, now + ttl, now)).fetchone()
+        return row[0]
+
+
+# Borrado condicional atómico en Redis (GET + DEL en el servidor)
+DELETE_IF_SCRIPT = ('if redis.call("GET", KEYS[1]) == ARGV[1] then '
+                    'return redis.call("DEL", KEYS[1]) else return 0 end')
+
+
+class RedisBackend:
+    """
+    Backend para un servidor compatible con Redis, con un cliente RESP mínimo
+    (GET, SET, DEL, INCR, PEXPIRE y EVAL) para no añadir dependencias.
+    """
+
+    def __init__(self, url):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.password = parsed.password
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self._local = threading.local()
+
+    def _connect(self):
+        sock = socket.create_connection((self.host, self.port), timeout=5)
+        self._local.sock = sock
+        self._local.reader = sock.makefile("rb")
+        if self.password:
+            self._command("AUTH", self.password)
+        if self.db:
+            self._command("SELECT", str(self.db))
+
+    def _command(self, *args):
+        if getattr(self._local, "sock", None) is None:
+            self._connect()
+        parts = [b"*%d\r\n" % len(args)]
+        for arg in args:
+            data = arg if isinstance(arg, bytes) else str(arg).encode()
+            parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+        try:
+            self._local.sock.sendall(b"".join(parts))
+            return self._read_reply()
+        except OSError:
+            self._local.sock = None
+            raise
+
+    def _read_reply(self):
+        line = self._local.reader.readline()
+        if not line:
+            raise ConnectionError("Conexión cerrada por el servidor de caché")
+        kind, payload = line[:1], line[1:-2]
+        if kind == b"+":
+            return payload
+        if kind == b"-":
+            raise RuntimeError(payload.decode())
+        if kind == b":":
+            return int(payload)
+        if kind == b"$":
+            length = int(payload)
+            if length == -1:
+                return None
+            data = self._local.reader.read(length + 2)
+            return data[:-2]
+        raise RuntimeError(f"Respuesta RESP no soportada: {line!r}")
+
+    def get(self, key):
+        return self._command("GET", key)
+
+    def set(self, key, value, ttl):
+        self._command("SET", key, value, "PX", int(ttl * 1000))
+
+    def add(self, key, value, ttl):
+        return self._command("SET", key, value, "PX", int(ttl * 1000), "NX") is not None
+
+    def delete(self, key):
+        self._command("DEL", key)
+
+    def delete_if(self, key, value):
+        self._command("EVAL", DELETE_IF_SCRIPT, 1, key, value)
+
+    def incr(self, key, ttl):
+        value = self._command("INCR", key)
+        self._command("PEXPIRE", key, int(ttl * 1000))
+        return value
+
+
+def _create_backend():
+    if CACHE_BACKEND == "sqlite":
+        return SQLiteBackend(CACHE_SQLITE_PATH)
+    if CACHE_BACKEND == "redis":
+        return RedisBackend(CACHE_REDIS_URL)
+    return MemoryBackend()
+
+# --------------------------------
+# Fachada
+# --------------------------------
+
+class SharedCache:
+    """
+    Caché con TTL sobre un backend. Si el backend falla, se calcula el valor
+    directamente en lugar de romper la página.
+    """
+
+    def __init__(self, backend, namespace="ballers"):
+        self.backend = backend
+        self.namespace = namespace
+
+    def _key(self, key):
+        return f"{self.namespace}:{key}"
+
+    def get(self, key):
+        """
+        Devuelve (True, valor) si la clave está en caché o (False, None) si no.
+        """
+        try:
+            data = self.backend.get(self._key(key))
+        except Exception as e:
+            logger.warning("Caché compartida no disponible (get %s): %s", key, e)
+            return False, None
+        if data is None:
+            return False, None
+        return True, pickle.loads(data)
+
+    def set(self, key, value, ttl):
+        try:
+            self.backend.set(self._key(key), pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), ttl)
+        except Exception as e:
+            logger.warning("Caché compartida no disponible (set %s): %s", key, e)
+
+    def delete(self, key):
+        try:
+            self.backend.delete(self._key(key))
+        except Exception as e:
+            logger.warning("Caché compartida no disponible (delete %s): %s", key, e)
+
+    def counter(self, key):
+        """
+        Valor de un contador de incr() (0 si no existe o el backend falla).
+        """
+        try:
+            value = self.backend.get(self._key(key))
+        except Exception as e:
+            logger.warning("Caché compartida no disponible (get %s): %s", key, e)
+            return 0
+        try:
+            return int(value) if value is not None else 0
+        except ValueError:
+            return 0   # Valor de otra versión (antes se guardaba con pickle)
+
+    def incr(self, key, ttl):
+        """
+        Incrementa de forma atómica un contador compartido por todas las réplicas.
+        """
+        try:
+            return self.backend.incr(self._key(key), ttl)
+        except Exception as e:
+            logger.warning("Caché compartida no disponible (incr %s): %s", key, e)
+            return None
+
+    def get_or_compute(self, key, compute, ttl, lock_ttl=60, poll_interval=0.1):
+        """
+        Devuelve el valor cacheado o lo calcula una sola vez entre todas las
+        réplicas (single-flight). Si quien tiene el bloqueo no termina en
+        `lock_ttl` segundos, se calcula localmente.
+        """
+        found, value = self.get(key)
+        if found:
+            return value
+
+        lock_key = self._key(f"lock:{key}")
+        token = uuid.uuid4().hex.encode()
+        deadline = time.time() + lock_ttl
+        while True:
+            try:
+                acquired = self.backend.add(lock_key, token, lock_ttl)
+            except Exception as e:
+                logger.warning("Caché compartida no disponible (lock %s): %s", key, e)
+                return compute()
+
+            if acquired:
+                try:
+                    value = compute()
+                    self.set(key, value, ttl)
+                    return value
+                finally:
+                    self._release(lock_key, token)
+
+            # Otra réplica está calculando: esperar su resultado
+            time.sleep(poll_interval)
+            found, value = self.get(key)
+            if found:
+                return value
+            if time.time() > deadline:
+                logger.warning("Tiempo de espera agotado para %s; se calcula localmente", key)
+                return compute()
+
+    def _release(self, lock_key, token):
+        # Comparar y borrar en una sola operación: si el bloqueo caducó y otra
+        # réplica lo tiene ahora, no se le quita
+        try:
+            self.backend.delete_if(lock_key, token)
+        except Exception as e:
+            logger.warning("No se pudo liberar el bloqueo %s: %s", lock_key, e)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_cache():
+    """
+    Devuelve la caché compartida del proceso, según CACHE_BACKEND.
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = SharedCache(_create_backend())
+        return _cache
+
+def shared_cached(ttl, name=None, tables=()):
+    """
+    Decorador que cachea el resultado de una función en la caché compartida.
+
+    La clave incluye los argumentos y una generación guardada en la propia
+    caché: `func.clear()` la incrementa e invalida el resultado en todas las
+    réplicas. Si se indican `tables`, los commits que modifiquen alguna de
+    ellas también invalidan el resultado.
+
+    También admite corrutinas: el resultado se guarda con la misma clave, así
+    que una versión síncrona y otra asíncrona con el mismo `name` comparten
+    caché. Pasan por el mismo get_or_compute (single-flight entre réplicas)
+    en un hilo aparte, para no bloquear el bucle de eventos mientras se
+    espera el bloqueo; la corrutina se ejecuta en el bucle que la llamó.
+    """
+    def decorator(func):
+        base = name or f"{func.__module__}.{func.__qualname__}"
+        generation_key = f"gen:{base}"
+
+        def _generation():
+            return get_cache().counter(generation_key)
+
+        def _key(args, kwargs):
+            arg_hash = hashlib.sha1(pickle.dumps((args, sorted(kwargs.items())))).hexdigest()
+            return f"{base}:{_generation()}:{arg_hash}"
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                loop = asyncio.get_running_loop()
+
+                def compute():
+                    return asyncio.run_coroutine_threadsafe(func(*args, **kwargs), loop).result()
+
+                return await asyncio.to_thread(
+                    lambda: get_cache().get_or_compute(_key(args, kwargs), compute, ttl))
+        else:
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                return get_cache().get_or_compute(_key(args, kwargs), lambda: func(*args, **kwargs), ttl)
+
+        def clear():
+            # Incremento atómico: invalidaciones simultáneas desde varias réplicas
+            # no se pierden. La generación no caduca antes que los valores que invalida
+            get_cache().incr(generation_key, max(ttl, 86400))
+
+        wrapper.clear = clear
+        if tables:
+            on_tables_bumped(tables, clear)
+        return wrapper
+
+    return decorator
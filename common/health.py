@@ -0,0 +1,254 @@
+# common/health.py
+#
+# Salud de las dependencias (BD, Google Sheets y Google Calendar): sondas
+# periódicas en segundo plano, ventana móvil de latencias y errores por
+# dependencia y un endpoint HTTP para el balanceador:
+#   GET /healthz  -> 200 salvo que la BD no responda (503)
+#   GET /readyz   -> 503 hasta que termina el calentamiento y la BD responde;
+#                    después, 503 solo si falla la última sonda de la BD o
+#                    la tasa de errores de la ventana supera
+#                    HEALTH_READY_MAX_ERROR_RATE (un fallo aislado no basta)
+#
+# Las sondas y el endpoint arrancan con start_health_monitor(). Con
+# "streamlit run main.py" eso no ocurre hasta que se conecta el primer
+# navegador, y mientras tanto el balanceador no tiene a quién preguntar:
+# en despliegues con balanceador hay que arrancar con tools/serve.py.
+import os
+import json
+import math
+import time
+import asyncio
+import logging
+import threading
+from bisect import bisect_left
+from collections import deque
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from sqlalchemy import text
+
+from config import (GOOGLE_SHEET_ID, SERVICE_ACCOUNT, HEALTH_PROBE_INTERVAL, HEALTH_PROBE_TIMEOUT,
+                    HEALTH_WINDOW_SECONDS, HEALTH_PORT, HEALTH_READY_MAX_ERROR_RATE)
+
+logger = logging.getLogger(__name__)
+
+# Límites superiores (ms) de los cubos del histograma
+HISTOGRAM_BOUNDS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+# Dependencias sin las que la aplicación no funciona (las demás tienen datos de respaldo)
+CRITICAL = ("db",)
+
+# --------------------------------
+# Ventana de latencias
+# --------------------------------
+
+def _percentile(sorted_values, fraction):
+    # Método del rango más cercano: siempre una muestra real
+    if not sorted_values:
+        return None
+    return sorted_values[max(0, math.ceil(fraction * len(sorted_values)) - 1)]
+
+class LatencyWindow:
+    """
+    Muestras (momento, ms, ok) de los últimos `window_seconds` segundos de
+    una dependencia, con percentiles, tasa de error e histograma.
+    """
+
+    def __init__(self, window_seconds=HEALTH_WINDOW_SECONDS, max_samples=5000):
+        self.window_seconds = window_seconds
+        self._samples = deque(maxlen=max_samples)
+        self._lock = threading.Lock()
+        self.last_ok_at = None
+        self.last_error = None
+        self.last_error_at = None
+        self.last_ok = None
+
+    def record(self, ms, ok, error=None):
+        now = time.time()
+        with self._lock:
+            self._samples.append((now, ms, ok))
+            self.last_ok = ok
+            if ok:
+                self.last_ok_at = now
+            else:
+                self.last_error, self.last_error_at = error, now
+
+    def _recent(self):
+        cutoff = time.time() - self.window_seconds
+        with self._lock:
+            while self._samples and self._samples[0][0] < cutoff:
+                self._samples.popleft()
+            return list(self._samples)
+
+    def snapshot(self):
+        samples = self._recent()
+        latencies = sorted(ms for _, ms, _ in samples)
+        errors = sum(1 for _, _, ok in samples if not ok)
+        histogram = [0] * (len(HISTOGRAM_BOUNDS_MS) + 1)
+        for ms in latencies:
+            histogram[bisect_left(HISTOGRAM_BOUNDS_MS, ms)] += 1
+        return {
+            "samples": len(samples),
+            "errors": errors,
+            "error_rate": errors / len(samples) if samples else None,
+            "p50_ms": _percentile(latencies, 0.50),
+            "p95_ms": _percentile(latencies, 0.95),
+            "p99_ms": _percentile(latencies, 0.99),
+            "histogram": dict(zip([f"<={b}ms" for b in HISTOGRAM_BOUNDS_MS] + ["inf"], histogram)),
+            "last_ok": self.last_ok,
+            "last_ok_at": _iso(self.last_ok_at),
+            "last_error": self.last_error,
+            "last_error_at": _iso(self.last_error_at),
+        }
+
+def _iso(timestamp):
+    return datetime.fromtimestamp(timestamp).isoformat(timespec="seconds") if timestamp else None
+
+# --------------------------------
+# Sondas
+# --------------------------------
+
+async def _probe_db():
+    from controllers.db_controller import get_async_session_local
+    async with get_async_session_local()() as db:
+        await db.execute(text("SELECT 1"))
+
+async def _probe_sheets():
+    from controllers.google_http import fetch_sheet_metadata
+    await fetch_sheet_metadata(GOOGLE_SHEET_ID, SERVICE_ACCOUNT)
+
+async def _probe_calendar():
+    from controllers.calendar_controller import CALENDAR_ID, SERVICE_ACCOUNT_FILE
+    from controllers.google_http import fetch_calendar_page
+    await fetch_calendar_page(CALENDAR_ID, SERVICE_ACCOUNT_FILE, max_results=1)
+
+def _google_configured(credentials_file, resource_id):
+    return bool(credentials_file and os.path.exists(credentials_file) and resource_id)
+
+def _calendar_configured():
+    from controllers.calendar_controller import CALENDAR_ID, SERVICE_ACCOUNT_FILE
+    return _google_configured(SERVICE_ACCOUNT_FILE, CALENDAR_ID)
+
+# nombre -> (sonda, ¿configurada?)
+PROBES = {
+    "db": (_probe_db, lambda: True),
+    "sheets": (_probe_sheets, lambda: _google_configured(SERVICE_ACCOUNT, GOOGLE_SHEET_ID)),
+    "calendar": (_probe_calendar, _calendar_configured),
+}
+
+_windows = {name: LatencyWindow() for name in PROBES}
+
+async def _timed(name, probe):
+    start = time.perf_counter()
+    try:
+        await asyncio.wait_for(probe(), HEALTH_PROBE_TIMEOUT)
+    except Exception as e:
+        _windows[name].record((time.perf_counter() - start) * 1000, False, f"{type(e).__name__}: {e}")
+        logger.warning("Sonda %s fallida: %s", name, e)
+    else:
+        _windows[name].record((time.perf_counter() - start) * 1000, True)
+
+def run_probes():
+    """
+    Ejecuta a la vez las sondas de las dependencias configuradas.
+    """
+    from common.services.async_runner import gather
+    probes = [_timed(name, probe) for name, (probe, configured) in PROBES.items() if configured()]
+    gather(*probes, timeout=HEALTH_PROBE_TIMEOUT + 5)
+
+def health_report():
+    """
+    Estado de cada dependencia (ok, degraded, down o not_configured) con sus
+    latencias, y estado global: down si falla una dependencia crítica,
+    degraded si falla alguna otra.
+    """
+    from common.warmup import is_ready
+
+    checks = {}
+    for name, (_, configured) in PROBES.items():
+        check = _windows[name].snapshot()
+        if not configured():
+            check["status"] = "not_configured"
+        elif check["last_ok"] is None:
+            check["status"] = "unknown"
+        elif not check["last_ok"]:
+            check["status"] = "down"
+        elif check["errors"]:
+            check["status"] = "degraded"
+        else:
+            check["status"] = "ok"
+        checks[name] = check
+
+    if any(checks[name]["status"] == "down" for name in CRITICAL):
+        status = "down"
+    elif any(check["status"] in ("down", "degraded") for check in checks.values()):
+        status = "degraded"
+    else:
+        status = "ok"
+    return {"status": status, "ready": is_ready(), "checked_at": datetime.now().isoformat(timespec="seconds"),
+            "checks": checks}
+
+def accepts_traffic(report):
+    """
+    True si la réplica puede recibir tráfico: calentamiento terminado, última
+    sonda de la BD correcta y tasa de errores de la BD dentro del límite.
+    """
+    db = report["checks"]["db"]
+    return bool(report["ready"] and db["last_ok"]
+                and (db["error_rate"] or 0) <= HEALTH_READY_MAX_ERROR_RATE)
+
+# --------------------------------
+# Sondas periódicas y endpoint HTTP
+# --------------------------------
+
+_lock = threading.Lock()
+_started = False
+
+def _probe_loop(interval):
+    while True:
+        try:
+            run_probes()
+        except Exception as e:
+            logger.error("Error ejecutando las sondas de salud: %s", e)
+        time.sleep(interval)
+
+class _HealthHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        report = health_report()
+        if self.path.rstrip("/") == "/healthz":
+            code = 503 if report["status"] == "down" else 200
+        elif self.path.rstrip("/") == "/readyz":
+            code = 200 if accepts_traffic(report) else 503
+        else:
+            self.send_error(404)
+            return
+        body = json.dumps(report, ensure_ascii=False).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug("Health: " + format, *args)
+
+def start_health_monitor(interval=HEALTH_PROBE_INTERVAL, port=HEALTH_PORT):
+    """
+    Lanza una única vez por proceso las sondas periódicas y, si `port` no
+    es 0, el endpoint HTTP de salud.
+    """
+    global _started
+    with _lock:
+        if _started:
+            return
+        _started = True
+
+    threading.Thread(target=_probe_loop, args=(interval,), name="health-probes", daemon=True).start()
+    if port:
+        try:
+            server = ThreadingHTTPServer(("0.0.0.0", port), _HealthHandler)
+        except OSError as e:
+            # Otra réplica en la misma máquina ya tiene el puerto
+            logger.warning("No se pudo abrir el endpoint de salud en el puerto %s: %s", port, e)
+            return
+        threading.Thread(target=server.serve_forever, name="health-http", daemon=True).start()
+        logger.info("Endpoint de salud en el puerto %s (/healthz, /readyz)", port)
@@ -0,0 +1,150 @@
+# common/logging_config.py
+#
+# Configuración de logging del proceso. Los registros se encolan con un
+# QueueHandler y un QueueListener en su propio hilo les da formato (JSON o
+# texto) y los escribe, de modo que la E/S no ocurre en el hilo que dibuja
+# la página.
+import copy
+import json
+import time
+import queue
+import atexit
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+from config import LOG_LEVEL, LOG_FORMAT, LOG_FILE, DB_ECHO
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+LOG_FILE_MAX_BYTES = 10 * 1024 * 1024
+LOG_FILE_BACKUPS = 5
+
+# Campos de la ejecución en curso (página, rol...) que se añaden a cada registro
+_context = contextvars.ContextVar("log_context", default={})
+
+# Atributos propios de LogRecord: el resto son campos `extra` o de contexto
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "taskName"}
+
+_listener = None
+_lock = threading.Lock()
+
+# --------------------------------
+# Contexto y duraciones
+# --------------------------------
+
+def current_log_context():
+    """
+    Devuelve una copia de los campos de contexto activos.
+    """
+    return dict(_context.get())
+
+@contextmanager
+def log_context(**fields):
+    """
+    Añade `fields` a todos los registros emitidos dentro del bloque (en este
+    hilo o tarea asyncio).
+    """
+    token = _context.set({**_context.get(), **fields})
+    try:
+        yield
+    finally:
+        _context.reset(token)
+
+@contextmanager
+def log_duration(logger, event, level=logging.INFO, **fields):
+    """
+    Registra `event` al terminar el bloque con su duración en `duration_ms`.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        logger.log(level, "%s", event, extra={"event": event, **fields,
+                                              "duration_ms": round((time.perf_counter() - start) * 1000, 1)})
+
+# --------------------------------
+# Handlers y formato
+# --------------------------------
+
+class _ContextFilter(logging.Filter):
+    def filter(self, record):
+        for key, value in _context.get().items():
+            if not hasattr(record, key):
+                setattr(record, key, value)
+        return True
+
+class _DeferredQueueHandler(QueueHandler):
+    """
+    Solo resuelve el mensaje (los argumentos pueden cambiar después) y la
+    traza de las excepciones; el formato y la escritura quedan para el
+    hilo del listener.
+    """
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+class JsonFormatter(logging.Formatter):
+    """
+    Un objeto JSON por línea con la hora, nivel, logger, mensaje y los
+    campos de contexto y `extra` del registro.
+    """
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "thread": record.threadName,
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_text:
+            entry["exc_info"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+def _target_handler(fmt, log_file):
+    if log_file:
+        handler = RotatingFileHandler(log_file, maxBytes=LOG_FILE_MAX_BYTES, backupCount=LOG_FILE_BACKUPS,
+                                      encoding="utf-8")
+    else:
+        handler = logging.StreamHandler()
+    handler.setFormatter(JsonFormatter() if fmt == "json" else logging.Formatter(TEXT_FORMAT))
+    return handler
+
+def setup_logging(level=LOG_LEVEL, fmt=LOG_FORMAT, log_file=LOG_FILE):
+    """
+    Configura el logger raíz una sola vez por proceso (las siguientes
+    llamadas no hacen nada). Con DB_ECHO se registran también las
+    sentencias SQL de SQLAlchemy.
+    """
+    global _listener
+    with _lock:
+        if _listener is not None:
+            return
+
+        log_queue = queue.SimpleQueue()
+        handler = _DeferredQueueHandler(log_queue)
+        handler.addFilter(_ContextFilter())
+
+        root = logging.getLogger()
+        for existing in list(root.handlers):
+            root.removeHandler(existing)
+        root.addHandler(handler)
+        root.setLevel(level)
+        logging.getLogger("sqlalchemy.engine").setLevel(logging.INFO if DB_ECHO else logging.WARNING)
+
+        _listener = QueueListener(log_queue, _target_handler(fmt, log_file), respect_handler_level=True)
+        _listener.start()
+        # Vaciar la cola al salir
+        atexit.register(_listener.stop)
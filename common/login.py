@@ -1,13 +1,11 @@
 # common/login.py
 import streamlit as st
-from controllers.db_controller import get_session_local
 from config import DATABASE_URL
+from common.services.unit_of_work import unit_of_work
+from common import auth
 from models import User
 import bcrypt
 
-# Conexión a la BD
-SessionLocal = get_session_local()
-
 
 def _hide_sidebar_and_button():
     st.markdown(
@@ -37,28 +35,25 @@ def show():
             submit_button = st.form_submit_button(label="Iniciar sesión")
             
             if submit_button:
-                db = SessionLocal()
-
                 try:
-                    # Buscamos el usuario
-                    user = db.query(User).filter(User.username == username).first()
+                    # Buscamos el usuario (la sesión de BD se cierra antes de comprobar la contraseña)
+                    with unit_of_work() as db:
+                        user = (db.query(User.user_id, User.username, User.password_hash, User.user_type)
+                                .filter(User.username == username).first())
+                except Exception as e:
+                    st.error(f"Error en login: {e}")
+                    st.stop()
 
-                    if not user:
-                        st.error("Usuario no encontrado.")
-                        st.stop()
+                if not user:
+                    st.error("Usuario no encontrado.")
+                    st.stop()
 
-                    st.info(f"Usuario encontrado: {user.username}")
+                st.info(f"Usuario encontrado: {user.username}")
 
-                    # Verificamos contraseña
-                    if bcrypt.checkpw(password.encode('utf-8'), user.password_hash.encode('utf-8')):
-                        st.success("Login exitoso ✅")
-                        st.session_state['user_id'] = user.user_id
-                        st.session_state['user_type'] = user.user_type.value
-                        st.rerun()
-                    else:
-                        st.error("Contraseña incorrecta.")
-                
-                except Exception as e:
-                    st.error(f"Error en login: {e}")
-                finally:
-                    db.close()
+                # Verificamos contraseña
+                if bcrypt.checkpw(password.encode('utf-8'), user.password_hash.encode('utf-8')):
+                    st.success("Login exitoso ✅")
+                    auth.start_session(user.user_id, user.user_type.value)
+                    st.rerun()
+                else:
+                    st.error("Contraseña incorrecta.")
@@ -0,0 +1,161 @@
+# common/profiling.py
+#
+# Perfilado bajo demanda desde la pestaña Diagnóstico:
+#   - cProfile del siguiente render de una página (en cualquier sesión).
+#   - Instantáneas de memoria con tracemalloc y crecimiento entre ellas.
+import io
+import json
+import time
+import pstats
+import marshal
+import cProfile
+import logging
+import threading
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+PROFILE_TOP = 30          # Funciones mostradas por perfil
+PROFILES_KEPT = 10        # Perfiles guardados en memoria
+MEMORY_TOP = 25           # Líneas mostradas por instantánea
+MEMORY_FRAMES = 10        # Profundidad de pila que guarda tracemalloc
+
+_lock = threading.Lock()
+_armed = set()            # Páginas cuyo siguiente render se perfila
+_profiles = deque(maxlen=PROFILES_KEPT)
+_snapshots = deque(maxlen=2)   # (momento, instantánea): la anterior y la última
+
+# --------------------------------
+# cProfile
+# --------------------------------
+
+def arm_profile(page):
+    """
+    Perfila el siguiente render de `page` (de cualquier usuario).
+    """
+    with _lock:
+        _armed.add(page)
+
+def armed_pages():
+    with _lock:
+        return sorted(_armed)
+
+def _take_armed(page):
+    with _lock:
+        if page in _armed:
+            _armed.discard(page)
+            return True
+        return False
+
+def _top_functions(stats, limit=PROFILE_TOP):
+    rows = []
+    for (filename, line, function), (_, ncalls, tottime, cumtime, _) in stats.stats.items():
+        rows.append({"function": f"{function} ({filename}:{line})", "ncalls": ncalls,
+                     "tottime": tottime, "cumtime": cumtime})
+    return sorted(rows, key=lambda row: row["cumtime"], reverse=True)[:limit]
+
+@contextmanager
+def profile_render(page, **context):
+    """
+    Ejecuta el bloque bajo cProfile si el render de `page` estaba marcado.
+    El resultado queda en profiles() con los datos crudos (.prof) y las
+    funciones con más tiempo acumulado.
+    """
+    if not _take_armed(page):
+        yield
+        return
+
+    profiler = cProfile.Profile()
+    start = time.perf_counter()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        elapsed = time.perf_counter() - start
+        stats = pstats.Stats(profiler, stream=io.StringIO())
+        with _lock:
+            _profiles.appendleft({
+                "page": page,
+                "at": datetime.now(),
+                "seconds": elapsed,
+                **context,
+                "top": _top_functions(stats),
+                # Mismo formato que Stats.dump_stats: se abre con pstats, snakeviz...
+                "prof": marshal.dumps(stats.stats),
+            })
+        logger.info("Perfil de %s capturado (%.2fs)", page, elapsed)
+
+def profiles():
+    """
+    Perfiles capturados, el más reciente primero.
+    """
+    with _lock:
+        return list(_profiles)
+
+# --------------------------------
+# tracemalloc
+# --------------------------------
+
+def memory_tracing():
+    return tracemalloc.is_tracing()
+
+def start_memory_tracing(frames=MEMORY_FRAMES):
+    """
+    Empieza a registrar asignaciones de memoria. Tiene coste en CPU y
+    memoria mientras está activo: detenerlo al terminar.
+    """
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+        logger.info("tracemalloc activado (%s frames)", frames)
+
+def stop_memory_tracing():
+    with _lock:
+        _snapshots.clear()
+    tracemalloc.stop()
+    logger.info("tracemalloc desactivado")
+
+def _site(stat):
+    frame = stat.traceback[0]
+    return f"{frame.filename}:{frame.lineno}"
+
+def take_memory_snapshot(limit=MEMORY_TOP):
+    """
+    Toma una instantánea y devuelve las líneas que más memoria retienen y,
+    si hay una instantánea anterior, las que más han crecido desde ella.
+    """
+    if not tracemalloc.is_tracing():
+        raise RuntimeError("tracemalloc no está activo")
+
+    snapshot = tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    ))
+    with _lock:
+        previous = _snapshots[-1] if _snapshots else None
+        _snapshots.append((datetime.now(), snapshot))
+
+    current, peak = tracemalloc.get_traced_memory()
+    report = {
+        "at": datetime.now().isoformat(timespec="seconds"),
+        "traced_kb": current / 1024,
+        "peak_kb": peak / 1024,
+        "top": [{"site": _site(stat), "size_kb": stat.size / 1024, "count": stat.count}
+                for stat in snapshot.statistics("lineno")[:limit]],
+        "growth": None,
+    }
+    if previous is not None:
+        report["since"] = previous[0].isoformat(timespec="seconds")
+        report["growth"] = [{"site": _site(stat), "size_diff_kb": stat.size_diff / 1024,
+                             "count_diff": stat.count_diff, "size_kb": stat.size / 1024}
+                            for stat in snapshot.compare_to(previous[1], "lineno")[:limit]]
+    return report
+
+def report_json(report):
+    """
+    Serializa un informe (de memoria o la parte legible de un perfil) para descargarlo.
+    """
+    return json.dumps({k: v for k, v in report.items() if k != "prof"}, ensure_ascii=False, indent=2, default=str)
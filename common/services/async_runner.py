@@ -0,0 +1,58 @@
+# common/services/async_runner.py
+import asyncio
+import logging
+import threading
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+from common.logging_config import current_log_context, log_context
+from common.tracing import current_span, use_span
+
+logger = logging.getLogger(__name__)
+
+_loop = None
+_lock = threading.Lock()
+
+def _get_loop():
+    """
+    Bucle de eventos compartido por el proceso, en un hilo propio. Streamlit
+    ejecuta cada página en un hilo distinto: un único bucle permite reutilizar
+    las conexiones del AsyncEngine y del cliente HTTP entre ejecuciones.
+    """
+    global _loop
+    with _lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="ballers-async", daemon=True).start()
+            logger.info("Bucle de eventos asíncrono iniciado")
+        return _loop
+
+def run_async(coro, timeout=None):
+    """
+    Ejecuta una corrutina en el bucle compartido y espera su resultado desde
+    código síncrono (páginas y controladores). Los registros y spans de la
+    corrutina conservan el contexto (página, rol, traza) de quien la lanza.
+    Si se agota `timeout` la corrutina se cancela (no sigue ocupando el bucle).
+    """
+    fields = current_log_context()
+    parent = current_span()
+
+    async def _with_context():
+        with log_context(**fields), use_span(parent):
+            return await coro
+
+    future = asyncio.run_coroutine_threadsafe(_with_context(), _get_loop())
+    try:
+        return future.result(timeout)
+    except FutureTimeoutError:
+        future.cancel()
+        raise
+
+def gather(*coros, timeout=None):
+    """
+    Ejecuta varias corrutinas a la vez y devuelve sus resultados en orden:
+    el tiempo total es el de la más lenta, no la suma.
+    """
+    async def _all():
+        return await asyncio.gather(*coros)
+
+    return run_async(_all(), timeout)
@@ -0,0 +1,150 @@
+# common/services/chart_service.py
+import io
+import os
+import logging
+import importlib.util
+from pathlib import Path
+
+import streamlit as st
+
+from config import CHART_BACKEND, CHART_CACHE_DIR, CHART_CACHE_MAX_MB, CHART_FORMAT
+from controllers.player_analytics_controller import METRIC_COLUMNS, METRIC_LABELS
+
+BUCKET_LABELS = {None: "Test", "week": "Semana", "month": "Mes"}
+
+logger = logging.getLogger(__name__)
+
+_CACHE_DIR = Path(CHART_CACHE_DIR)
+
+def _use_matplotlib():
+    return CHART_BACKEND == "matplotlib" and importlib.util.find_spec("matplotlib") is not None
+
+def _chart_path(player_id, latest_date, metric):
+    return _CACHE_DIR / f"{player_id}_{latest_date:%Y%m%d%H%M%S}_{metric}.{CHART_FORMAT}"
+
+def _chart_lines(series, metric, window=3):
+    """
+    Líneas a dibujar para una serie de query_metric_series(): el valor y su
+    media móvil si no está agrupada, o media, mínimo y máximo por periodo.
+    """
+    if series.attrs.get("bucket") is None:
+        return {
+            "Valor": series[metric],
+            "Media móvil": series[metric].rolling(window, min_periods=1).mean(),
+        }
+    return {
+        "Media": series[f"{metric}_mean"],
+        "Mínimo": series[f"{metric}_min"],
+        "Máximo": series[f"{metric}_max"],
+    }
+
+def _render_all_metrics(player_id, series, latest_date):
+    """
+    Renderiza de una vez los gráficos de progresión de todas las métricas y
+    los guarda en disco. Usa la API orientada a objetos de matplotlib (sin
+    el estado global de pyplot), así cada figura se libera al terminar.
+    """
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    _CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    bucket = series.attrs.get("bucket")
+
+    for metric in METRIC_COLUMNS:
+        fig = Figure(figsize=(6.4, 3.6), dpi=100)
+        FigureCanvasAgg(fig)
+        ax = fig.add_subplot()
+        lines = _chart_lines(series, metric)
+        if bucket is None:
+            ax.plot(series["date"], lines["Valor"], marker="o", label="Valor")
+            ax.plot(series["date"], lines["Media móvil"], linestyle="--", label="Media móvil")
+        else:
+            ax.fill_between(series["date"], lines["Mínimo"], lines["Máximo"], alpha=0.25, label="Mínimo–máximo")
+            ax.plot(series["date"], lines["Media"], marker="o", label="Media")
+        ax.set_title(f"Progresión {METRIC_LABELS[metric]}")
+        ax.set_xlabel(BUCKET_LABELS[bucket] if bucket else "Fecha")
+        ax.legend()
+        fig.autofmt_xdate()
+
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format=CHART_FORMAT, bbox_inches="tight")
+
+        # Escritura atómica: otro proceso nunca lee un fichero a medias
+        path = _chart_path(player_id, latest_date, metric)
+        tmp_path = path.with_suffix(path.suffix + ".tmp")
+        tmp_path.write_bytes(buffer.getvalue())
+        os.replace(tmp_path, path)
+
+    _evict(player_id, latest_date)
+
+def _evict(player_id, latest_date):
+    """
+    Borra los gráficos antiguos del jugador y, si la caché supera el límite,
+    los menos usados recientemente.
+    """
+    current = f"{player_id}_{latest_date:%Y%m%d%H%M%S}_"
+    files = []
+    for path in _CACHE_DIR.glob(f"*.{CHART_FORMAT}"):
+        if path.name.startswith(f"{player_id}_") and not path.name.startswith(current):
+            path.unlink(missing_ok=True)
+            continue
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue   # Borrado por otra sesión mientras se recorría la caché
+        files.append((stat.st_atime, stat.st_size, path))
+
+    total = sum(size for _, size, _ in files)
+    max_bytes = CHART_CACHE_MAX_MB * 1024 * 1024
+    for _, size, path in sorted(files):
+        if total <= max_bytes:
+            break
+        path.unlink(missing_ok=True)
+        total -= size
+
+def get_progression_chart(player_id, series, metric, latest_date):
+    """
+    Devuelve los bytes del gráfico de progresión de `metric`, renderizando
+    los de todas las métricas solo la primera vez para cada (jugador, fecha
+    del último test). `series` viene de query_metric_series(), ya reducida
+    a los puntos que se pueden mostrar. None si matplotlib no está
+    disponible o desactivado, o si el fichero se expulsa de la caché antes
+    de poder leerlo.
+    """
+    if series.empty or not _use_matplotlib():
+        return None
+
+    path = _chart_path(player_id, latest_date, metric)
+    for _ in range(2):
+        if not path.exists():
+            try:
+                _render_all_metrics(player_id, series, latest_date)
+            except Exception as e:
+                logger.error("Error renderizando gráficos del jugador %s: %s", player_id, e)
+                return None
+        try:
+            # Actualizar la fecha de acceso para la expulsión LRU
+            os.utime(path)
+            return path.read_bytes()
+        except FileNotFoundError:
+            # _evict de otra sesión lo ha borrado entre la comprobación y la lectura
+            continue
+    logger.warning("Gráfico %s expulsado de la caché antes de leerlo", path.name)
+    return None
+
+def show_progression_chart(player_id, series, metric, latest_date):
+    """
+    Muestra el gráfico de progresión: la imagen cacheada si hay matplotlib o,
+    si no, un gráfico nativo de Streamlit que no necesita importarlo.
+    """
+    image = get_progression_chart(player_id, series, metric, latest_date)
+    if image is not None:
+        if CHART_FORMAT == "svg":
+            st.image(image.decode("utf-8"))
+        else:
+            st.image(image)
+        return
+
+    st.caption(f"Progresión {METRIC_LABELS[metric]}")
+    lines = _chart_lines(series, metric)
+    st.line_chart(series[["date"]].assign(**lines).set_index("date"))
@@ -0,0 +1,32 @@
+# common/services/dashboard_service.py
+import time
+import logging
+
+from common.services.async_runner import gather
+from common.services.dto import DashboardDTO
+from common.services.unit_of_work import async_unit_of_work
+from controllers.calendar_controller import fetch_calendar_status
+from controllers.dashboard_controller import fetch_dashboard_stats
+from controllers.enrolment_controller import get_enrolment_ledger
+from controllers.sheets_controller import fetch_financials
+
+logger = logging.getLogger(__name__)
+
+async def _fetch_ledger():
+    async with async_unit_of_work() as db:
+        return await db.run_sync(get_enrolment_ledger)
+
+class DashboardService:
+    """
+    Datos del dashboard de administración. Las fuentes (BD, Google Sheets y
+    Google Calendar) son independientes y se consultan a la vez, así que la
+    carga tarda lo que la más lenta.
+    """
+
+    @staticmethod
+    def load():
+        start = time.perf_counter()
+        stats, financials, ledger, calendar = gather(
+            fetch_dashboard_stats(), fetch_financials(), _fetch_ledger(), fetch_calendar_status())
+        logger.debug("Dashboard cargado en %.3fs", time.perf_counter() - start)
+        return DashboardDTO(stats=stats, financials=financials, ledger=ledger, calendar=calendar)
@@ -0,0 +1,71 @@
+# common/services/dto.py
+# Objetos de datos desacoplados de la sesión de BD que devuelven los servicios.
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Optional
+
+import pandas as pd
+
+from models.session_model import SessionStatus
+
+@dataclass(frozen=True)
+class SessionDTO:
+    id: int
+    coach_id: int
+    player_id: int
+    start_time: datetime
+    end_time: Optional[datetime]
+    status: SessionStatus
+    notes: Optional[str]
+    calendar_event_id: Optional[str]
+    coach_name: Optional[str] = None
+    player_name: Optional[str] = None
+
+    @classmethod
+    def from_model(cls, session, coach_name=None, player_name=None):
+        return cls(
+            id=session.id,
+            coach_id=session.coach_id,
+            player_id=session.player_id,
+            start_time=session.start_time,
+            end_time=session.end_time,
+            status=session.status,
+            notes=session.notes,
+            calendar_event_id=session.calendar_event_id,
+            coach_name=coach_name,
+            player_name=player_name,
+        )
+
+@dataclass(frozen=True)
+class PlayerProfileDTO:
+    player_id: int
+    user_id: int
+    name: str
+    email: str
+    phone: Optional[str]
+    date_of_birth: Optional[date]
+    service: Optional[str]
+    enrolment: Optional[int]
+    notes: Optional[str]
+
+    @classmethod
+    def from_model(cls, player):
+        user = player.user
+        return cls(
+            player_id=player.player_id,
+            user_id=player.user_id,
+            name=user.name,
+            email=user.email,
+            phone=user.phone,
+            date_of_birth=user.date_of_birth,
+            service=player.service,
+            enrolment=player.enrolment,
+            notes=player.notes,
+        )
+
+@dataclass(frozen=True)
+class DashboardDTO:
+    stats: dict
+    financials: pd.DataFrame
+    ledger: dict
+    calendar: dict
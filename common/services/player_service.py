@@ -0,0 +1,27 @@
+# common/services/player_service.py
+from sqlalchemy.orm import joinedload
+
+from common.services.dto import PlayerProfileDTO
+from common.services.unit_of_work import unit_of_work
+from models.player_model import Player
+from models.user_model import User
+
+class PlayerService:
+    """
+    Lecturas de perfiles de jugador en transacciones cortas, devueltas como DTOs.
+    """
+
+    @staticmethod
+    def get_profile(user_id: int = None, name: str = None):
+        """
+        Perfil del jugador asociado a un usuario o, si no se indica, al
+        nombre dado. None si no existe.
+        """
+        with unit_of_work() as db:
+            query = db.query(Player).options(joinedload(Player.user))
+            if user_id is not None:
+                query = query.filter(Player.user_id == user_id)
+            else:
+                query = query.join(Player.user).filter(User.name == name)
+            player = query.first()
+            return PlayerProfileDTO.from_model(player) if player else None
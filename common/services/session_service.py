@@ -1,16 +1,17 @@
 # common/services/session_service.py
 from controllers.session_controller import create_session, update_session, delete_session
-from controllers.db_controller import get_session_local
-from models.session_model import SessionStatus
+from common.services.dto import SessionDTO
+from common.services.unit_of_work import unit_of_work
+from models.coach_model import Coach
+from models.session_model import Session, SessionStatus
+from models.user_model import User
 from datetime import datetime
 
-# Obtener el sessionmaker
-SessionLocal = get_session_local()
-
 class SessionService:
     """
     Servicio para gestionar sesiones entre entrenadores y jugadores.
     Implementa el patrón de diseño Facade para simplificar el uso del controlador.
+    Cada operación usa su propia transacción corta y devuelve DTOs.
     """
     
     @staticmethod
@@ -18,20 +19,48 @@ class SessionService:
         """
         Crea una nueva sesión.
         """
-        with SessionLocal() as db:
-            return create_session(db, coach_id, player_id, start_time, end_time, notes)
+        with unit_of_work() as db:
+            session = create_session(db, coach_id, player_id, start_time, end_time, notes)
+            return SessionDTO.from_model(session) if session else None
+
+    @staticmethod
+    def get(session_id: int):
+        """
+        Devuelve una sesión o None si no existe.
+        """
+        with unit_of_work() as db:
+            session = db.get(Session, session_id)
+            return SessionDTO.from_model(session) if session else None
     
     @staticmethod
-    def update(db, session_id: int, start_time: datetime = None, end_time: datetime = None, 
+    def update(session_id: int, start_time: datetime = None, end_time: datetime = None, 
                status: SessionStatus = None, notes: str = None):
         """
         Actualiza una sesión existente.
         """
-        return update_session(db, session_id, start_time, end_time, status, notes)
+        with unit_of_work() as db:
+            session = update_session(db, session_id, start_time, end_time, status, notes)
+            return SessionDTO.from_model(session) if session else None
     
     @staticmethod
-    def delete(db, session_id: int):
+    def delete(session_id: int):
         """
         Elimina una sesión.
         """
-        return delete_session(db, session_id)
\ No newline at end of file
+        with unit_of_work() as db:
+            return delete_session(db, session_id)
+
+    @staticmethod
+    def list_for_player(player_id: int):
+        """
+        Sesiones de un jugador, de la más reciente a la más antigua, con el
+        nombre del coach.
+        """
+        with unit_of_work() as db:
+            rows = (db.query(Session, User.name)
+                    .join(Coach, Session.coach_id == Coach.coach_id)
+                    .join(User, Coach.user_id == User.user_id)
+                    .filter(Session.player_id == player_id)
+                    .order_by(Session.start_time.desc())
+                    .all())
+            return [SessionDTO.from_model(session, coach_name=coach_name) for session, coach_name in rows]
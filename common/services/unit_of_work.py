@@ -0,0 +1,44 @@
+# common/services/unit_of_work.py
+from contextlib import contextmanager, asynccontextmanager
+
+from controllers.db_controller import get_session_local, get_async_session_local
+
+# Obtener el sessionmaker
+SessionLocal = get_session_local()
+
+@contextmanager
+def unit_of_work():
+    """
+    Sesión de BD para una sola lectura o escritura.
+
+    Hace commit al salir (rollback si hay una excepción) y cierra la sesión,
+    devolviendo la conexión al pool en cuanto termina el bloque. Los objetos
+    ORM no deben salir del bloque: se convierten antes en DTOs.
+
+        with unit_of_work() as db:
+            player = PlayerProfileDTO.from_model(db.get(Player, player_id))
+    """
+    db = SessionLocal()
+    try:
+        yield db
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+@asynccontextmanager
+async def async_unit_of_work():
+    """
+    Igual que unit_of_work pero con una AsyncSession, para las corrutinas
+    que se ejecutan con common/services/async_runner.py. El código síncrono
+    de los controladores se reutiliza con `await db.run_sync(funcion)`.
+    """
+    async with get_async_session_local()() as db:
+        try:
+            yield db
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            raise
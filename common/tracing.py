@@ -0,0 +1,406 @@
+# common/tracing.py
+#
+# Trazas ligeras compatibles con OpenTelemetry. Cada render de página es una
+# traza con spans hijos para cada sentencia SQL y cada llamada a Google.
+# Las trazas terminadas se escriben, desde un hilo aparte, como líneas JSON
+# con el formato OTLP/JSON (ExportTraceServiceRequest) en un fichero rotativo.
+import os
+import json
+import time
+import queue
+import atexit
+import inspect
+import logging
+import secrets
+import functools
+import threading
+import contextvars
+from collections import deque, OrderedDict
+from contextlib import contextmanager
+from logging.handlers import QueueListener, RotatingFileHandler
+
+from sqlalchemy import event
+
+from config import TRACE_ENABLED, TRACE_FILE, TRACE_MAX_MB, TRACE_SLOW_MS
+
+logger = logging.getLogger(__name__)
+
+SERVICE_NAME = "ballers"
+TRACE_FILE_BACKUPS = 3
+SQL_STATEMENT_MAX_CHARS = 500
+# Trazas cuyo span raíz no termina (p. ej. hilos que siguen tras el render)
+OPEN_TRACE_MAX_AGE_S = 600
+# Trazas exportadas que se recuerdan para descartar spans que terminan tarde
+EXPORTED_TRACES_KEPT = 1000
+
+# Tipos de span de OTLP
+KIND_INTERNAL, KIND_SERVER, KIND_CLIENT = 1, 2, 3
+# Códigos de estado de OTLP
+STATUS_OK, STATUS_ERROR = 1, 2
+
+_current = contextvars.ContextVar("current_span", default=None)
+
+# --------------------------------
+# Spans
+# --------------------------------
+
+class Span:
+    """
+    Un tramo de trabajo con inicio, fin, atributos y estado.
+    """
+
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "kind", "attributes",
+                 "start_ns", "end_ns", "status", "status_message")
+
+    def __init__(self, name, parent=None, kind=KIND_INTERNAL, attributes=None):
+        self.trace_id = parent.trace_id if parent else secrets.token_hex(16)
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent.span_id if parent else None
+        self.name = name
+        self.kind = kind
+        self.attributes = dict(attributes or {})
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.status = STATUS_OK
+        self.status_message = ""
+
+    @property
+    def duration_ms(self):
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e6
+
+    def set_error(self, exc):
+        self.status = STATUS_ERROR
+        self.status_message = f"{type(exc).__name__}: {exc}"
+
+    def end(self):
+        if self.end_ns is None:
+            self.end_ns = time.time_ns()
+            _collector.finish(self)
+
+def current_span():
+    return _current.get()
+
+@contextmanager
+def use_span(span):
+    """
+    Activa `span` como padre de los spans creados dentro del bloque (p. ej.
+    en otro hilo o en el bucle asyncio).
+    """
+    token = _current.set(span)
+    try:
+        yield span
+    finally:
+        _current.reset(token)
+
+def start_span(name, kind=KIND_INTERNAL, require_parent=False, **attributes):
+    """
+    Crea un span hijo del activo (o raíz de una traza nueva). Con
+    `require_parent` devuelve None si no hay traza en curso: así las
+    consultas de hilos en segundo plano no generan trazas sueltas.
+    """
+    if not TRACE_ENABLED:
+        return None
+    parent = _current.get()
+    if parent is None and require_parent:
+        return None
+    return Span(name, parent, kind, attributes)
+
+@contextmanager
+def span(name, kind=KIND_INTERNAL, require_parent=False, **attributes):
+    """
+    Mide el bloque como un span activo. Las excepciones marcan el span como
+    erróneo y se propagan.
+    """
+    current = start_span(name, kind, require_parent, **attributes)
+    if current is None:
+        yield None
+        return
+    token = _current.set(current)
+    try:
+        yield current
+    except Exception as e:
+        current.set_error(e)
+        raise
+    finally:
+        _current.reset(token)
+        current.end()
+
+def traced(name=None, kind=KIND_CLIENT, require_parent=True):
+    """
+    Decorador que mide cada llamada a la función (síncrona o corrutina)
+    como un span hijo de la traza en curso.
+    """
+    def decorator(func):
+        span_name = name or f"{func.__module__}.{func.__qualname__}"
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                with span(span_name, kind, require_parent):
+                    return await func(*args, **kwargs)
+        else:
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with span(span_name, kind, require_parent):
+                    return func(*args, **kwargs)
+        return wrapper
+
+    return decorator
+
+# --------------------------------
+# SQL
+# --------------------------------
+
+def install_sql_tracing(engine):
+    """
+    Registra en el engine (síncrono, o `async_engine.sync_engine`) un span
+    por cada sentencia ejecutada dentro de una traza.
+    """
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        current = start_span("db.query", KIND_CLIENT, require_parent=True,
+                             **{"db.system": conn.dialect.name,
+                                "db.statement": statement[:SQL_STATEMENT_MAX_CHARS],
+                                "db.executemany": executemany})
+        conn.info.setdefault("trace_spans", []).append(current)
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        spans = conn.info.get("trace_spans")
+        current = spans.pop() if spans else None
+        if current is not None:
+            if cursor.rowcount is not None and cursor.rowcount >= 0:
+                current.attributes["db.rowcount"] = cursor.rowcount
+            current.end()
+
+    @event.listens_for(engine, "handle_error")
+    def _error(exception_context):
+        spans = exception_context.connection.info.get("trace_spans") if exception_context.connection else None
+        current = spans.pop() if spans else None
+        if current is not None:
+            current.set_error(exception_context.original_exception)
+            current.end()
+
+# --------------------------------
+# Exportación
+# --------------------------------
+
+def _attribute(key, value):
+    if isinstance(value, bool):
+        typed = {"boolValue": value}
+    elif isinstance(value, int):
+        typed = {"intValue": str(value)}
+    elif isinstance(value, float):
+        typed = {"doubleValue": value}
+    else:
+        typed = {"stringValue": str(value)}
+    return {"key": key, "value": typed}
+
+def _otlp_span(s):
+    data = {
+        "traceId": s.trace_id,
+        "spanId": s.span_id,
+        "name": s.name,
+        "kind": s.kind,
+        "startTimeUnixNano": str(s.start_ns),
+        "endTimeUnixNano": str(s.end_ns),
+        "attributes": [_attribute(k, v) for k, v in s.attributes.items()],
+        "status": {"code": s.status, "message": s.status_message} if s.status_message else {"code": s.status},
+    }
+    if s.parent_id:
+        data["parentSpanId"] = s.parent_id
+    return data
+
+def _external_calls(spans, span_id, parent_id, kind, name):
+    """
+    Spans de llamadas externas (Google): de tipo cliente, sin SQL y sin otro
+    span cliente dentro. Así una función trazada que envuelve la petición
+    HTTP no cuenta su tiempo dos veces.
+    """
+    clients = [s for s in spans if kind(s) == KIND_CLIENT and name(s) != "db.query"]
+    wrapping = {parent_id(s) for s in clients}
+    return [s for s in clients if span_id(s) not in wrapping]
+
+def _summarize(spans, root):
+    sql = [s for s in spans if s.name == "db.query"]
+    google = _external_calls(spans, lambda s: s.span_id, lambda s: s.parent_id, lambda s: s.kind, lambda s: s.name)
+    return {
+        "sql_ms": sum(s.duration_ms for s in sql), "sql_count": len(sql),
+        "google_ms": sum(s.duration_ms for s in google), "google_count": len(google),
+        "total_ms": root.duration_ms,
+    }
+
+class _TraceCollector:
+    """
+    Agrupa los spans de cada traza hasta que termina su span raíz y entonces
+    la envía al fichero a través de una cola. Los spans que terminan después
+    de exportar su traza se descartan, y las trazas abiertas más de
+    OPEN_TRACE_MAX_AGE_S segundos se olvidan, para no acumular memoria.
+    """
+
+    def __init__(self):
+        self._open = {}   # trace_id -> [spans], en orden de apertura
+        self._exported = OrderedDict()   # trace_ids exportados recientemente
+        self._lock = threading.Lock()
+        self._queue = None
+
+    def finish(self, s):
+        with self._lock:
+            if s.trace_id in self._exported:
+                return
+            spans = self._open.get(s.trace_id)
+            if spans is None:
+                self._evict_stale(s.end_ns)
+                spans = self._open[s.trace_id] = []
+            spans.append(s)
+            if s.parent_id is not None:
+                return
+            del self._open[s.trace_id]
+            self._exported[s.trace_id] = None
+            if len(self._exported) > EXPORTED_TRACES_KEPT:
+                self._exported.popitem(last=False)
+        self._export(spans, s)
+
+    def _evict_stale(self, now_ns):
+        # Las trazas más antiguas van primero en el diccionario
+        limit = now_ns - OPEN_TRACE_MAX_AGE_S * 1_000_000_000
+        while self._open:
+            trace_id, spans = next(iter(self._open.items()))
+            if spans[0].end_ns >= limit:
+                return
+            del self._open[trace_id]
+            logger.debug("Traza %s descartada: su span raíz no ha terminado", trace_id)
+
+    def _export(self, spans, root):
+        summary = _summarize(spans, root)
+        if root.duration_ms >= TRACE_SLOW_MS:
+            logger.warning("Render lento de %s: %.0f ms (SQL %.0f ms en %s consultas, Google %.0f ms en %s llamadas)",
+                           root.name, summary["total_ms"], summary["sql_ms"], summary["sql_count"],
+                           summary["google_ms"], summary["google_count"])
+        if self._queue is not None:
+            # Directamente a la cola: la exportación no depende de niveles ni filtros de logging
+            self._queue.put_nowait(logging.makeLogRecord({"msg": spans}))
+
+    def set_output(self, trace_queue):
+        self._queue = trace_queue
+
+_collector = _TraceCollector()
+
+class _OTLPFormatter(logging.Formatter):
+    def format(self, record):
+        spans = record.msg
+        return json.dumps({"resourceSpans": [{
+            "resource": {"attributes": [_attribute("service.name", SERVICE_NAME)]},
+            "scopeSpans": [{"scope": {"name": __name__}, "spans": [_otlp_span(s) for s in spans]}],
+        }]}, ensure_ascii=False)
+
+_listener = None
+_setup_lock = threading.Lock()
+
+def setup_tracing(trace_file=TRACE_FILE):
+    """
+    Activa la exportación de trazas al fichero (una vez por proceso).
+    """
+    global _listener
+    if not TRACE_ENABLED:
+        return
+    with _setup_lock:
+        if _listener is not None:
+            return
+        os.makedirs(os.path.dirname(trace_file) or ".", exist_ok=True)
+        target = RotatingFileHandler(trace_file, maxBytes=TRACE_MAX_MB * 1024 * 1024,
+                                     backupCount=TRACE_FILE_BACKUPS, encoding="utf-8")
+        target.setFormatter(_OTLPFormatter())
+
+        trace_queue = queue.SimpleQueue()
+        _listener = QueueListener(trace_queue, target)
+        _listener.start()
+        atexit.register(_listener.stop)
+        _collector.set_output(trace_queue)
+
+# --------------------------------
+# Lectura (visor de Diagnóstico)
+# --------------------------------
+
+def _from_otlp(line):
+    request = json.loads(line)
+    spans = []
+    for resource in request.get("resourceSpans", []):
+        for scope in resource.get("scopeSpans", []):
+            spans.extend(scope.get("spans", []))
+    return spans
+
+def read_traces(limit=50, trace_file=TRACE_FILE):
+    """
+    Últimas `limit` trazas del fichero (la más reciente primero), cada una
+    como lista de spans OTLP.
+    """
+    if not os.path.exists(trace_file):
+        return []
+    with open(trace_file, encoding="utf-8") as f:
+        lines = deque(f, maxlen=limit)
+    traces = []
+    for line in reversed(lines):
+        try:
+            traces.append(_from_otlp(line))
+        except ValueError:
+            continue
+    return traces
+
+def _attribute_value(attribute):
+    value = attribute["value"]
+    return next(iter(value.values()), None)
+
+def _ms(start_ns, end_ns):
+    return (int(end_ns) - int(start_ns)) / 1e6
+
+def trace_summary(spans):
+    """
+    Resumen de una traza leída con read_traces: inicio, span raíz,
+    duración total y tiempo en SQL y en llamadas a Google.
+    """
+    root = next((s for s in spans if "parentSpanId" not in s), spans[-1])
+    sql = [s for s in spans if s["name"] == "db.query"]
+    google = _external_calls(spans, lambda s: s["spanId"], lambda s: s.get("parentSpanId"),
+                             lambda s: s["kind"], lambda s: s["name"])
+    return {
+        "trace_id": root["traceId"],
+        "start": int(root["startTimeUnixNano"]) / 1e9,
+        "name": root["name"],
+        "duration_ms": _ms(root["startTimeUnixNano"], root["endTimeUnixNano"]),
+        "sql_ms": sum(_ms(s["startTimeUnixNano"], s["endTimeUnixNano"]) for s in sql),
+        "sql_count": len(sql),
+        "google_ms": sum(_ms(s["startTimeUnixNano"], s["endTimeUnixNano"]) for s in google),
+        "google_count": len(google),
+        "spans": len(spans),
+        "errors": sum(1 for s in spans if s["status"]["code"] == STATUS_ERROR),
+    }
+
+def span_rows(spans):
+    """
+    Spans de una traza en orden de ejecución, con su profundidad, inicio
+    relativo a la raíz, duración y detalle (sentencia SQL, URL o error).
+    """
+    children = {}
+    for s in spans:
+        children.setdefault(s.get("parentSpanId"), []).append(s)
+    ids = {s["spanId"] for s in spans}
+    roots = [s for s in spans if s.get("parentSpanId") not in ids]
+    origin = min(int(s["startTimeUnixNano"]) for s in spans)
+
+    rows = []
+    def visit(s, depth):
+        attributes = {a["key"]: _attribute_value(a) for a in s.get("attributes", [])}
+        rows.append({
+            "depth": depth,
+            "name": s["name"],
+            "offset_ms": (int(s["startTimeUnixNano"]) - origin) / 1e6,
+            "duration_ms": _ms(s["startTimeUnixNano"], s["endTimeUnixNano"]),
+            "detail": s["status"].get("message") or attributes.get("db.statement") or attributes.get("http.url", ""),
+        })
+        for child in sorted(children.get(s["spanId"], []), key=lambda c: int(c["startTimeUnixNano"])):
+            visit(child, depth + 1)
+
+    for root in sorted(roots, key=lambda r: int(r["startTimeUnixNano"])):
+        visit(root, 0)
+    return rows
@@ -0,0 +1,97 @@
+# common/warmup.py
+import time
+import logging
+import importlib
+import threading
+from datetime import datetime
+
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_started = False
+_ready = threading.Event()
+_status = {"started_at": None, "finished_at": None, "steps": {}}
+
+def _warm_engine():
+    from controllers.db_controller import get_db_engine, get_session_local
+    engine = get_db_engine()
+    get_session_local()
+    # Abrir (y devolver) una conexión deja el pool inicializado
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+
+def _warm_financials():
+    from controllers.sheets_controller import get_financials
+    get_financials()
+
+def _warm_dashboard():
+    from controllers.dashboard_controller import get_dashboard_stats
+    get_dashboard_stats()
+
+def _warm_rankings():
+    # La primera construcción recorre todos los tests: mejor antes de la primera visita a un perfil
+    from common.services.unit_of_work import unit_of_work
+    from controllers.rankings_controller import get_rankings
+    with unit_of_work() as db:
+        get_rankings().refresh(db)
+
+def _warm_pages():
+    for module in ("pages.admin", "pages.ballers"):
+        importlib.import_module(module)
+
+# Orden de calentamiento: cada paso reutiliza lo que deja listo el anterior
+WARMUP_STEPS = (
+    ("engine", _warm_engine),
+    ("financials", _warm_financials),
+    ("dashboard", _warm_dashboard),
+    ("rankings", _warm_rankings),
+    ("pages", _warm_pages),
+)
+
+def _run():
+    _status["started_at"] = datetime.now()
+    for name, step in WARMUP_STEPS:
+        start = time.perf_counter()
+        try:
+            step()
+            _status["steps"][name] = {"ok": True, "seconds": time.perf_counter() - start}
+        except Exception as e:
+            # Un paso fallido no bloquea el arranque: se calculará en la primera petición
+            logger.warning("Fallo en el calentamiento (%s): %s", name, e)
+            _status["steps"][name] = {"ok": False, "seconds": time.perf_counter() - start, "error": str(e)}
+    _status["finished_at"] = datetime.now()
+    _ready.set()
+    logger.info("Calentamiento terminado en %.2fs",
+                (_status["finished_at"] - _status["started_at"]).total_seconds())
+
+def start_warmup():
+    """
+    Lanza una única vez por proceso, en un hilo en segundo plano, el
+    calentamiento de engine y pool, datos financieros, contadores del
+    dashboard, rankings y módulos de página.
+    """
+    global _started
+    with _lock:
+        if _started:
+            return
+        _started = True
+    threading.Thread(target=_run, name="warmup", daemon=True).start()
+
+def is_ready():
+    """
+    True cuando el calentamiento ha terminado (aunque algún paso haya fallado).
+    """
+    return _ready.is_set()
+
+def warmup_status():
+    """
+    Estado del calentamiento para comprobaciones de salud y diagnóstico.
+    """
+    return {
+        "ready": is_ready(),
+        "started_at": _status["started_at"],
+        "finished_at": _status["finished_at"],
+        "steps": dict(_status["steps"]),
+    }
@@ -5,4 +5,47 @@ load_dotenv()   # Busca y lee .env
 DATABASE_URL = os.getenv("DATABASE_URL")
 SERVICE_ACCOUNT = os.getenv("GOOGLE_SERVICE_ACCOUNT_JSON")
 GOOGLE_CALENDAR_ID = os.getenv("GOOGLE_CALENDAR_ID")
-GOOGLE_SHEET_ID = os.getenv("GOOGLE_SHEET_ID")
\ No newline at end of file
+GOOGLE_SHEET_ID = os.getenv("GOOGLE_SHEET_ID")
+# Raíz alternativa de las APIs de Google, p. ej. http://localhost:8504/ (tools/fake_google.py)
+GOOGLE_API_ENDPOINT = os.getenv("GOOGLE_API_ENDPOINT")
+
+# Caché de consultas (controllers/query_cache.py)
+QUERY_CACHE_MAX_ENTRIES = int(os.getenv("QUERY_CACHE_MAX_ENTRIES", "512"))
+QUERY_CACHE_MAX_MB = int(os.getenv("QUERY_CACHE_MAX_MB", "64"))
+QUERY_CACHE_MAX_AGE = int(os.getenv("QUERY_CACHE_MAX_AGE", "60"))   # segundos; escrituras de otros procesos
+
+# Caché compartida entre réplicas (common/cache.py): memory | sqlite | redis
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory")
+CACHE_SQLITE_PATH = os.getenv("CACHE_SQLITE_PATH", "data/cache.db")
+CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL", "redis://localhost:6379/0")
+
+# Gráficos de progresión (common/services/chart_service.py): matplotlib | native
+CHART_BACKEND = os.getenv("CHART_BACKEND", "matplotlib")
+CHART_FORMAT = os.getenv("CHART_FORMAT", "png")   # png | svg
+CHART_CACHE_DIR = os.getenv("CHART_CACHE_DIR", "data/cache/charts")
+CHART_CACHE_MAX_MB = int(os.getenv("CHART_CACHE_MAX_MB", "100"))
+
+# Logging (common/logging_config.py)
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")   # json | text
+LOG_FILE = os.getenv("LOG_FILE")               # Sin definir: stderr
+DB_ECHO = os.getenv("DB_ECHO", "false").lower() in ("1", "true", "yes")   # SQL de SQLAlchemy en el log
+
+# Trazas (common/tracing.py)
+TRACE_ENABLED = os.getenv("TRACE_ENABLED", "true").lower() in ("1", "true", "yes")
+TRACE_FILE = os.getenv("TRACE_FILE", "data/traces/traces.jsonl")
+TRACE_MAX_MB = int(os.getenv("TRACE_MAX_MB", "20"))
+TRACE_SLOW_MS = int(os.getenv("TRACE_SLOW_MS", "1500"))   # Renders más lentos: aviso en el log con el desglose
+
+# Sondas de salud (common/health.py)
+HEALTH_PROBE_INTERVAL = int(os.getenv("HEALTH_PROBE_INTERVAL", "30"))   # segundos entre sondas
+HEALTH_PROBE_TIMEOUT = int(os.getenv("HEALTH_PROBE_TIMEOUT", "10"))
+HEALTH_WINDOW_SECONDS = int(os.getenv("HEALTH_WINDOW_SECONDS", "900"))  # ventana de percentiles y errores
+HEALTH_PORT = int(os.getenv("HEALTH_PORT", "8503"))                     # 0 = sin endpoint HTTP
+HEALTH_READY_MAX_ERROR_RATE = float(os.getenv("HEALTH_READY_MAX_ERROR_RATE", "0.5"))  # fallos de la BD tolerados en /readyz
+
+# Sesiones persistentes (common/auth.py)
+AUTH_SECRET = os.getenv("AUTH_SECRET")                   # Clave HMAC de los tokens; igual en todas las réplicas
+AUTH_COOKIE_NAME = os.getenv("AUTH_COOKIE_NAME", "ballers_auth")
+AUTH_TOKEN_TTL_HOURS = int(os.getenv("AUTH_TOKEN_TTL_HOURS", "12"))
+AUTH_ROLE_CACHE_TTL = int(os.getenv("AUTH_ROLE_CACHE_TTL", "300"))   # segundos
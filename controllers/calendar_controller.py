@@ -1,22 +1,33 @@
 # controllers/calendar_controller.py
 import os
 import time
+import asyncio
+import json
 import random
+import hashlib
 import logging
 from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
 from google.oauth2 import service_account
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
+from sqlalchemy import select, func
+from sqlalchemy.orm import aliased
 import streamlit as st
 
-from models.session_model import Session
+from controllers.db_controller import get_async_session_local
+from controllers.google_http import fetch_calendar_events
+from controllers.query_cache import cached_scalar
+from common.tracing import traced
+from config import GOOGLE_API_ENDPOINT
+
+from models.session_model import Session, SessionStatus
 from models.coach_model import Coach
 from models.player_model import Player
 from models.user_model import User
+from models.calendar_sync_model import CalendarSyncState
 
-# Configuración de logging
-logging.basicConfig(level=logging.INFO, 
-                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+# Logging configurado en common/logging_config.py
 logger = logging.getLogger(__name__)
 
 # Configuración de credenciales
@@ -26,6 +37,11 @@ if not SERVICE_ACCOUNT_FILE:
 
 SCOPES = ['https://www.googleapis.com/auth/calendar']
 CALENDAR_ID = os.getenv("GOOGLE_CALENDAR_ID", "primary")
+CALENDAR_TZ = 'Europe/Madrid'
+DEFAULT_DESCRIPTION = "Sesión de entrenamiento"
+LIST_PAGE_SIZE = 2500   # Máximo permitido por events.list
+RATE_LIMIT_RETRIES = 5
+RATE_LIMIT_REASONS = ("rateLimitExceeded", "userRateLimitExceeded", "quotaExceeded")
 
 # --------------------------------
 # Funciones stub para modo "offline"
@@ -35,7 +51,7 @@ def create_calendar_event(summary, description, start_datetime, end_datetime, at
     """
     Versión OFFLINE: Solo registra la operación, no intenta realmente conectarse a la API.
     """
-    logger.info(f"[MODO OFFLINE] Se registraría un evento con título: {summary}")
+    logger.info("[MODO OFFLINE] Se registraría un evento con título: %s", summary)
     # Generar un ID falso para simular la creación exitosa
     fake_id = f"offline_{int(time.time())}_{random.randint(1000, 9999)}"
     return {"id": fake_id}
@@ -44,28 +60,28 @@ def update_calendar_event(event_id, summary=None, description=None, start_dateti
     """
     Versión OFFLINE: Solo registra la operación, no intenta realmente conectarse a la API.
     """
-    logger.info(f"[MODO OFFLINE] Se actualizaría el evento con ID: {event_id}")
+    logger.info("[MODO OFFLINE] Se actualizaría el evento con ID: %s", event_id)
     return {"id": event_id}
 
 def delete_calendar_event(event_id):
     """
     Versión OFFLINE: Solo registra la operación, no intenta realmente conectarse a la API.
     """
-    logger.info(f"[MODO OFFLINE] Se eliminaría el evento con ID: {event_id}")
+    logger.info("[MODO OFFLINE] Se eliminaría el evento con ID: %s", event_id)
     return True
 
 def list_calendar_events(query=None, time_min=None, time_max=None, max_results=100):
     """
     Versión OFFLINE: Devuelve una lista vacía.
     """
-    logger.info(f"[MODO OFFLINE] Se listarían eventos con filtro: {query}")
+    logger.info("[MODO OFFLINE] Se listarían eventos con filtro: %s", query)
     return []
 
 def get_calendar_event(event_id):
     """
     Versión OFFLINE: Devuelve un evento falso.
     """
-    logger.info(f"[MODO OFFLINE] Se obtendría el evento con ID: {event_id}")
+    logger.info("[MODO OFFLINE] Se obtendría el evento con ID: %s", event_id)
     return {
         "id": event_id,
         "summary": "Evento offline",
@@ -89,13 +105,39 @@ def get_calendar_service():
     try:
         credentials = service_account.Credentials.from_service_account_file(
             SERVICE_ACCOUNT_FILE, scopes=SCOPES)
-        service = build('calendar', 'v3', credentials=credentials)
+        # Con GOOGLE_API_ENDPOINT las llamadas van al emulador local
+        client_options = {"api_endpoint": f"{GOOGLE_API_ENDPOINT}calendar/v3/"} if GOOGLE_API_ENDPOINT else None
+        service = build('calendar', 'v3', credentials=credentials, client_options=client_options)
         return service
     except Exception as e:
-        logger.error(f"Error al crear el servicio de Google Calendar: {e}")
+        logger.error("Error al crear el servicio de Google Calendar: %s", e)
         raise
 
-def _real_create_calendar_event(summary, description, start_datetime, end_datetime, attendees=None):
+def _is_rate_limited(error):
+    if error.resp.status == 429:
+        return True
+    if error.resp.status != 403:
+        return False
+    details = error.error_details if isinstance(error.error_details, list) else []
+    return any(isinstance(d, dict) and d.get('reason') in RATE_LIMIT_REASONS for d in details)
+
+def _execute(request):
+    """
+    Ejecuta una petición a Calendar. Solo se espera si Google la limita
+    (429 o 403 por cuota): se reintenta con espera exponencial.
+    """
+    for attempt in range(RATE_LIMIT_RETRIES):
+        try:
+            return request.execute()
+        except HttpError as e:
+            if not _is_rate_limited(e) or attempt == RATE_LIMIT_RETRIES - 1:
+                raise
+            delay = 2 ** attempt + random.random()
+            logger.warning("Calendar limita las peticiones (%s); reintento en %.1fs", e.resp.status, delay)
+            time.sleep(delay)
+
+@traced("calendar.create_event")
+def _real_create_calendar_event(summary, description, start_datetime, end_datetime, attendees=None, session_id=None):
     """
     Versión real de creación de eventos - solo para uso interno controlado.
     """
@@ -113,37 +155,154 @@ def _real_create_calendar_event(summary, description, start_datetime, end_dateti
         'description': description,
         'start': {
             'dateTime': start_datetime.isoformat(),
-            'timeZone': 'Europe/Madrid',
+            'timeZone': CALENDAR_TZ,
         },
         'end': {
             'dateTime': end_datetime.isoformat(),
-            'timeZone': 'Europe/Madrid',
+            'timeZone': CALENDAR_TZ,
         },
     }
     
     # Añadir asistentes si se proporcionan
     if attendees:
         event['attendees'] = attendees
-    
-    # Esperar un tiempo considerable entre solicitudes (5 segundos)
-    time.sleep(5)
+
+    # Guardar el ID de la sesión para poder emparejar evento y sesión
+    if session_id is not None:
+        event['extendedProperties'] = {'private': {'sessionId': str(session_id)}}
     
     # Crear el evento
-    created_event = service.events().insert(calendarId=CALENDAR_ID, body=event).execute()
+    created_event = _execute(service.events().insert(calendarId=CALENDAR_ID, body=event))
     return created_event
 
+@traced("calendar.delete_event")
 def _real_delete_calendar_event(event_id):
     """
     Versión real de eliminación de eventos - solo para uso interno controlado.
     """
     service = get_calendar_service()
     
-    # Esperar un tiempo considerable entre solicitudes (5 segundos)
-    time.sleep(5)
-    
-    service.events().delete(calendarId=CALENDAR_ID, eventId=event_id).execute()
+    _execute(service.events().delete(calendarId=CALENDAR_ID, eventId=event_id))
     return True
 
+@traced("calendar.patch_event")
+def _real_patch_calendar_event(event_id, payload):
+    """
+    Versión real de actualización de eventos - solo para uso interno controlado.
+    `payload` es el diccionario devuelto por build_event_payload.
+    """
+    service = get_calendar_service()
+
+    body = {
+        'summary': payload['summary'],
+        'description': payload['description'],
+        'start': {'dateTime': payload['start'], 'timeZone': CALENDAR_TZ},
+        'end': {'dateTime': payload['end'], 'timeZone': CALENDAR_TZ},
+        'attendees': [{'email': email} for email in payload['attendees']],
+    }
+
+    return _execute(service.events().patch(calendarId=CALENDAR_ID, eventId=event_id, body=body))
+
+@traced("calendar.list_events")
+def _real_list_calendar_pages(time_min=None, time_max=None, sync_token=None):
+    """
+    Lista eventos del calendario paginando con el tamaño máximo de página, de
+    forma que miles de eventos cuestan solo unas pocas llamadas. Incluye los
+    eventos cancelados para poder detectar borrados.
+    Con `sync_token` devuelve solo los cambios desde esa lectura.
+    Devuelve (eventos, next_sync_token).
+    """
+    service = get_calendar_service()
+
+    events = []
+    page_token = None
+    while True:
+        params = {
+            'calendarId': CALENDAR_ID,
+            'maxResults': LIST_PAGE_SIZE,
+            'singleEvents': True,
+            'showDeleted': True,
+        }
+        if sync_token:
+            params['syncToken'] = sync_token
+        else:
+            if time_min:
+                params['timeMin'] = time_min.isoformat()
+            if time_max:
+                params['timeMax'] = time_max.isoformat()
+        if page_token:
+            params['pageToken'] = page_token
+
+        response = service.events().list(**params).execute()
+        events.extend(response.get('items', []))
+
+        page_token = response.get('nextPageToken')
+        if not page_token:
+            return events, response.get('nextSyncToken')
+
+# --------------------------------
+# Hash de contenido de eventos (diff DB ↔ Calendar)
+# --------------------------------
+
+def _normalize_event_datetime(value):
+    """
+    Normaliza una fecha (datetime o ISO string de la API) a hora local de
+    Madrid sin zona horaria, que es como se guardan las sesiones en la BD.
+    """
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if value.tzinfo is not None:
+        value = value.astimezone(ZoneInfo(CALENDAR_TZ)).replace(tzinfo=None)
+    return value.replace(microsecond=0).isoformat()
+
+def build_event_payload(session, coach_name, player_name, coach_email=None, player_email=None):
+    """
+    Renderiza el contenido del evento de calendario correspondiente a una sesión.
+    """
+    return {
+        'summary': f"Sesión: {coach_name} - {player_name}",
+        'description': session.notes or DEFAULT_DESCRIPTION,
+        'start': _normalize_event_datetime(session.start_time),
+        'end': _normalize_event_datetime(session.end_time),
+        'attendees': sorted(e.lower() for e in (coach_email, player_email) if e),
+    }
+
+def event_to_payload(event):
+    """
+    Extrae de un evento de Google Calendar el mismo contenido que build_event_payload.
+    """
+    start = event.get('start', {})
+    end = event.get('end', {})
+    return {
+        'summary': event.get('summary', ''),
+        'description': event.get('description') or DEFAULT_DESCRIPTION,
+        'start': _normalize_event_datetime(start.get('dateTime') or start.get('date')),
+        'end': _normalize_event_datetime(end.get('dateTime') or end.get('date')),
+        'attendees': sorted(a['email'].lower() for a in event.get('attendees', []) if a.get('email')),
+    }
+
+def compute_event_hash(payload):
+    """
+    Devuelve un hash estable (SHA-256) del contenido renderizado de un evento.
+    """
+    canonical = json.dumps(payload, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+def _query_sessions_with_people(db_session):
+    """
+    Devuelve las sesiones junto con nombre y email de coach y jugador en una
+    única consulta (sin consultas por fila).
+    """
+    coach_user = aliased(User)
+    player_user = aliased(User)
+    return (db_session.query(Session, coach_user.name, coach_user.email, player_user.name, player_user.email)
+            .join(Coach, Session.coach_id == Coach.coach_id)
+            .join(coach_user, Coach.user_id == coach_user.user_id)
+            .join(Player, Session.player_id == Player.player_id)
+            .join(player_user, Player.user_id == player_user.user_id))
+
 def sync_single_session(db_session, session_id):
     """
     Sincroniza una única sesión con Google Calendar.
@@ -153,54 +312,41 @@ def sync_single_session(db_session, session_id):
         # Obtener la sesión
         session = db_session.query(Session).filter(Session.id == session_id).first()
         if not session:
-            logger.error(f"No se encontró la sesión con ID {session_id}")
+            logger.error("No se encontró la sesión con ID %s", session_id)
             return False
         
-        # Obtener datos de coach y jugador
-        coach = db_session.query(Coach).filter_by(coach_id=session.coach_id).first()
-        player = db_session.query(Player).filter_by(player_id=session.player_id).first()
-        
+        # Obtener datos de coach y jugador en una sola consulta
+        row = _query_sessions_with_people(db_session).filter(Session.id == session_id).first()
+
         # Si no podemos encontrar la información necesaria, fallamos
-        if not coach or not player:
-            logger.error(f"No se pudo encontrar información para la sesión {session.id}")
+        if not row:
+            logger.error("No se pudo encontrar información para la sesión %s", session.id)
             return False
-        
-        # Obtener emails para asistentes (si están disponibles)
-        attendees = []
-        coach_user = db_session.query(User).filter_by(user_id=coach.user_id).first() if coach else None
-        player_user = db_session.query(User).filter_by(user_id=player.user_id).first() if player else None
-        
-        if coach_user and coach_user.email:
-            attendees.append({'email': coach_user.email})
-        if player_user and player_user.email:
-            attendees.append({'email': player_user.email})
-        
-        # Crear el título y descripción del evento
-        coach_name = getattr(coach, 'name', None) or getattr(coach_user, 'name', f'Coach {coach.coach_id}')
-        player_name = getattr(player, 'name', None) or getattr(player_user, 'name', f'Jugador {player.player_id}')
-        
-        summary = f"Sesión: {coach_name} - {player_name}"
-        description = session.notes or "Sesión de entrenamiento"
-        
+
+        _, coach_name, coach_email, player_name, player_email = row
+        payload = build_event_payload(session, coach_name, player_name, coach_email, player_email)
+
         # Crear el evento en el calendario
         event = _real_create_calendar_event(
-            summary=summary,
-            description=description,
-            start_datetime=session.start_time,
-            end_datetime=session.end_time,
-            attendees=attendees if attendees else None
+            summary=payload['summary'],
+            description=payload['description'],
+            start_datetime=payload['start'],
+            end_datetime=payload['end'],
+            attendees=[{'email': email} for email in payload['attendees']] or None,
+            session_id=session.id
         )
         
         # Guardar el ID del evento en la sesión
         session.calendar_event_id = event.get('id')
+        session.calendar_event_hash = compute_event_hash(payload)
         db_session.commit()
         
-        logger.info(f"Evento creado para sesión {session.id}: {event.get('id')}")
+        logger.info("Evento creado para sesión %s: %s", session.id, event.get('id'))
         
         return True
         
     except Exception as e:
-        logger.error(f"Error al sincronizar sesión {session_id}: {e}")
+        logger.error("Error al sincronizar sesión %s: %s", session_id, e)
         db_session.rollback()
         return False
 
@@ -213,7 +359,7 @@ def sync_db_to_calendar(db_session, batch_size=1):
     pending_sessions = db_session.query(Session).filter(Session.calendar_event_id.is_(None)).all()
     total_pending = len(pending_sessions)
     
-    logger.info(f"Encontradas {total_pending} sesiones pendientes de sincronizar")
+    logger.info("Encontradas %s sesiones pendientes de sincronizar", total_pending)
     
     if total_pending == 0:
         return 0
@@ -224,10 +370,215 @@ def sync_db_to_calendar(db_session, batch_size=1):
     
     return 1 if result else 0
 
+def _apply_event_to_session(session, remote_payload):
+    """
+    Trae a la sesión los cambios hechos en Calendar (horario y notas).
+    El título y los asistentes se derivan de coach y jugador, así que no se importan.
+    """
+    session.start_time = datetime.fromisoformat(remote_payload['start'])
+    session.end_time = datetime.fromisoformat(remote_payload['end'])
+    description = remote_payload['description']
+    session.notes = None if description == DEFAULT_DESCRIPTION else description
+
+def _reconcile_session(session, payload, event, stats, create_missing=True):
+    """
+    Compara una sesión con su evento remoto (o None si no está en Calendar)
+    y aplica la acción que corresponda, anotándola en `stats`.
+    """
+    local_hash = compute_event_hash(payload)
+
+    if not session.calendar_event_id:
+        if create_missing and session.status != SessionStatus.CANCELED:
+            created = _real_create_calendar_event(
+                summary=payload['summary'],
+                description=payload['description'],
+                start_datetime=payload['start'],
+                end_datetime=payload['end'],
+                attendees=[{'email': email} for email in payload['attendees']] or None,
+                session_id=session.id
+            )
+            session.calendar_event_id = created.get('id')
+            session.calendar_event_hash = local_hash
+            stats["created"] += 1
+        return
+
+    if event is None:
+        # El evento ya no existe: se desvincula para volver a crearlo
+        session.calendar_event_id = None
+        session.calendar_event_hash = None
+        stats["unlinked"] += 1
+        return
+
+    if event.get('status') == 'cancelled':
+        if session.status != SessionStatus.CANCELED:
+            session.status = SessionStatus.CANCELED
+            stats["canceled"] += 1
+        else:
+            stats["unchanged"] += 1
+        return
+
+    remote_payload = event_to_payload(event)
+    remote_hash = compute_event_hash(remote_payload)
+
+    if remote_hash == local_hash:
+        session.calendar_event_hash = local_hash
+        stats["unchanged"] += 1
+    elif local_hash == session.calendar_event_hash:
+        _apply_event_to_session(session, remote_payload)
+        stats["pulled"] += 1
+        # Título y asistentes no se importan: si también se cambiaron en
+        # Calendar se restauran ahora, no en la siguiente pasada
+        rebuilt = {**payload, 'description': session.notes or DEFAULT_DESCRIPTION,
+                   'start': _normalize_event_datetime(session.start_time),
+                   'end': _normalize_event_datetime(session.end_time)}
+        if rebuilt != remote_payload:
+            _real_patch_calendar_event(session.calendar_event_id, rebuilt)
+            stats["pushed"] += 1
+        session.calendar_event_hash = compute_event_hash(rebuilt)
+    else:
+        _real_patch_calendar_event(session.calendar_event_id, payload)
+        session.calendar_event_hash = local_hash
+        stats["pushed"] += 1
+
+def _reconcile_rows(db_session, rows, remote_events, stats, create_missing=True):
+    """
+    Reconcilia cada fila de _query_sessions_with_people con su evento de
+    `remote_events`. Tras cada evento creado o modificado en Calendar se hace
+    commit, para que un fallo a mitad no pierda los calendar_event_id ya
+    creados (la siguiente pasada crearía eventos duplicados).
+    """
+    # Sin expirar en cada commit: las sesiones ya cargadas no se vuelven a leer una a una
+    expire_on_commit = db_session.expire_on_commit
+    db_session.expire_on_commit = False
+    try:
+        for session, coach_name, coach_email, player_name, player_email in rows:
+            payload = build_event_payload(session, coach_name, player_name, coach_email, player_email)
+            remote_writes = stats["created"] + stats["pushed"]
+            try:
+                _reconcile_session(session, payload, remote_events.get(session.calendar_event_id), stats,
+                                   create_missing)
+            except Exception as e:
+                logger.error("Error reconciliando sesión %s: %s", session.id, e)
+                stats["errors"] += 1
+            if stats["created"] + stats["pushed"] > remote_writes:
+                db_session.commit()
+    finally:
+        db_session.expire_on_commit = expire_on_commit
+
+def _new_stats():
+    """
+    Contadores de acciones de una reconciliación.
+    """
+    return {"unchanged": 0, "pushed": 0, "pulled": 0, "created": 0,
+            "canceled": 0, "unlinked": 0, "errors": 0}
+
+def get_sync_state(db_session):
+    """
+    Devuelve (creándolo si no existe) el estado de sincronización del calendario.
+    """
+    state = db_session.get(CalendarSyncState, CALENDAR_ID)
+    if state is None:
+        state = CalendarSyncState(calendar_id=CALENDAR_ID, dirty=False)
+        db_session.add(state)
+    return state
+
+def _calendar_db_status(db_session):
+    state = db_session.get(CalendarSyncState, CALENDAR_ID)
+    return {
+        "pending": cached_scalar(db_session, select(func.count(Session.id)).where(Session.calendar_event_id.is_(None))),
+        "channel_expiration": state.channel_expiration if state and state.channel_id else None,
+        "dirty": bool(state and state.dirty),
+        "last_pull_at": state.last_pull_at if state else None,
+    }
+
+async def fetch_calendar_status(days=7):
+    """
+    Estado de la sincronización para el dashboard: sesiones pendientes y
+    canal de notificaciones (BD) y eventos de Calendar en los próximos
+    `days` días (API; None sin credenciales o si falla). Ambas fuentes se
+    consultan a la vez.
+    """
+    async def db_status():
+        async with get_async_session_local()() as db:
+            return await db.run_sync(_calendar_db_status)
+
+    async def upcoming_events():
+        if not SERVICE_ACCOUNT_FILE or not os.path.exists(SERVICE_ACCOUNT_FILE):
+            return None
+        now = datetime.now(ZoneInfo(CALENDAR_TZ))
+        try:
+            return len(await fetch_calendar_events(CALENDAR_ID, SERVICE_ACCOUNT_FILE, now, now + timedelta(days=days)))
+        except Exception as e:
+            logger.warning("No se pudo consultar Google Calendar: %s", e)
+            return None
+
+    status, upcoming = await asyncio.gather(db_status(), upcoming_events())
+    return {**status, "upcoming_events": upcoming}
+
+def reconcile_calendar(db_session, create_missing=True):
+    """
+    Reconciliación completa BD ↔ Google Calendar por hash de contenido.
+
+    Lista todos los eventos en bloque, compara en memoria el hash del evento
+    renderizado desde la BD con el del evento remoto y el guardado en la última
+    sincronización, y solo escribe donde hay diferencias reales:
+      - BD cambiada y Calendar no  → se envía (push) el evento.
+      - Calendar cambiado y BD no  → se traen (pull) horario y notas.
+      - Ambos cambiados            → gana la BD (push).
+      - Evento cancelado en Calendar → la sesión se marca como cancelada.
+    El syncToken de la lectura queda guardado para las lecturas incrementales.
+    Devuelve un diccionario con el recuento de cada acción.
+    """
+    stats = _new_stats()
+
+    events, next_sync_token = _real_list_calendar_pages()
+    remote_events = {event['id']: event for event in events}
+    logger.info("Reconciliación: %s eventos remotos", len(remote_events))
+
+    _reconcile_rows(db_session, _query_sessions_with_people(db_session).all(), remote_events, stats, create_missing)
+
+    state = get_sync_state(db_session)
+    state.sync_token = next_sync_token
+    state.dirty = False
+    state.last_pull_at = datetime.now()
+
+    db_session.commit()
+    logger.info("Reconciliación terminada: %s", stats)
+    return stats
+
 def sync_calendar_to_db(db_session):
     """
-    Sincroniza eventos de Google Calendar a la base de datos.
+    Sincronización incremental Google Calendar → BD.
+    Lee solo los eventos cambiados desde el último syncToken y reconcilia las
+    sesiones afectadas. Si el token ha caducado (410) se hace una reconciliación
+    completa. Devuelve un diccionario con el recuento de cada acción.
     """
-    # Esta función se implementará en la siguiente fase
-    logger.info("La sincronización Calendar → DB aún no está implementada")
-    return 0
\ No newline at end of file
+    state = get_sync_state(db_session)
+    if not state.sync_token:
+        logger.info("Sin syncToken guardado: se hace una reconciliación completa")
+        return reconcile_calendar(db_session, create_missing=False)
+
+    try:
+        events, next_sync_token = _real_list_calendar_pages(sync_token=state.sync_token)
+    except HttpError as e:
+        if e.resp.status == 410:
+            logger.warning("syncToken caducado: se hace una reconciliación completa")
+            state.sync_token = None
+            return reconcile_calendar(db_session, create_missing=False)
+        raise
+
+    stats = _new_stats()
+    changed = {event['id']: event for event in events}
+    if changed:
+        rows = (_query_sessions_with_people(db_session)
+                .filter(Session.calendar_event_id.in_(list(changed)))
+                .all())
+        _reconcile_rows(db_session, rows, changed, stats, create_missing=False)
+
+    state.sync_token = next_sync_token
+    state.dirty = False
+    state.last_pull_at = datetime.now()
+    db_session.commit()
+
+    logger.info("Sincronización incremental Calendar → BD: %s eventos cambiados, %s", len(changed), stats)
+    return stats
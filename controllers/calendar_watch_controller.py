@@ -0,0 +1,230 @@
+# controllers/calendar_watch_controller.py
+import uuid
+import secrets
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from controllers.calendar_controller import (
+    CALENDAR_ID,
+    get_calendar_service,
+    get_sync_state,
+    sync_calendar_to_db,
+)
+from controllers.db_controller import get_session_local
+
+logger = logging.getLogger(__name__)
+
+# Duración pedida a Google para cada canal (Google puede acortarla)
+CHANNEL_TTL = timedelta(days=7)
+# Se renueva el canal cuando le queda menos de este margen
+RENEW_MARGIN = timedelta(hours=12)
+# Espera tras una notificación para agrupar ráfagas de cambios en una sola lectura
+PULL_DEBOUNCE_SECONDS = 2.0
+
+# --------------------------------
+# Gestión de canales events.watch
+# --------------------------------
+
+def start_watch_channel(db_session, address, ttl=CHANNEL_TTL):
+    """
+    Registra un canal de notificaciones push para el calendario y lo guarda
+    en el estado de sincronización. `address` es la URL HTTPS pública del receptor.
+    """
+    service = get_calendar_service()
+    state = get_sync_state(db_session)
+
+    channel_id = str(uuid.uuid4())
+    channel_token = secrets.token_urlsafe(32)
+    body = {
+        'id': channel_id,
+        'type': 'web_hook',
+        'address': address,
+        'token': channel_token,
+        'params': {'ttl': str(int(ttl.total_seconds()))},
+    }
+    response = service.events().watch(calendarId=CALENDAR_ID, body=body).execute()
+
+    state.channel_id = channel_id
+    state.channel_token = channel_token
+    state.channel_resource_id = response.get('resourceId')
+    state.channel_expiration = _expiration_from_response(response, ttl)
+    db_session.commit()
+
+    logger.info("Canal de notificaciones %s creado (expira %s)", channel_id, state.channel_expiration)
+    return state
+
+def start_local_channel(db_session, ttl=CHANNEL_TTL):
+    """
+    Registra un canal solo en local, sin llamar a Google, para probar el
+    receptor con tools/fake_calendar_push.py. Solo sustituye al aviso push:
+    la lectura incremental sigue llamando a la API de Calendar, que
+    tools/calendar_webhook.py --local dirige al emulador (GOOGLE_API_ENDPOINT).
+    """
+    state = get_sync_state(db_session)
+    state.channel_id = f"local-{uuid.uuid4()}"
+    state.channel_token = secrets.token_urlsafe(32)
+    state.channel_resource_id = "local"
+    state.channel_expiration = datetime.now() + ttl
+    db_session.commit()
+    return state
+
+def stop_watch_channel(db_session):
+    """
+    Detiene el canal activo (si lo hay) y lo borra del estado.
+    """
+    state = get_sync_state(db_session)
+    if state.channel_id and state.channel_resource_id and state.channel_resource_id != "local":
+        try:
+            service = get_calendar_service()
+            service.channels().stop(body={'id': state.channel_id, 'resourceId': state.channel_resource_id}).execute()
+        except Exception as e:
+            # El canal puede haber caducado ya; no es un error grave
+            logger.warning("No se pudo detener el canal %s: %s", state.channel_id, e)
+
+    state.channel_id = None
+    state.channel_token = None
+    state.channel_resource_id = None
+    state.channel_expiration = None
+    db_session.commit()
+
+def renew_watch_channel(db_session, address, margin=RENEW_MARGIN):
+    """
+    Renueva el canal si no existe o caduca dentro de `margin`.
+    Solo llama a la API cuando hace falta. Devuelve True si se renovó.
+    """
+    state = get_sync_state(db_session)
+    if state.channel_expiration and state.channel_expiration - datetime.now() > margin:
+        return False
+
+    old_channel = (state.channel_id, state.channel_resource_id)
+    start_watch_channel(db_session, address)
+
+    # El canal anterior se detiene después de abrir el nuevo para no perder avisos
+    if old_channel[0] and old_channel[1] and old_channel[1] != "local":
+        try:
+            get_calendar_service().channels().stop(
+                body={'id': old_channel[0], 'resourceId': old_channel[1]}).execute()
+        except Exception as e:
+            logger.warning("No se pudo detener el canal anterior %s: %s", old_channel[0], e)
+    return True
+
+def _expiration_from_response(response, ttl):
+    """
+    Convierte el campo `expiration` (ms desde epoch) a datetime local sin zona.
+    """
+    expiration = response.get('expiration')
+    if not expiration:
+        return datetime.now() + ttl
+    return datetime.fromtimestamp(int(expiration) / 1000, tz=timezone.utc).astimezone().replace(tzinfo=None)
+
+# --------------------------------
+# Notificaciones
+# --------------------------------
+
+def handle_notification(db_session, headers):
+    """
+    Procesa las cabeceras de una notificación de Google Calendar.
+    Comprueba canal y token; si Google indica un cambio marca el espejo local
+    como sucio. Devuelve (código HTTP, True si hay que traer cambios).
+    """
+    state = get_sync_state(db_session)
+    channel_id = headers.get('X-Goog-Channel-ID')
+    channel_token = headers.get('X-Goog-Channel-Token')
+    resource_state = headers.get('X-Goog-Resource-State')
+
+    if not state.channel_id or channel_id != state.channel_id:
+        logger.warning("Notificación de un canal desconocido: %s", channel_id)
+        # Google deja de enviar a un canal que responde con error
+        return 404, False
+    if not channel_token or not secrets.compare_digest(channel_token, state.channel_token or ""):
+        logger.warning("Token inválido en la notificación del canal %s", channel_id)
+        return 403, False
+
+    if resource_state == 'sync':
+        # Mensaje inicial al crear el canal: no hay cambios
+        return 200, False
+
+    state.dirty = True
+    state.last_notification_at = datetime.now()
+    db_session.commit()
+    return 200, True
+
+class CalendarWebhookReceiver:
+    """
+    Receptor HTTP de notificaciones events.watch.
+    Marca el espejo como sucio y lanza una lectura incremental en segundo plano
+    solo cuando Google avisa de un cambio; en reposo no hace llamadas a la API.
+    """
+
+    def __init__(self, host="0.0.0.0", port=8502, address=None, renew_interval=3600):
+        self.address = address
+        self.renew_interval = renew_interval
+        self.SessionLocal = get_session_local()
+        self._pull_requested = threading.Event()
+        self._stop = threading.Event()
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+
+    def _make_handler(self):
+        receiver = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                # El cuerpo de las notificaciones de Calendar está vacío
+                length = int(self.headers.get('Content-Length') or 0)
+                if length:
+                    self.rfile.read(length)
+
+                with receiver.SessionLocal() as db:
+                    status, changed = handle_notification(db, self.headers)
+                if changed:
+                    receiver._pull_requested.set()
+
+                self.send_response(status)
+                self.end_headers()
+
+            def log_message(self, format, *args):
+                logger.debug("Webhook: " + format, *args)
+
+        return Handler
+
+    def _pull_worker(self):
+        while not self._stop.is_set():
+            if not self._pull_requested.wait(timeout=1):
+                continue
+            # Agrupar ráfagas de notificaciones en una sola lectura
+            self._stop.wait(PULL_DEBOUNCE_SECONDS)
+            self._pull_requested.clear()
+            try:
+                with self.SessionLocal() as db:
+                    sync_calendar_to_db(db)
+            except Exception as e:
+                logger.error("Error en la lectura incremental de Calendar: %s", e)
+
+    def _renew_worker(self):
+        while not self._stop.wait(self.renew_interval):
+            try:
+                with self.SessionLocal() as db:
+                    renew_watch_channel(db, self.address)
+            except Exception as e:
+                logger.error("Error renovando el canal de notificaciones: %s", e)
+
+    @property
+    def port(self):
+        return self._server.server_address[1]
+
+    def serve_forever(self):
+        """
+        Arranca los hilos de lectura y renovación y atiende peticiones hasta shutdown().
+        """
+        threading.Thread(target=self._pull_worker, daemon=True).start()
+        if self.address:
+            threading.Thread(target=self._renew_worker, daemon=True).start()
+        logger.info("Receptor de Calendar escuchando en el puerto %s", self.port)
+        self._server.serve_forever()
+
+    def shutdown(self):
+        self._stop.set()
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,46 @@
+# controllers/dashboard_controller.py
+from datetime import datetime, timedelta
+from sqlalchemy import select, func
+
+from common.cache import shared_cached
+from controllers.db_controller import get_session_local, get_async_session_local
+from models.coach_model import Coach
+from models.player_model import Player
+from models.session_model import Session
+
+# Obtener el sessionmaker
+SessionLocal = get_session_local()
+
+def dashboard_stats(db):
+    """
+    Calcula los contadores del dashboard de administración.
+    """
+    now = datetime.now()
+    start_of_month = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    start_of_week = (now - timedelta(days=now.weekday())).replace(hour=0, minute=0, second=0, microsecond=0)
+
+    return {
+        "total_players": db.execute(select(func.count()).select_from(Player)).scalar(),
+        "total_coaches": db.execute(select(func.count()).select_from(Coach)).scalar(),
+        "sessions_month": db.execute(select(func.count()).select_from(Session)
+                                     .where(Session.start_time >= start_of_month)).scalar(),
+        "sessions_week": db.execute(select(func.count()).select_from(Session)
+                                    .where(Session.start_time >= start_of_week)).scalar(),
+    }
+
+@shared_cached(ttl=300, name="dashboard:stats", tables=("players", "coaches", "sessions"))
+def get_dashboard_stats():
+    """
+    Contadores del dashboard. El resultado se comparte entre réplicas y se
+    invalida al modificar jugadores, coaches o sesiones.
+    """
+    with SessionLocal() as db:
+        return dashboard_stats(db)
+
+@shared_cached(ttl=300, name="dashboard:stats", tables=("players", "coaches", "sessions"))
+async def fetch_dashboard_stats():
+    """
+    Versión asíncrona de get_dashboard_stats (misma caché).
+    """
+    async with get_async_session_local()() as db:
+        return await db.run_sync(dashboard_stats)
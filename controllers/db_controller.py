@@ -1,20 +1,83 @@
 # controllers/db.py
 import streamlit as st
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import create_engine, inspect, text, make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
 from config import DATABASE_URL
+from models import Base
+from controllers.query_cache import install_invalidation_hooks
+from common.tracing import install_sql_tracing
 
-@st.cache_resource
+@st.cache_resource(show_spinner=False)
 def get_db_engine():
     """
     Devuelve una única instancia de SQLAlchemy Engine.
     """
-    return create_engine(DATABASE_URL, echo=True)
+    engine = create_engine(DATABASE_URL)   # SQL en el log: DB_ECHO (common/logging_config.py)
+    ensure_schema(engine)
+    install_sql_tracing(engine)
+    return engine
 
-@st.cache_resource
+@st.cache_resource(show_spinner=False)
 def get_session_local():
     """
     Devuelve un sessionmaker vinculado al engine cacheado.
+    Cada commit sube la versión de las tablas modificadas para invalidar la caché de consultas.
     """
     engine = get_db_engine()
-    return sessionmaker(bind=engine)
+    session_factory = sessionmaker(bind=engine)
+    install_invalidation_hooks(session_factory)
+    return session_factory
+
+# Driver asíncrono para cada backend
+ASYNC_DRIVERS = {"sqlite": "aiosqlite", "postgresql": "asyncpg"}
+
+def async_database_url(url):
+    """
+    Convierte la URL de la BD a su driver asíncrono (sqlite -> aiosqlite,
+    postgresql -> asyncpg).
+    """
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No hay driver asíncrono configurado para {backend}")
+    return url.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}")
+
+class _AsyncBackedSession(Session):
+    """
+    Sesión síncrona interna de las AsyncSession, para registrar en ella los
+    eventos de invalidación de la caché de consultas.
+    """
+
+@st.cache_resource(show_spinner=False)
+def get_async_session_local():
+    """
+    Devuelve un async_sessionmaker sobre un AsyncEngine de la misma BD.
+    Las conexiones quedan ligadas al bucle de eventos que las abre, así que
+    solo debe usarse desde common/services/async_runner.py.
+    """
+    get_db_engine()   # El esquema lo crea el engine síncrono
+    engine = create_async_engine(async_database_url(DATABASE_URL))
+    install_sql_tracing(engine.sync_engine)
+    install_invalidation_hooks(_AsyncBackedSession)
+    return async_sessionmaker(engine, expire_on_commit=False, sync_session_class=_AsyncBackedSession)
+
+def ensure_schema(engine):
+    """
+    Crea las tablas que falten y añade las columnas nuevas (nullable) y los
+    índices nuevos de los modelos a las tablas existentes, para que una BD
+    antigua siga funcionando.
+    """
+    Base.metadata.create_all(engine)
+
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            existing = {c["name"] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing or not column.nullable:
+                    continue
+                col_type = column.type.compile(dialect=engine.dialect)
+                conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {col_type}'))
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
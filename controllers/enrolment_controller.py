@@ -0,0 +1,53 @@
+# controllers/enrolment_controller.py
+from sqlalchemy import select, func, case
+
+from controllers.query_cache import cached_select
+from models.player_model import Player
+from models.session_model import Session, SessionStatus
+from models.user_model import User
+
+# A partir de cuántas sesiones restantes se avisa de que el bono se acaba
+LOW_REMAINING = 2
+
+def _count_status(status):
+    return func.sum(case((Session.status == status, 1), else_=0))
+
+def get_enrolment_ledger(db):
+    """
+    Consumo del bono de cada jugador con una sola consulta agrupada:
+    sesiones inscritas, completadas, programadas, canceladas y restantes.
+
+    Las restantes son las inscritas menos las completadas y las ya
+    programadas; las canceladas no consumen bono. El resultado se cachea
+    hasta que se modifiquen jugadores o sesiones.
+    Devuelve un diccionario player_id -> fila.
+    """
+    stmt = (select(Player.player_id, User.name, Player.enrolment,
+                   func.coalesce(_count_status(SessionStatus.COMPLETED), 0).label("completed"),
+                   func.coalesce(_count_status(SessionStatus.SCHEDULED), 0).label("scheduled"),
+                   func.coalesce(_count_status(SessionStatus.CANCELED), 0).label("canceled"))
+            .join(User, Player.user_id == User.user_id)
+            .outerjoin(Session, Session.player_id == Player.player_id)
+            .group_by(Player.player_id, User.name, Player.enrolment))
+
+    ledger = {}
+    for row in cached_select(db, stmt):
+        enrolment = row["enrolment"] or 0
+        ledger[row["player_id"]] = {
+            **row,
+            "enrolment": enrolment,
+            "remaining": enrolment - row["completed"] - row["scheduled"],
+        }
+    return ledger
+
+def enrolment_badge(entry):
+    """
+    Etiqueta corta para listas: bono agotado, a punto de agotarse o al día.
+    """
+    if entry is None or not entry["enrolment"]:
+        return "⚪ Sin bono"
+    if entry["remaining"] <= 0:
+        return f"🔴 Agotado ({entry['completed'] + entry['scheduled']}/{entry['enrolment']})"
+    if entry["remaining"] <= LOW_REMAINING:
+        return f"🟠 Quedan {entry['remaining']}"
+    return f"🟢 Quedan {entry['remaining']}"
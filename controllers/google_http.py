@@ -0,0 +1,109 @@
+# controllers/google_http.py
+# Acceso asíncrono a las APIs REST de Google (Sheets y Calendar) con httpx,
+# para poder consultarlas a la vez que la BD.
+import asyncio
+import logging
+import threading
+import weakref
+from urllib.parse import quote
+
+import httpx
+from google.auth.transport.requests import Request
+from google.oauth2 import service_account
+
+from common.tracing import KIND_CLIENT, span
+from config import GOOGLE_API_ENDPOINT
+
+logger = logging.getLogger(__name__)
+
+SHEETS_API = f"{GOOGLE_API_ENDPOINT or 'https://sheets.googleapis.com/'}v4/spreadsheets"
+CALENDAR_API = f"{GOOGLE_API_ENDPOINT or 'https://www.googleapis.com/'}calendar/v3"
+SHEETS_SCOPES = ("https://www.googleapis.com/auth/spreadsheets.readonly",)
+CALENDAR_SCOPES = ("https://www.googleapis.com/auth/calendar",)
+HTTP_TIMEOUT = 15   # segundos
+
+_credentials = {}   # (fichero, scopes) -> Credentials
+_credentials_lock = threading.Lock()
+_clients = weakref.WeakKeyDictionary()   # bucle de eventos -> httpx.AsyncClient
+_clients_lock = threading.Lock()
+
+async def _access_token(service_account_file, scopes):
+    """
+    Token OAuth de la cuenta de servicio, renovado solo cuando caduca.
+    """
+    with _credentials_lock:
+        credentials = _credentials.get((service_account_file, scopes))
+        if credentials is None:
+            credentials = service_account.Credentials.from_service_account_file(service_account_file, scopes=scopes)
+            _credentials[(service_account_file, scopes)] = credentials
+    if not credentials.valid:
+        # google-auth renueva el token de forma síncrona: fuera del bucle de eventos
+        await asyncio.to_thread(credentials.refresh, Request())
+    return credentials.token
+
+def _client():
+    """
+    Cliente HTTP del bucle de eventos actual, para reutilizar conexiones
+    (TLS y keep-alive) entre peticiones. Un cliente no puede usarse desde
+    otro bucle, así que hay uno por bucle.
+    """
+    loop = asyncio.get_running_loop()
+    with _clients_lock:
+        client = _clients.get(loop)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(timeout=HTTP_TIMEOUT)
+            _clients[loop] = client
+        return client
+
+async def _get_json(url, service_account_file, scopes, params=None):
+    with span("google.http GET", KIND_CLIENT, require_parent=True, **{"http.url": url}) as current:
+        token = await _access_token(service_account_file, scopes)
+        response = await _client().get(url, params=params, headers={"Authorization": f"Bearer {token}"})
+        if current is not None:
+            current.attributes["http.status_code"] = response.status_code
+        response.raise_for_status()
+        return response.json()
+
+async def fetch_sheet_records(sheet_id, service_account_file, cell_range="A:ZZ"):
+    """
+    Filas de la primera hoja como lista de diccionarios (la primera fila son
+    las cabeceras), igual que worksheet.get_all_records() de gspread.
+    """
+    data = await _get_json(f"{SHEETS_API}/{sheet_id}/values/{cell_range}", service_account_file, SHEETS_SCOPES,
+                           params={"valueRenderOption": "UNFORMATTED_VALUE"})
+    values = data.get("values", [])
+    if not values:
+        return []
+    headers, rows = values[0], values[1:]
+    return [dict(zip(headers, row + [""] * (len(headers) - len(row)))) for row in rows]
+
+async def fetch_sheet_metadata(sheet_id, service_account_file):
+    """
+    Id y título de la hoja de cálculo (llamada ligera para comprobar acceso).
+    """
+    return await _get_json(f"{SHEETS_API}/{sheet_id}", service_account_file, SHEETS_SCOPES,
+                           params={"fields": "spreadsheetId,properties.title"})
+
+async def fetch_calendar_page(calendar_id, service_account_file, max_results=1):
+    """
+    Primera página de eventos del calendario, sin paginar (para sondas).
+    """
+    data = await _get_json(f"{CALENDAR_API}/calendars/{quote(calendar_id, safe='@')}/events", service_account_file,
+                           CALENDAR_SCOPES, params={"maxResults": max_results})
+    return data.get("items", [])
+
+async def fetch_calendar_events(calendar_id, service_account_file, time_min, time_max, page_size=2500):
+    """
+    Eventos (no cancelados) del calendario entre `time_min` y `time_max`,
+    paginando con el tamaño máximo de página.
+    """
+    events = []
+    params = {"timeMin": time_min.isoformat(), "timeMax": time_max.isoformat(),
+              "singleEvents": "true", "maxResults": page_size}
+    while True:
+        data = await _get_json(f"{CALENDAR_API}/calendars/{quote(calendar_id, safe='@')}/events", service_account_file,
+                               CALENDAR_SCOPES, params=params)
+        events.extend(data.get("items", []))
+        if not data.get("nextPageToken"):
+            return events
+        params = {**params, "pageToken": data["nextPageToken"]}
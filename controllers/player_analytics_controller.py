@@ -0,0 +1,172 @@
+# controllers/player_analytics_controller.py
+import numpy as np
+import pandas as pd
+from sqlalchemy import select
+
+from controllers.query_cache import cached_query
+from models.test_model import TestResult
+
+# Métricas de rendimiento de TestResult, en el orden del modelo
+METRIC_COLUMNS = (
+    "ball_control", "control_pass", "receive_scan", "dribling_carriying",
+    "shooting", "crossbar", "sprint", "t_test", "jumping",
+)
+# Métricas de tiempo: un valor menor es mejor
+LOWER_IS_BETTER = frozenset({"sprint", "t_test"})
+
+METRIC_LABELS = {
+    "ball_control": "Control de balón",
+    "control_pass": "Control y pase",
+    "receive_scan": "Recepción y escaneo",
+    "dribling_carriying": "Regate y conducción",
+    "shooting": "Tiro",
+    "crossbar": "Larguero",
+    "sprint": "Sprint (s)",
+    "t_test": "T-test (s)",
+    "jumping": "Salto (cm)",
+}
+
+def load_test_history(db, player_id=None, player_ids=None):
+    """
+    Carga en un DataFrame columnar el historial de tests de un jugador, de
+    varios (`player_ids`) o de todos, con una sola consulta, ordenado por
+    jugador y fecha.
+    """
+    stmt = (select(TestResult.id, TestResult.player_id, TestResult.test_name, TestResult.date,
+                   TestResult.weight, TestResult.height,
+                   *(getattr(TestResult, metric) for metric in METRIC_COLUMNS))
+            .order_by(TestResult.player_id, TestResult.date, TestResult.id))
+    if player_id is not None:
+        stmt = stmt.where(TestResult.player_id == player_id)
+    if player_ids is not None:
+        stmt = stmt.where(TestResult.player_id.in_(list(player_ids)))
+
+    history = pd.read_sql(stmt, db.connection())
+    history["date"] = pd.to_datetime(history["date"])
+    history[list(METRIC_COLUMNS)] = history[list(METRIC_COLUMNS)].astype("float64")
+    return history
+
+def _measured(history):
+    """
+    Historial en formato largo solo con los valores medidos: una fila por
+    (test, métrica) no nula, en el orden del historial. Los tests con pocas
+    métricas (p. ej. importaciones de un solo dispositivo) no cuentan como
+    tests de las demás.
+    """
+    long = history[list(METRIC_COLUMNS)].stack(future_stack=True).dropna()
+    long.index.names = ["row", "metric"]
+    frame = long.rename("value").reset_index()
+    frame["player_id"] = history["player_id"].to_numpy()[history.index.get_indexer(frame["row"])]
+    return frame
+
+def add_rolling_means(history, window=3):
+    """
+    Devuelve el historial con una columna `<métrica>_rolling` por métrica:
+    la media móvil de los últimos `window` tests de cada jugador en los que
+    se midió esa métrica (vacía en los tests que no la midieron).
+    """
+    measured = _measured(history)
+    measured["rolling"] = (measured.groupby(["player_id", "metric"], sort=False)["value"]
+                           .rolling(window, min_periods=1).mean()
+                           .reset_index(level=[0, 1], drop=True))
+    rolling = measured.pivot(index="row", columns="metric", values="rolling")
+    rolling = rolling.reindex(index=history.index, columns=list(METRIC_COLUMNS))
+    return history.join(rolling.add_suffix("_rolling"))
+
+def compute_progression(history, window=3):
+    """
+    Calcula, para cada jugador y métrica, primer y último valor, variación
+    respecto al test anterior y al primero, media móvil, tendencia (cambio
+    por cada 30 días, por mínimos cuadrados) y mejor marca personal. Solo
+    cuentan los tests en los que se midió cada métrica.
+
+    Todo se calcula con operaciones por grupo sobre las nueve columnas a la
+    vez, sin recorrer los tests en Python. Devuelve un DataFrame en formato
+    largo con una fila por (player_id, metric).
+    """
+    metrics = list(METRIC_COLUMNS)
+    if history.empty:
+        return pd.DataFrame(columns=["player_id", "metric", "n_tests", "first", "latest", "delta",
+                                     "change", "rolling_mean", "trend_per_30d", "personal_best",
+                                     "personal_best_date", "improving"])
+
+    values = history[metrics]
+    groups = values.groupby(history["player_id"])
+
+    first = groups.first()
+    latest = groups.last()
+
+    # Variación y media móvil sobre los tests que midieron cada métrica
+    measured = _measured(history)
+    by_metric = measured.groupby(["player_id", "metric"], sort=False)["value"]
+    measured["step"] = measured["value"] - by_metric.shift(1)
+    keys = [measured["player_id"], measured["metric"]]
+    delta = measured["step"].groupby(keys).last().unstack()
+    recent = by_metric.cumcount(ascending=False) < window
+    rolling_mean = measured.loc[recent, "value"].groupby([k[recent] for k in keys]).mean().unstack()
+    delta = delta.reindex(index=first.index, columns=metrics)
+    rolling_mean = rolling_mean.reindex(index=first.index, columns=metrics)
+
+    # Tendencia: pendiente de la recta de regresión valor ~ días, por grupo
+    days = (history["date"] - history.groupby("player_id")["date"].transform("min")).dt.days.to_numpy()
+    mask = values.notna().to_numpy()
+    v = np.where(mask, values.to_numpy(), 0.0)
+    t = np.where(mask, days[:, None], 0.0)
+    sums = pd.DataFrame(
+        np.hstack([mask, t, v, t * v, t * t]),
+        index=history.index,
+    ).groupby(history["player_id"]).sum()
+    k = len(metrics)
+    n, st_, sv, stv, stt = (sums.iloc[:, i * k:(i + 1) * k].to_numpy() for i in range(5))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        slope = (n * stv - st_ * sv) / (n * stt - st_ * st_)
+    trend = pd.DataFrame(slope * 30, index=sums.index, columns=metrics)
+
+    # Mejor marca: mínimo en métricas de tiempo, máximo en el resto
+    lower = [m for m in metrics if m in LOWER_IS_BETTER]
+    higher = [m for m in metrics if m not in LOWER_IS_BETTER]
+    best = pd.concat([groups[higher].max(), groups[lower].min()], axis=1)[metrics]
+    best_idx = pd.concat([groups[higher].idxmax(), groups[lower].idxmin()], axis=1)[metrics]
+    dates = history["date"]
+    best_date = best_idx.apply(lambda col: col.map(dates))
+
+    summary = pd.concat({
+        "n_tests": groups.count(),
+        "first": first,
+        "latest": latest,
+        "delta": delta,
+        "change": latest - first,
+        "rolling_mean": rolling_mean,
+        "trend_per_30d": trend,
+        "personal_best": best,
+        "personal_best_date": best_date,
+    }, axis=1)
+
+    summary = summary.stack(level=1, future_stack=True)
+    summary.index.names = ["player_id", "metric"]
+    summary = summary.reset_index()
+
+    # Mejora: la variación va en la dirección buena de cada métrica
+    sign = np.where(summary["metric"].isin(list(LOWER_IS_BETTER)), -1, 1)
+    summary["improving"] = (summary["change"] * sign) > 0
+    return summary
+
+def player_progression(db, player_id, window=3):
+    """
+    Resumen de progresión de un jugador (compute_progression indexado por
+    métrica) y fechas de su primer y último test, o None si no tiene tests.
+
+    Se cachea por jugador hasta que cambie test_results, para no cargar el
+    historial completo en cada rerun de la página.
+    """
+    def load():
+        history = load_test_history(db, player_id)
+        if history.empty:
+            return None
+        return {
+            "summary": compute_progression(history, window).set_index("metric"),
+            "first_date": history["date"].min(),
+            "last_date": history["date"].max(),
+        }
+
+    return cached_query(("player_progression", player_id, window), (TestResult.__tablename__,), load)
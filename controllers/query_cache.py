@@ -0,0 +1,232 @@
+# controllers/query_cache.py
+#
+# Caché en proceso de consultas de lectura. Cada commit de una sesión con
+# install_invalidation_hooks invalida al momento las entradas de las tablas
+# que modifica, pero solo en este proceso. No la invalidan (y por eso cada
+# entrada caduca a los QUERY_CACHE_MAX_AGE segundos):
+#   - las otras réplicas de Streamlit,
+#   - tools/calendar_webhook.py (lecturas incrementales de Calendar),
+#   - tools/import_tests.py (importación de tests),
+#   - data/*.py y cualquier escritura directa en la BD.
+import time
+import pickle
+import logging
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+from sqlalchemy import Table, event
+from sqlalchemy.sql import visitors
+
+from config import QUERY_CACHE_MAX_ENTRIES, QUERY_CACHE_MAX_MB, QUERY_CACHE_MAX_AGE
+
+logger = logging.getLogger(__name__)
+
+_MISS = object()
+
+# --------------------------------
+# Versiones por tabla
+# --------------------------------
+
+_table_versions = {}
+_versions_lock = threading.Lock()
+_bump_listeners = []   # (tablas, callback)
+
+def bump_tables(*tables):
+    """
+    Incrementa la versión de las tablas indicadas, invalidando todas las
+    entradas de caché que dependan de ellas, y avisa a los suscriptores.
+    """
+    with _versions_lock:
+        for table in tables:
+            _table_versions[table] = _table_versions.get(table, 0) + 1
+
+    for watched, callback in _bump_listeners:
+        if watched.intersection(tables):
+            try:
+                callback()
+            except Exception as e:
+                logger.warning("Error invalidando caché dependiente de %s: %s", sorted(watched), e)
+
+def on_tables_bumped(tables, callback):
+    """
+    Llama a `callback()` cada vez que se modifique alguna de `tables`
+    (p. ej. para invalidar cachés externas al proceso).
+    """
+    _bump_listeners.append((frozenset(tables), callback))
+
+def table_versions(tables):
+    """
+    Devuelve una instantánea de las versiones de `tables` (ordenadas por nombre).
+    """
+    with _versions_lock:
+        return tuple((table, _table_versions.get(table, 0)) for table in sorted(tables))
+
+def tables_in(statement):
+    """
+    Devuelve los nombres de las tablas que lee una sentencia (incluidas las de alias y joins).
+    """
+    return frozenset(e.name for e in visitors.iterate(statement) if isinstance(e, Table))
+
+# --------------------------------
+# Caché LRU con límite de memoria
+# --------------------------------
+
+class QueryCache:
+    """
+    Caché LRU de resultados de consultas, limitada en número de entradas y en
+    bytes. Cada entrada guarda las versiones de las tablas de las que depende y
+    deja de ser válida en cuanto alguna de ellas cambia o cuando pasan
+    `max_age` segundos (cambios hechos por otros procesos).
+    """
+
+    def __init__(self, max_entries=QUERY_CACHE_MAX_ENTRIES, max_bytes=QUERY_CACHE_MAX_MB * 1024 * 1024,
+                 max_age=QUERY_CACHE_MAX_AGE):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self._entries = OrderedDict()   # key -> (versions, size, value, guardada en)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, tables):
+        versions = table_versions(tables)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != versions or time.monotonic() - entry[3] > self.max_age:
+                self.misses += 1
+                return _MISS
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[2]
+
+    def set(self, key, tables, value, versions=None):
+        """
+        Guarda `value`. `versions` debe tomarse antes de ejecutar la consulta
+        para no guardar como vigente un resultado leído antes de una escritura.
+        """
+        versions = versions if versions is not None else table_versions(tables)
+        try:
+            size = len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+        except Exception:
+            # Valores no serializables: no se cachean
+            return
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._entries[key] = (versions, size, value, time.monotonic())
+            self._bytes += size
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                _, (_, evicted_size, _, _) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._bytes,
+                    "hits": self.hits, "misses": self.misses}
+
+query_cache = QueryCache()
+
+def cached_query(key, tables, loader):
+    """
+    Devuelve el resultado cacheado para `key` o lo calcula con `loader()`.
+    `tables` son las tablas cuya modificación invalida el resultado.
+    """
+    value = query_cache.get(key, tables)
+    if value is not _MISS:
+        return value
+
+    versions = table_versions(tables)
+    value = loader()
+    query_cache.set(key, tables, value, versions)
+    return value
+
+def _statement_key(db, statement):
+    """
+    Clave de caché a partir del SQL compilado y sus parámetros.
+    """
+    compiled = statement.compile(dialect=db.get_bind().dialect)
+    params = tuple(sorted((k, tuple(v) if isinstance(v, list) else v) for k, v in compiled.params.items()))
+    return (str(compiled), params)
+
+def cached_select(db, statement):
+    """
+    Ejecuta una SELECT y devuelve sus filas como lista de diccionarios,
+    usando la caché mientras no cambie ninguna de las tablas leídas.
+    """
+    return cached_query(
+        _statement_key(db, statement),
+        tables_in(statement),
+        lambda: [dict(row) for row in db.execute(statement).mappings()],
+    )
+
+def cached_frame(db, statement, prepare=None):
+    """
+    Igual que cached_select pero construye directamente un DataFrame
+    columnar con pd.read_sql. `prepare` ajusta tipos (categorías, fechas)
+    antes de guardarlo. El DataFrame se comparte: no modificarlo in situ.
+    """
+    def load():
+        frame = pd.read_sql(statement, db.connection())
+        return prepare(frame) if prepare else frame
+
+    return cached_query(("frame",) + _statement_key(db, statement), tables_in(statement), load)
+
+def cached_scalar(db, statement):
+    """
+    Igual que cached_select pero para consultas que devuelven un único valor.
+    """
+    return cached_query(
+        ("scalar",) + _statement_key(db, statement),
+        tables_in(statement),
+        lambda: db.execute(statement).scalar(),
+    )
+
+# --------------------------------
+# Invalidación al hacer commit
+# --------------------------------
+
+def install_invalidation_hooks(session_factory):
+    """
+    Registra en el sessionmaker los eventos que anotan las tablas modificadas
+    en cada transacción y suben su versión al hacer commit.
+    """
+    def _pending(session):
+        return session.info.setdefault("modified_tables", set())
+
+    @event.listens_for(session_factory, "after_flush")
+    def _collect_flushed(session, flush_context):
+        pending = _pending(session)
+        for obj in (*session.new, *session.dirty, *session.deleted):
+            table = getattr(obj, "__table__", None)
+            if table is not None:
+                pending.add(table.name)
+
+    @event.listens_for(session_factory, "do_orm_execute")
+    def _collect_bulk(orm_execute_state):
+        # insert()/update()/delete() ejecutados directamente, sin pasar por el flush
+        if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+            table = getattr(orm_execute_state.statement, "table", None)
+            if table is not None:
+                _pending(orm_execute_state.session).add(table.name)
+
+    @event.listens_for(session_factory, "after_commit")
+    def _bump_on_commit(session):
+        modified = session.info.pop("modified_tables", None)
+        if modified:
+            bump_tables(*modified)
+
+    @event.listens_for(session_factory, "after_rollback")
+    def _discard_on_rollback(session):
+        session.info.pop("modified_tables", None)
@@ -0,0 +1,261 @@
+# controllers/rankings_controller.py
+import math
+import time
+import logging
+import threading
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import select, func, case, extract, literal, union_all
+
+from controllers.player_analytics_controller import METRIC_COLUMNS, LOWER_IS_BETTER
+from controllers.query_cache import table_versions
+from models.player_model import Player
+from models.test_model import TestResult
+from models.user_model import User
+
+logger = logging.getLogger(__name__)
+
+# Grupos de edad (edad en años cumplidos, límite superior excluido)
+AGE_BINS = [0, 10, 12, 14, 16, 19, 200]
+AGE_LABELS = ["Sub-10", "Sub-12", "Sub-14", "Sub-16", "Sub-19", "Adulto"]
+NO_AGE_GROUP = "Sin fecha"
+
+# Tablas de las que dependen los rankings
+_TABLES = ("test_results", "players", "users")
+# Comprobación periódica contra la BD para ver escrituras de otros procesos
+MAX_AGE_SECONDS = 300
+# Columnas que afectan a los rankings: su suma por columna hace de checksum de los tests
+_CHECKSUM_COLUMNS = (TestResult.player_id, extract("epoch", TestResult.date),
+                     *(getattr(TestResult, metric) for metric in METRIC_COLUMNS))
+
+def age_groups(date_of_birth, today=None):
+    """
+    Asigna el grupo de edad de cada fecha de nacimiento (Series vectorizada).
+    """
+    today = pd.Timestamp(today or datetime.now())
+    dob = pd.to_datetime(date_of_birth)
+    # Restar un año si aún no ha sido el cumpleaños este año
+    birthday_pending = (dob.dt.month > today.month) | ((dob.dt.month == today.month) & (dob.dt.day > today.day))
+    age = today.year - dob.dt.year - birthday_pending.astype(int)
+    groups = pd.cut(age, bins=AGE_BINS, labels=AGE_LABELS, right=False)
+    return groups.cat.add_categories([NO_AGE_GROUP]).fillna(NO_AGE_GROUP)
+
+def latest_values(db, player_ids=None, max_id=None):
+    """
+    Último valor medido de cada jugador en cada métrica (jugadores × métricas),
+    calculado en la BD: por métrica, la fecha máxima con valor de cada
+    jugador y su fila (índice player_id, date). Solo viajan a pandas como
+    mucho jugadores × métricas filas, no el historial completo.
+    `max_id` limita a los tests con id <= max_id.
+    """
+    def scoped(stmt, column):
+        stmt = stmt.where(column.isnot(None))
+        if player_ids is not None:
+            stmt = stmt.where(TestResult.player_id.in_(list(player_ids)))
+        if max_id is not None:
+            stmt = stmt.where(TestResult.id <= max_id)
+        return stmt
+
+    parts = []
+    for metric in METRIC_COLUMNS:
+        column = getattr(TestResult, metric)
+        last = scoped(select(TestResult.player_id, func.max(TestResult.date).label("date")), column) \
+            .group_by(TestResult.player_id).subquery()
+        parts.append(scoped(select(TestResult.id, TestResult.player_id, literal(metric).label("metric"),
+                                   column.label("value"))
+                            .join(last, (TestResult.player_id == last.c.player_id) & (TestResult.date == last.c.date)),
+                            column))
+
+    rows = db.execute(union_all(*parts)).all()
+    frame = pd.DataFrame(rows, columns=["id", "player_id", "metric", "value"])
+    # Varios tests con la misma fecha: el de mayor id, como en el historial
+    frame = frame.sort_values("id").drop_duplicates(["player_id", "metric"], keep="last")
+    latest = frame.pivot(index="player_id", columns="metric", values="value")
+    return latest.reindex(columns=list(METRIC_COLUMNS)).astype("float64").rename_axis(columns=None)
+
+class MetricRankings:
+    """
+    Matriz precalculada con el último valor de cada jugador en cada métrica y
+    su percentil y z-score dentro de su grupo de edad.
+
+    Las lecturas son búsquedas en un índice por jugador. La matriz se
+    refresca de forma incremental: solo se recargan los jugadores con tests
+    nuevos y se recalculan los grupos de edad afectados. Las ediciones y
+    borrados de tests ya cargados (detectados con un checksum) fuerzan un
+    recálculo completo.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._latest = pd.DataFrame(columns=list(METRIC_COLUMNS), dtype="float64")
+        self._age_group = pd.Series(dtype="object")
+        self._table = pd.DataFrame()
+        self._by_player = pd.DataFrame()
+        self._versions = None
+        self._max_id = 0
+        self._count = 0
+        self._checksum = None
+        self._checked_at = 0.0
+
+    # ---------- refresco ----------
+
+    def refresh(self, db, player_ids=None):
+        """
+        Pone la matriz al día. Sin cambios en las tablas no hace ninguna consulta.
+        `player_ids` fuerza recargar esos jugadores (p. ej. tras una importación).
+        """
+        with self._lock:
+            versions = table_versions(_TABLES)
+            stale = time.time() - self._checked_at > MAX_AGE_SECONDS
+            if versions == self._versions and not stale and not player_ids:
+                return
+
+            if self._versions is None:
+                self._rebuild(db)
+            else:
+                self._refresh_incremental(db, versions, set(player_ids or ()), stale)
+            self._versions = versions
+            self._checked_at = time.time()
+
+    def _summary(self, db):
+        """
+        (max_id, número de tests, tests nuevos, checksum de los tests ya
+        cargados, checksum de todos) en una sola consulta.
+        """
+        loaded = TestResult.id <= self._max_id
+        row = db.execute(select(
+            func.max(TestResult.id),
+            func.count(TestResult.id),
+            func.sum(case((TestResult.id > self._max_id, 1), else_=0)),
+            *(func.sum(case((loaded, column))) for column in _CHECKSUM_COLUMNS),
+            *(func.sum(column) for column in _CHECKSUM_COLUMNS),
+        )).one()
+        k = len(_CHECKSUM_COLUMNS)
+        return row[0] or 0, row[1], row[2] or 0, tuple(row[3:3 + k]), tuple(row[3 + k:])
+
+    def _checksum_matches(self, checksum):
+        if self._checksum is None:
+            return False
+        # Con tolerancia: la suma en coma flotante puede variar con el orden de lectura
+        return all(a == b or (a is not None and b is not None and math.isclose(a, b, rel_tol=1e-9))
+                   for a, b in zip(checksum, self._checksum))
+
+    def _refresh_incremental(self, db, versions, player_ids, stale):
+        max_id, count, added, loaded_checksum, checksum = self._summary(db)
+
+        if count - self._count != added or not self._checksum_matches(loaded_checksum):
+            # Borrados o ediciones de tests existentes: recálculo completo
+            self._rebuild(db)
+            return
+
+        if added:
+            player_ids |= set(db.execute(select(TestResult.player_id)
+                                         .where(TestResult.id > self._max_id).distinct()).scalars())
+        people_changed = [v for v in versions if v[0] != "test_results"] != \
+                         [v for v in self._versions if v[0] != "test_results"]
+        # Los grupos de edad se recargan también en la comprobación periódica
+        # (jugadores creados por otros procesos, cumpleaños) y si aparece un
+        # jugador que no tenían
+        regroup = False
+        if people_changed or stale or not player_ids.issubset(self._age_group.index):
+            age_group = self._load_age_groups(db)
+            regroup = not age_group.equals(self._age_group)
+            self._age_group = age_group
+
+        if player_ids:
+            latest = latest_values(db, player_ids=player_ids, max_id=max_id)
+            self._latest = pd.concat([self._latest.drop(index=latest.index, errors="ignore"), latest]).sort_index()
+        self._max_id, self._count, self._checksum = max_id, count, checksum
+
+        if regroup:
+            self._rank(groups=None)
+        elif player_ids:
+            self._rank(groups=set(self._age_group.reindex(list(player_ids)).fillna(NO_AGE_GROUP)))
+
+    def _load_age_groups(self, db):
+        rows = db.execute(select(Player.player_id, User.date_of_birth)
+                          .join(User, Player.user_id == User.user_id)).all()
+        frame = pd.DataFrame(rows, columns=["player_id", "date_of_birth"]).set_index("player_id")
+        return age_groups(frame["date_of_birth"]).astype(str)
+
+    def _rebuild(self, db):
+        self._max_id = self._count = 0
+        max_id, count, _, _, checksum = self._summary(db)
+        self._latest = latest_values(db, max_id=max_id)
+        self._age_group = self._load_age_groups(db)
+        self._max_id, self._count, self._checksum = max_id, count, checksum
+        self._rank(groups=None)
+        logger.info("Rankings recalculados para %s jugadores", len(self._latest))
+
+    def _rank(self, groups):
+        """
+        Recalcula percentiles y z-scores de los grupos de edad indicados
+        (todos si `groups` es None). Percentil y z-score se orientan para que
+        un valor más alto signifique siempre mejor rendimiento.
+        """
+        metrics = list(METRIC_COLUMNS)
+        latest = self._latest
+        group = self._age_group.reindex(latest.index).fillna(NO_AGE_GROUP)
+        if groups is not None:
+            mask = group.isin(groups)
+            latest, group = latest[mask], group[mask]
+
+        sign = np.array([-1.0 if m in LOWER_IS_BETTER else 1.0 for m in metrics])
+        oriented = latest[metrics] * sign
+        grouped = oriented.groupby(group)
+        percentile = grouped.rank(pct=True) * 100
+        mean = grouped.transform("mean")
+        std = grouped.transform("std", ddof=0)
+        # Grupos de un solo jugador (desviación 0): z-score 0
+        z_score = ((oriented - mean) / std.where(std > 0)).fillna(0.0).where(oriented.notna())
+        group_size = grouped.transform("count")
+
+        table = pd.concat({
+            "value": latest[metrics],
+            "percentile": percentile,
+            "z_score": z_score,
+            "group_size": group_size,
+        }, axis=1)
+        table[("age_group", "")] = group
+
+        if groups is not None and not self._table.empty:
+            keep = ~self._table[("age_group", "")].isin(groups)
+            table = pd.concat([self._table[keep & ~self._table.index.isin(table.index)], table]).sort_index()
+        self._table = table
+
+        # Formato largo indexado por (jugador, métrica) para lecturas por jugador
+        by_player = table.drop(columns=[("age_group", "")]).stack(level=1, future_stack=True)
+        by_player.index.names = ["player_id", "metric"]
+        by_player["age_group"] = table[("age_group", "")].reindex(
+            by_player.index.get_level_values("player_id")).to_numpy()
+        self._by_player = by_player
+
+    # ---------- lecturas ----------
+
+    def for_player(self, db, player_id):
+        """
+        Rankings de un jugador: una fila por métrica con valor, percentil,
+        z-score, tamaño del grupo y grupo de edad. None si no tiene tests.
+        """
+        self.refresh(db)
+        try:
+            return self._by_player.xs(player_id, level="player_id")
+        except KeyError:
+            return None
+
+    def matrix(self, db):
+        """
+        Matriz completa de rankings (jugadores × métricas) para comparativas.
+        """
+        self.refresh(db)
+        return self._table
+
+_rankings = MetricRankings()
+
+def get_rankings():
+    """
+    Devuelve la matriz de rankings compartida por el proceso.
+    """
+    return _rankings
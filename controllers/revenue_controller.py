@@ -0,0 +1,144 @@
+# controllers/revenue_controller.py
+import unicodedata
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import select, func
+
+from controllers.query_cache import cached_query, cached_select
+from controllers.sql_functions import date_bucket
+from models.coach_model import Coach
+from models.player_model import Player
+from models.session_model import Session, SessionStatus
+from models.user_model import User
+
+MONTHS_ES = {
+    "enero": 1, "febrero": 2, "marzo": 3, "abril": 4, "mayo": 5, "junio": 6, "julio": 7,
+    "agosto": 8, "septiembre": 9, "setiembre": 9, "octubre": 10, "noviembre": 11, "diciembre": 12,
+}
+
+# Tablas de las que depende el análisis (además de la hoja financiera)
+_TABLES = ("sessions", "players", "coaches", "users")
+
+def _month_number(name):
+    text = unicodedata.normalize("NFKD", str(name)).encode("ascii", "ignore").decode().strip().lower()
+    return MONTHS_ES.get(text)
+
+def financial_revision(df):
+    """
+    Huella del contenido de la hoja financiera: cambia si cambia cualquier celda.
+    """
+    return int(pd.util.hash_pandas_object(df, index=True).sum() & 0xFFFFFFFFFFFF)
+
+def financial_years(df):
+    """
+    Años que cubre la hoja financiera. Sin columna "Año" no se sabe: se
+    asume que es del año en curso (y no de cualquier año que se consulte).
+    """
+    if "Año" not in df.columns:
+        return {datetime.now().year}
+    return set(pd.to_numeric(df["Año"], errors="coerce").dropna().astype(int))
+
+def financial_months(df, year):
+    """
+    Normaliza la hoja financiera a una fila por mes (columna `month`, primer
+    día del mes) con ingresos y gastos de `year`. Vacío si la hoja no cubre
+    ese año (ver financial_years). Las filas con un mes no reconocido se descartan.
+    """
+    if year not in financial_years(df):
+        df = df.iloc[0:0]
+    months = df["Mes"].map(_month_number) if "Mes" in df.columns else pd.Series(np.nan, index=df.index)
+    years = pd.to_numeric(df["Año"], errors="coerce") if "Año" in df.columns else year
+    frame = pd.DataFrame({
+        "month": pd.to_datetime(pd.DataFrame({"year": years, "month": months, "day": 1}), errors="coerce"),
+        "revenue": pd.to_numeric(df["Ingresos"], errors="coerce") if "Ingresos" in df.columns else np.nan,
+        "costs": pd.to_numeric(df["Gastos"], errors="coerce") if "Gastos" in df.columns else np.nan,
+    })
+    frame = frame.dropna(subset=["month"])
+    months = frame[frame["month"].dt.year == year].groupby("month", as_index=False)[["revenue", "costs"]].sum()
+    return months.astype({"revenue": "float64", "costs": "float64"})
+
+def session_years(db):
+    """
+    Años con sesiones registradas, del más reciente al más antiguo.
+    """
+    row = cached_select(db, select(func.min(Session.start_time).label("first"),
+                                   func.max(Session.start_time).label("last")))[0]
+    if row["first"] is None:
+        return [datetime.now().year]
+    return list(range(pd.Timestamp(row["last"]).year, pd.Timestamp(row["first"]).year - 1, -1))
+
+def _session_counts(db, year):
+    """
+    Sesiones facturables (no canceladas) por mes, coach y servicio, con un GROUP BY.
+    """
+    month = date_bucket(Session.start_time, "month", db.get_bind().dialect.name).label("month")
+    stmt = (select(month, Coach.coach_id, User.name.label("coach_name"), Player.service,
+                   func.count(Session.id).label("sessions"))
+            .join(Coach, Session.coach_id == Coach.coach_id)
+            .join(User, Coach.user_id == User.user_id)
+            .join(Player, Session.player_id == Player.player_id)
+            .where(Session.status != SessionStatus.CANCELED)
+            .where(Session.start_time >= datetime(year, 1, 1), Session.start_time < datetime(year + 1, 1, 1))
+            .group_by(month, Coach.coach_id, User.name, Player.service))
+    counts = pd.DataFrame([dict(row) for row in db.execute(stmt).mappings()],
+                          columns=["month", "coach_id", "coach_name", "service", "sessions"])
+    counts["month"] = pd.to_datetime(counts["month"])
+    counts["sessions"] = counts["sessions"].astype("int64")
+    counts["service"] = counts["service"].fillna("Sin servicio")
+    return counts
+
+def _summarize(detail, by):
+    # Sin tarifas por coach ni por servicio el margen por sesión sería el mismo
+    # para todos (la media del mes), así que aquí no se calcula margen
+    summary = detail.groupby(by, as_index=False)[["sessions", "revenue", "costs"]].sum(min_count=1)
+    total = summary["sessions"].sum()
+    summary["share"] = summary["sessions"] / total if total else np.nan
+    return summary
+
+def _compute_revenue_analytics(db, financials, year):
+    months = financial_months(financials, year)
+    counts = _session_counts(db, year)
+
+    # Mensual: ingresos y gastos frente a sesiones del mes
+    monthly = months.merge(counts.groupby("month", as_index=False)["sessions"].sum(), on="month", how="outer")
+    monthly = monthly.fillna({"sessions": 0}).sort_values("month").reset_index(drop=True)
+    per_session = monthly["sessions"].where(monthly["sessions"] > 0)
+    monthly["revenue_per_session"] = monthly["revenue"] / per_session
+    monthly["cost_per_session"] = monthly["costs"] / per_session
+    monthly["margin_per_session"] = monthly["revenue_per_session"] - monthly["cost_per_session"]
+
+    # Reparto de ingresos y gastos de cada mes según las sesiones de cada coach y servicio
+    detail = counts.merge(monthly[["month", "revenue_per_session", "cost_per_session"]], on="month", how="left")
+    detail["revenue"] = detail["sessions"] * detail["revenue_per_session"]
+    detail["costs"] = detail["sessions"] * detail["cost_per_session"]
+
+    return {
+        "monthly": monthly,
+        "by_coach": _summarize(detail, ["coach_id", "coach_name"]),
+        "by_service": _summarize(detail, ["service"]),
+        "detail": detail,
+        "covered": year in financial_years(financials),
+        "assumed_year": "Año" not in financials.columns,
+    }
+
+def get_revenue_analytics(db, financials, year):
+    """
+    Relaciona la hoja financiera con la actividad registrada en la BD.
+
+    Devuelve un diccionario de DataFrames:
+      - monthly: ingresos, gastos y sesiones por mes, con ingreso, coste y
+        margen por sesión.
+      - by_coach / by_service: sesiones, cuota de sesiones e ingresos y
+        gastos imputados en proporción a las sesiones de cada mes. Sin
+        margen: con un reparto proporcional saldría igual para todos.
+      - detail: sesiones e importes por mes, coach y servicio.
+      - covered: si la hoja tiene cifras de `year` (si no, solo sesiones).
+      - assumed_year: la hoja no tiene columna "Año" y se ha asumido el año en curso.
+
+    El resultado se cachea por revisión de la hoja financiera y año, y se
+    invalida al modificar sesiones, jugadores o coaches.
+    """
+    key = ("revenue_analytics", financial_revision(financials), year)
+    return cached_query(key, _TABLES, lambda: _compute_revenue_analytics(db, financials, year))
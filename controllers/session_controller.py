@@ -1,18 +1,22 @@
 # controllers/session_controller.py
 from common.calendar_manager import create_calendar_event, update_calendar_event, delete_calendar_event
 from models.session_model import Session, SessionStatus
-from sqlalchemy.orm import Session as DBSession
+from models.coach_model import Coach
+from models.player_model import Player
+from models.user_model import User
+from sqlalchemy import select, union_all
+from sqlalchemy.orm import Session as DBSession, aliased
 from sqlalchemy.exc import SQLAlchemyError
 from controllers.db_controller import get_session_local  # Importar la función, no la variable
+from controllers.query_cache import cached_frame
 from datetime import datetime
 import logging
+import pandas as pd
 
 # Obtener el sessionmaker
 SessionLocal = get_session_local()  # Crear la variable SessionLocal aquí
 
-# Configuración de logging
-logging.basicConfig(level=logging.INFO, 
-                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+# Logging configurado en common/logging_config.py
 logger = logging.getLogger(__name__)
 
 def create_session(db: DBSession, coach_id: int, player_id: int, start_time: datetime, end_time: datetime, notes: str = ""):
@@ -34,7 +38,7 @@ def create_session(db: DBSession, coach_id: int, player_id: int, start_time: dat
 
     except Exception as e:
         db.rollback()
-        logger.error(f"Error creando sesión: {e}")
+        logger.error("Error creando sesión: %s", e)
         return None
 
 def update_session(db: DBSession, session_id: int, start_time: datetime = None, end_time: datetime = None, status: SessionStatus = None, notes: str = None):
@@ -53,12 +57,11 @@ def update_session(db: DBSession, session_id: int, start_time: datetime = None,
         if notes is not None:
             session.notes = notes
 
-        # Si existe un evento de calendario, lo marcamos como 'pendiente de actualizar'
-        # en lugar de intentar actualizarlo ahora
+        # Si existe un evento de calendario no lo actualizamos ahora: el contenido
+        # ya no coincide con calendar_event_hash, así que reconcile_calendar
+        # detectará la diferencia y la enviará a Calendar
         if session.calendar_event_id:
-            # Aquí podríamos añadir un campo en la BD para marcar como "pendiente de actualizar"
-            # Por ahora, simplemente mostramos un log
-            logger.info(f"Sesión {session_id} actualizada en BD, pendiente de sincronizar con Calendar")
+            logger.info("Sesión %s actualizada en BD, pendiente de sincronizar con Calendar", session_id)
 
         db.commit()
         db.refresh(session)
@@ -66,7 +69,7 @@ def update_session(db: DBSession, session_id: int, start_time: datetime = None,
 
     except Exception as e:
         db.rollback()
-        logger.error(f"Error actualizando sesión: {e}")
+        logger.error("Error actualizando sesión: %s", e)
         return None
 
 def delete_session(db: DBSession, session_id: int):
@@ -80,9 +83,9 @@ def delete_session(db: DBSession, session_id: int):
             try:
                 # En modo offline, simplemente llamamos a la función que no hace nada real
                 delete_calendar_event(session.calendar_event_id)
-                logger.info(f"Evento {session.calendar_event_id} marcado para eliminación (modo offline)")
+                logger.info("Evento %s marcado para eliminación (modo offline)", session.calendar_event_id)
             except Exception as calendar_error:
-                logger.error(f"Error al marcar evento para eliminación: {calendar_error}")
+                logger.error("Error al marcar evento para eliminación: %s", calendar_error)
 
         db.delete(session)
         db.commit()
@@ -90,7 +93,7 @@ def delete_session(db: DBSession, session_id: int):
 
     except Exception as e:
         db.rollback()
-        logger.error(f"Error eliminando sesión: {e}")
+        logger.error("Error eliminando sesión: %s", e)
         return False
 
 def get_sessions_by_player_id(player_id):
@@ -102,7 +105,7 @@ def get_sessions_by_player_id(player_id):
             sessions = session.query(Session).filter(Session.player_id == player_id).all()
             return sessions
     except SQLAlchemyError as e:
-        logger.error(f"Error al obtener sesiones para el jugador: {e}")
+        logger.error("Error al obtener sesiones para el jugador: %s", e)
         return None
 
 def get_sessions_by_coach_id(coach_id):
@@ -114,5 +117,53 @@ def get_sessions_by_coach_id(coach_id):
             sessions = session.query(Session).filter(Session.coach_id == coach_id).all()
             return sessions
     except SQLAlchemyError as e:
-        logger.error(f"Error al obtener sesiones para el entrenador: {e}")
-        return None
\ No newline at end of file
+        logger.error("Error al obtener sesiones para el entrenador: %s", e)
+        return None
+
+def _prepare_session_frame(frame):
+    frame["start_time"] = pd.to_datetime(frame["start_time"])
+    frame["end_time"] = pd.to_datetime(frame["end_time"])
+    frame["status"] = pd.Categorical(frame["status"].map({status: status.value for status in SessionStatus}),
+                                     categories=[status.value for status in SessionStatus])
+    for column in ("coach_name", "player_name"):
+        frame[column] = frame[column].fillna("Desconocido").astype("category")
+    return frame
+
+def _session_select(coach_id=None):
+    coach_user = aliased(User)
+    player_user = aliased(User)
+    stmt = (select(Session.id, Session.coach_id, Session.player_id, Session.start_time, Session.end_time,
+                   Session.status, Session.calendar_event_id,
+                   coach_user.name.label("coach_name"), player_user.name.label("player_name"))
+            .outerjoin(Coach, Session.coach_id == Coach.coach_id)
+            .outerjoin(coach_user, Coach.user_id == coach_user.user_id)
+            .outerjoin(Player, Session.player_id == Player.player_id)
+            .outerjoin(player_user, Player.user_id == player_user.user_id))
+    if coach_id is not None:
+        stmt = stmt.where(Session.coach_id == coach_id)
+    return stmt
+
+def session_frame(db: DBSession, coach_id: int = None):
+    """
+    Devuelve las sesiones (todas o las de un entrenador) con los nombres de
+    coach y jugador en un DataFrame columnar: fechas como datetime64 y
+    estado, coach y jugador como categorías. Una sola consulta, cacheada
+    hasta el próximo cambio en las tablas leídas.
+    """
+    return cached_frame(db, _session_select(coach_id).order_by(Session.id), prepare=_prepare_session_frame)
+
+def sessions_around(db: DBSession, day: datetime, limit: int, coach_id: int = None):
+    """
+    Como session_frame, pero solo las `limit` sesiones más próximas a `day`:
+    la mitad desde ese día en adelante y el resto las anteriores más
+    recientes, ordenadas por inicio. Para selectores que no pueden listar
+    todas las sesiones.
+    """
+    base = _session_select(coach_id)
+    upcoming = (base.where(Session.start_time >= day)
+                .order_by(Session.start_time, Session.id).limit(limit // 2).subquery())
+    past = (base.where(Session.start_time < day)
+            .order_by(Session.start_time.desc(), Session.id.desc()).limit(limit - limit // 2).subquery())
+    both = union_all(select(upcoming), select(past)).subquery()
+    stmt = select(both).order_by(both.c.start_time, both.c.id)
+    return cached_frame(db, stmt, prepare=_prepare_session_frame)
@@ -4,18 +4,21 @@ import pandas as pd
 import gspread
 from google.oauth2 import service_account
 import logging
-import streamlit as st
 from config import GOOGLE_SHEET_ID, SERVICE_ACCOUNT  # Importar directamente de config.py
+from common.cache import shared_cached
+from common.tracing import KIND_CLIENT, KIND_INTERNAL, span, traced
+from controllers.google_http import fetch_sheet_records
 
-# Configuración de logging
-logging.basicConfig(level=logging.INFO, 
-                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+# Logging configurado en common/logging_config.py
 logger = logging.getLogger(__name__)
 
 # Flag para indicar si estamos en modo offline/fallback
 sheets_offline_mode = False
 
-@st.cache_data(ttl=3600)  # Cache por 1 hora
+# Las funciones cacheadas se trazan como internas: un acierto de caché no es
+# una llamada a Google; la llamada real lleva su propio span cliente
+@traced("sheets.get_financials", kind=KIND_INTERNAL)
+@shared_cached(ttl=3600, name="sheets:financials")  # Cache por 1 hora, compartida entre réplicas
 def get_financials():
     """
     Obtiene datos financieros desde Google Sheets.
@@ -24,8 +27,8 @@ def get_financials():
     global sheets_offline_mode
     
     # Registrar información de las variables
-    logger.info(f"Usando archivo de credenciales: {SERVICE_ACCOUNT}")
-    logger.info(f"Usando ID de Google Sheet: {GOOGLE_SHEET_ID}")
+    logger.info("Usando archivo de credenciales: %s", SERVICE_ACCOUNT)
+    logger.info("Usando ID de Google Sheet: %s", GOOGLE_SHEET_ID)
     
     # Si ya sabemos que hay problemas de autenticación, ir directamente al modo fallback
     if sheets_offline_mode:
@@ -35,7 +38,7 @@ def get_financials():
     try:
         # Verificar que tenemos las credenciales y el ID de la hoja
         if not SERVICE_ACCOUNT or not os.path.exists(SERVICE_ACCOUNT):
-            logger.error(f"Archivo de credenciales no encontrado: {SERVICE_ACCOUNT}")
+            logger.error("Archivo de credenciales no encontrado: %s", SERVICE_ACCOUNT)
             sheets_offline_mode = True
             return _get_fallback_financial_data()
             
@@ -49,14 +52,15 @@ def get_financials():
         credentials = service_account.Credentials.from_service_account_file(
             SERVICE_ACCOUNT, scopes=scope)
         
-        client = gspread.authorize(credentials)
-        sheet = client.open_by_key(GOOGLE_SHEET_ID)
-        
-        # Obtener la primera hoja (asumiendo que contiene los datos financieros)
-        worksheet = sheet.get_worksheet(0)
-        
-        # Obtener todos los datos y convertir a DataFrame
-        data = worksheet.get_all_records()
+        with span("google.sheets get_all_records", KIND_CLIENT, require_parent=True):
+            client = gspread.authorize(credentials)
+            sheet = client.open_by_key(GOOGLE_SHEET_ID)
+
+            # Obtener la primera hoja (asumiendo que contiene los datos financieros)
+            worksheet = sheet.get_worksheet(0)
+
+            # Obtener todos los datos y convertir a DataFrame
+            data = worksheet.get_all_records()
         df = pd.DataFrame(data)
         
         # Registrar éxito
@@ -66,7 +70,7 @@ def get_financials():
         
     except Exception as e:
         # Registrar el error
-        logger.error(f"Error al obtener datos financieros: {str(e)}")
+        logger.error("Error al obtener datos financieros: %s", e)
         
         # Marcar que estamos en modo offline para futuros intentos
         sheets_offline_mode = True
@@ -74,6 +78,33 @@ def get_financials():
         # Devolver datos de respaldo
         return _get_fallback_financial_data()
 
+@traced("sheets.fetch_financials", kind=KIND_INTERNAL)
+@shared_cached(ttl=3600, name="sheets:financials")  # Misma caché que get_financials
+async def fetch_financials():
+    """
+    Versión asíncrona de get_financials: lee la hoja con la API REST de
+    Sheets (httpx) para poder esperarla junto a otras fuentes.
+    """
+    global sheets_offline_mode
+
+    if sheets_offline_mode:
+        logger.warning("Usando datos financieros de respaldo (modo offline)")
+        return _get_fallback_financial_data()
+
+    if not SERVICE_ACCOUNT or not os.path.exists(SERVICE_ACCOUNT) or not GOOGLE_SHEET_ID:
+        logger.error("Credenciales o ID de Google Sheet no configurados")
+        sheets_offline_mode = True
+        return _get_fallback_financial_data()
+
+    try:
+        df = pd.DataFrame(await fetch_sheet_records(GOOGLE_SHEET_ID, SERVICE_ACCOUNT))
+        logger.info("Datos financieros obtenidos exitosamente desde Google Sheets")
+        return df
+    except Exception as e:
+        logger.error("Error al obtener datos financieros: %s", e)
+        sheets_offline_mode = True
+        return _get_fallback_financial_data()
+
 def _get_fallback_financial_data():
     """
     Genera datos financieros de respaldo en caso de error de conectividad o autenticación.
@@ -92,6 +123,7 @@ def _get_fallback_financial_data():
     return pd.DataFrame(data)
 
 # Función para probar la conectividad a Google Sheets (útil para diagnóstico)
+@traced("sheets.test_connection")
 def test_sheets_connection():
     """
     Prueba la conexión a Google Sheets y devuelve un mensaje de diagnóstico.
@@ -150,6 +182,6 @@ def reset_offline_mode():
     """
     global sheets_offline_mode
     sheets_offline_mode = False
-    # Limpiar también la caché de streamlit para la función get_financials
+    # Limpiar también la caché compartida de la función get_financials
     get_financials.clear()
     return True
\ No newline at end of file
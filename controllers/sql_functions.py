@@ -0,0 +1,52 @@
+# controllers/sql_functions.py
+# Expresiones SQL de fechas que dependen del motor (SQLite en local, PostgreSQL en producción).
+from sqlalchemy import Integer, cast, extract, func
+
+BUCKETS = ("week", "month")
+
+def date_bucket(column, bucket, dialect_name):
+    """
+    Devuelve una expresión con el inicio del periodo (lunes de la semana o
+    día 1 del mes) al que pertenece `column`, para agrupar con GROUP BY.
+    """
+    if bucket not in BUCKETS:
+        raise ValueError(f"Periodo no soportado: {bucket}")
+
+    if dialect_name == "sqlite":
+        if bucket == "week":
+            # Siguiente domingo (o el mismo día) menos 6 días = lunes de la semana
+            return func.date(column, "weekday 0", "-6 days")
+        return func.date(column, "start of month")
+    if dialect_name == "postgresql":
+        return func.date_trunc(bucket, column)
+    raise ValueError(f"Motor de base de datos no soportado: {dialect_name}")
+
+def weekday(column, dialect_name):
+    """
+    Día de la semana como entero, 0 = domingo … 6 = sábado (igual en ambos motores).
+    """
+    if dialect_name == "sqlite":
+        return cast(func.strftime("%w", column), Integer)
+    if dialect_name == "postgresql":
+        return cast(extract("dow", column), Integer)
+    raise ValueError(f"Motor de base de datos no soportado: {dialect_name}")
+
+def hour_of_day(column, dialect_name):
+    """
+    Hora del día (0-23) como entero.
+    """
+    if dialect_name == "sqlite":
+        return cast(func.strftime("%H", column), Integer)
+    if dialect_name == "postgresql":
+        return cast(extract("hour", column), Integer)
+    raise ValueError(f"Motor de base de datos no soportado: {dialect_name}")
+
+def duration_hours(start, end, dialect_name):
+    """
+    Duración en horas entre dos columnas de fecha y hora.
+    """
+    if dialect_name == "sqlite":
+        return (func.julianday(end) - func.julianday(start)) * 24
+    if dialect_name == "postgresql":
+        return extract("epoch", end - start) / 3600
+    raise ValueError(f"Motor de base de datos no soportado: {dialect_name}")
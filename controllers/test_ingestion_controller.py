@@ -0,0 +1,179 @@
+# controllers/test_ingestion_controller.py
+import logging
+
+import pandas as pd
+from sqlalchemy import select, insert
+
+from controllers.player_analytics_controller import METRIC_COLUMNS
+from controllers.query_cache import cached_select
+from controllers.rankings_controller import get_rankings
+from models.player_model import Player
+from models.test_model import TestResult
+from models.user_model import User
+
+logger = logging.getLogger(__name__)
+
+# Campos de TestResult que se pueden importar
+NUMERIC_FIELDS = ("weight", "height", *METRIC_COLUMNS)
+INSERT_FIELDS = ("player_id", "test_name", "date", *NUMERIC_FIELDS)
+
+# Perfiles de exportación: columna del fichero -> campo. "player" es el
+# username o email del jugador (el índice no tiene nombres, así que las
+# columnas de nombre no se mapean). Si varias columnas dan el mismo campo,
+# gana la que aparece antes en el perfil. test_name se usa si el fichero no lo trae.
+DEVICE_PROFILES = {
+    "ballers": {
+        "label": "Plantilla Ballers",
+        "test_name": "Test",
+        "dayfirst": False,
+        "columns": {
+            "username": "player", "email": "player", "player": "player",
+            "test_name": "test_name", "date": "date",
+            **{field: field for field in NUMERIC_FIELDS},
+        },
+    },
+    "timing_gates": {
+        "label": "Fotocélulas",
+        "test_name": "Fotocélulas",
+        "dayfirst": True,
+        "columns": {
+            "athlete email": "player", "email": "player",
+            "date": "date", "timestamp": "date",
+            "test": "test_name",
+            "sprint 20m (s)": "sprint", "split 20m": "sprint",
+            "t-test (s)": "t_test", "agility t-test": "t_test",
+        },
+    },
+    "jump_mat": {
+        "label": "Plataforma de salto",
+        "test_name": "Salto CMJ",
+        "dayfirst": True,
+        "columns": {
+            "email": "player", "username": "player",
+            "date": "date", "timestamp": "date",
+            "jump type": "test_name",
+            "jump height (cm)": "jumping", "height (cm)": "jumping",
+            "body mass (kg)": "weight",
+        },
+    },
+}
+
+def _normalize(name):
+    return " ".join(str(name).strip().lower().split())
+
+def read_device_csv(source, profile="ballers"):
+    """
+    Lee la exportación CSV de un dispositivo (ruta o fichero abierto) y la
+    devuelve con las columnas de TestResult según el perfil: `player`,
+    `test_name`, `date` y las métricas que traiga el fichero.
+    """
+    if profile not in DEVICE_PROFILES:
+        raise ValueError(f"Perfil de dispositivo desconocido: {profile}")
+    spec = DEVICE_PROFILES[profile]
+
+    # sep=None detecta ',' o ';' (exportaciones con configuración regional española)
+    raw = pd.read_csv(source, sep=None, engine="python", dtype=str)
+    columns = {}
+    for column in raw.columns:
+        columns.setdefault(_normalize(column), column)
+    mapping = {}
+    for alias, field in spec["columns"].items():
+        if alias in columns and field not in mapping.values():
+            mapping[columns[alias]] = field
+    missing = {"player", "date"} - set(mapping.values())
+    if missing:
+        raise ValueError(f"Faltan columnas obligatorias para el perfil {profile}: {sorted(missing)}")
+
+    frame = raw[list(mapping)].rename(columns=mapping)
+    if "test_name" not in frame.columns:
+        frame["test_name"] = spec["test_name"]
+    frame["test_name"] = frame["test_name"].fillna(spec["test_name"]).str.strip()
+
+    dates = pd.to_datetime(frame["date"], dayfirst=spec["dayfirst"], format="mixed", errors="coerce")
+    if dates.dt.tz is not None:
+        dates = dates.dt.tz_convert(None)
+    frame["date"] = dates
+
+    for field in NUMERIC_FIELDS:
+        if field in frame.columns:
+            # Coma decimal -> punto
+            frame[field] = pd.to_numeric(frame[field].str.replace(",", ".", regex=False), errors="coerce")
+    return frame
+
+def build_player_index(db):
+    """
+    Índice en memoria username/email (en minúsculas) -> player_id, con una
+    sola consulta cacheada hasta que cambien usuarios o jugadores.
+    """
+    rows = cached_select(db, select(Player.player_id, User.username, User.email)
+                         .join(User, Player.user_id == User.user_id))
+    index = {}
+    for row in rows:
+        for key in (row["username"], row["email"]):
+            if key:
+                index[key.strip().lower()] = row["player_id"]
+    return index
+
+def _existing_keys(db, frame):
+    stmt = (select(TestResult.player_id, TestResult.test_name, TestResult.date)
+            .where(TestResult.player_id.in_(frame["player_id"].unique().tolist()))
+            .where(TestResult.date >= frame["date"].min().to_pydatetime())
+            .where(TestResult.date <= frame["date"].max().to_pydatetime()))
+    existing = pd.read_sql(stmt, db.connection())
+    existing["date"] = pd.to_datetime(existing["date"])
+    return existing.drop_duplicates()
+
+def ingest_test_results(db, frame, dry_run=False):
+    """
+    Importa los tests de `frame` (ver read_device_csv) en una sola
+    transacción: asocia cada fila a su jugador, descarta duplicados (en el
+    propio fichero y frente a la BD, por jugador, test y fecha) e inserta el
+    resto en bloque. Después refresca los rankings de los jugadores afectados.
+
+    Devuelve un informe con filas leídas, nuevas, insertadas (0 con
+    `dry_run`), duplicadas, inválidas (sin fecha) y los jugadores no
+    encontrados.
+    """
+    report = {"rows": len(frame), "new": 0, "inserted": 0, "duplicates": 0, "invalid": 0, "unmatched": [], "player_ids": []}
+    if frame.empty:
+        return report
+
+    index = build_player_index(db)
+    frame = frame.assign(player_id=frame["player"].astype(str).str.strip().str.lower().map(index))
+    unmatched = frame["player_id"].isna()
+    invalid = ~unmatched & frame["date"].isna()
+    report["unmatched"] = sorted(set(frame.loc[unmatched, "player"].astype(str)))
+    report["invalid"] = int(invalid.sum())
+    frame = frame[~unmatched & ~invalid].astype({"player_id": "int64"})
+    if frame.empty:
+        return report
+
+    candidates = frame.drop_duplicates(["player_id", "test_name", "date"])
+    existing = _existing_keys(db, candidates)
+    is_new = (candidates.merge(existing.assign(_exists=True), how="left", on=["player_id", "test_name", "date"])
+              ["_exists"].isna().to_numpy())
+    new_rows = candidates[is_new]
+    report["new"] = len(new_rows)
+    report["duplicates"] = len(frame) - len(new_rows)
+    report["player_ids"] = sorted(new_rows["player_id"].unique().tolist())
+
+    if dry_run or new_rows.empty:
+        return report
+
+    columns = [field for field in INSERT_FIELDS if field in new_rows.columns]
+    values = new_rows[columns].astype(object)
+    records = values.where(new_rows[columns].notna(), None).to_dict("records")
+    try:
+        db.execute(insert(TestResult), records)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error("Error importando tests: %s", e)
+        raise
+
+    report["inserted"] = len(records)
+    logger.info("Importados %s tests de %s jugadores", len(records), len(report["player_ids"]))
+
+    # Rankings: solo se recalculan los grupos de edad de los jugadores afectados
+    get_rankings().refresh(db, player_ids=report["player_ids"])
+    return report
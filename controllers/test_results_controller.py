@@ -0,0 +1,78 @@
+# controllers/test_results_controller.py
+import pandas as pd
+from sqlalchemy import select, func
+
+from controllers.player_analytics_controller import METRIC_COLUMNS
+from controllers.sql_functions import BUCKETS, date_bucket
+from models.test_model import TestResult
+
+AGGREGATES = {"min": func.min, "max": func.max, "mean": func.avg}
+# Puntos que un gráfico o tabla puede mostrar con sentido
+DEFAULT_MAX_POINTS = 120
+
+def _window(stmt, player_id, start, end):
+    stmt = stmt.where(TestResult.player_id == player_id)
+    if start is not None:
+        stmt = stmt.where(TestResult.date >= start)
+    if end is not None:
+        stmt = stmt.where(TestResult.date < end)
+    return stmt
+
+def _validate_metrics(metrics):
+    metrics = list(metrics)
+    unknown = set(metrics) - set(METRIC_COLUMNS)
+    if unknown:
+        raise ValueError(f"Métricas desconocidas: {sorted(unknown)}")
+    return metrics
+
+def choose_bucket(db, player_id, start=None, end=None, max_points=DEFAULT_MAX_POINTS):
+    """
+    Elige la granularidad más fina que no supere `max_points` puntos en la
+    ventana: None (sin agrupar), "week" o "month".
+    """
+    dialect = db.get_bind().dialect.name
+    count = db.execute(_window(select(func.count(TestResult.id)), player_id, start, end)).scalar()
+    if count <= max_points:
+        return None
+    for bucket in BUCKETS:
+        bucket_expr = date_bucket(TestResult.date, bucket, dialect)
+        n_buckets = db.execute(_window(select(func.count(func.distinct(bucket_expr))), player_id, start, end)).scalar()
+        if n_buckets <= max_points:
+            return bucket
+    return BUCKETS[-1]
+
+def query_metric_series(db, player_id, metrics=METRIC_COLUMNS, start=None, end=None,
+                        bucket=None, aggregates=("min", "max", "mean"), max_points=DEFAULT_MAX_POINTS):
+    """
+    Serie temporal de métricas de un jugador en la ventana [start, end).
+
+    Sin `bucket` devuelve los tests tal cual (columna `date` y una columna por
+    métrica). Con bucket="week" o "month" agrupa en la BD con GROUP BY y
+    devuelve, por periodo, `date` (inicio del periodo), `n_tests` y una
+    columna `<métrica>_<agregado>` por cada agregado (min, max, mean).
+    bucket="auto" elige la granularidad con choose_bucket().
+    """
+    metrics = _validate_metrics(metrics)
+    if bucket == "auto":
+        bucket = choose_bucket(db, player_id, start, end, max_points)
+
+    if bucket is None:
+        stmt = _window(select(TestResult.date, *(getattr(TestResult, m) for m in metrics)),
+                       player_id, start, end).order_by(TestResult.date)
+        series = pd.read_sql(stmt, db.connection())
+    else:
+        unknown = set(aggregates) - set(AGGREGATES)
+        if unknown:
+            raise ValueError(f"Agregados no soportados: {sorted(unknown)}")
+        bucket_expr = date_bucket(TestResult.date, bucket, db.get_bind().dialect.name).label("date")
+        columns = [AGGREGATES[agg](getattr(TestResult, m)).label(f"{m}_{agg}")
+                   for m in metrics for agg in aggregates]
+        stmt = (_window(select(bucket_expr, func.count(TestResult.id).label("n_tests"), *columns),
+                        player_id, start, end)
+                .group_by(bucket_expr)
+                .order_by(bucket_expr))
+        series = pd.read_sql(stmt, db.connection())
+
+    series["date"] = pd.to_datetime(series["date"])
+    series.attrs["bucket"] = bucket
+    return series
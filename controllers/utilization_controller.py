@@ -0,0 +1,79 @@
+# controllers/utilization_controller.py
+import pandas as pd
+from sqlalchemy import select, func, case, and_
+
+from controllers.query_cache import cached_select
+from controllers.sql_functions import weekday, hour_of_day, duration_hours
+from models.coach_model import Coach
+from models.session_model import Session, SessionStatus
+from models.user_model import User
+
+# Días en el orden de weekday() (0 = domingo)
+WEEKDAY_LABELS = ["Domingo", "Lunes", "Martes", "Miércoles", "Jueves", "Viernes", "Sábado"]
+# Orden de visualización: de lunes a domingo
+WEEKDAY_ORDER = WEEKDAY_LABELS[1:] + WEEKDAY_LABELS[:1]
+
+def _window(start, end):
+    conditions = []
+    if start is not None:
+        conditions.append(Session.start_time >= start)
+    if end is not None:
+        conditions.append(Session.start_time < end)
+    return conditions
+
+def coach_workload(db, coach_id=None, start=None, end=None):
+    """
+    Sesiones y horas por coach, día de la semana y hora de inicio, con un
+    único GROUP BY en la BD. Las sesiones canceladas no cuentan como carga.
+    """
+    dialect = db.get_bind().dialect.name
+    day = weekday(Session.start_time, dialect).label("weekday")
+    hour = hour_of_day(Session.start_time, dialect).label("hour")
+    hours = func.coalesce(func.sum(duration_hours(Session.start_time, Session.end_time, dialect)), 0)
+
+    stmt = (select(Session.coach_id, day, hour,
+                   func.count(Session.id).label("sessions"),
+                   hours.label("hours"))
+            .where(Session.status != SessionStatus.CANCELED, *_window(start, end))
+            .group_by(Session.coach_id, day, hour))
+    if coach_id is not None:
+        stmt = stmt.where(Session.coach_id == coach_id)
+
+    workload = pd.DataFrame(cached_select(db, stmt),
+                            columns=["coach_id", "weekday", "hour", "sessions", "hours"])
+    workload["day"] = pd.Categorical(workload["weekday"].map(dict(enumerate(WEEKDAY_LABELS))),
+                                     categories=WEEKDAY_ORDER, ordered=True)
+    return workload
+
+def coach_rates(db, start=None, end=None):
+    """
+    Por coach: sesiones totales, completadas, programadas y canceladas,
+    horas impartidas y tasas de finalización y cancelación.
+    """
+    dialect = db.get_bind().dialect.name
+
+    def count_status(status):
+        return func.sum(case((Session.status == status, 1), else_=0))
+
+    stmt = (select(Coach.coach_id, User.name.label("coach_name"),
+                   func.count(Session.id).label("total"),
+                   count_status(SessionStatus.COMPLETED).label("completed"),
+                   count_status(SessionStatus.SCHEDULED).label("scheduled"),
+                   count_status(SessionStatus.CANCELED).label("canceled"),
+                   func.sum(case((Session.status == SessionStatus.COMPLETED,
+                                  duration_hours(Session.start_time, Session.end_time, dialect)),
+                                 else_=0)).label("hours"))
+            .join(User, Coach.user_id == User.user_id)
+            # outerjoin: también aparecen los coaches sin sesiones en el periodo
+            .outerjoin(Session, and_(Session.coach_id == Coach.coach_id, *_window(start, end)))
+            .group_by(Coach.coach_id, User.name)
+            .order_by(User.name))
+
+    rates = pd.DataFrame(cached_select(db, stmt),
+                         columns=["coach_id", "coach_name", "total", "completed", "scheduled", "canceled", "hours"])
+    rates[["completed", "scheduled", "canceled", "hours"]] = rates[["completed", "scheduled", "canceled", "hours"]].fillna(0)
+    # Las tasas se calculan sobre sesiones ya resueltas (completadas o canceladas)
+    resolved = (rates["completed"] + rates["canceled"]).where(lambda n: n > 0)
+    rates["completion_rate"] = rates["completed"] / resolved
+    rates["cancellation_rate"] = rates["canceled"] / resolved
+    return rates
@@ -0,0 +1,276 @@
+# data/scale_db.py
+# Genera una BD de tamaño configurable para pruebas de rendimiento.
+# A diferencia de seed_db.py: un único hash bcrypt para todos los usuarios,
+# ids asignados de antemano e inserciones masivas por bloques, con semilla
+# reproducible (misma semilla, tamaños y --now -> mismos datos, salvo los
+# hashes de las contraseñas: bcrypt genera una sal aleatoria en cada carga).
+#
+#   python data/scale_db.py --preset small
+#   python data/scale_db.py --preset large --database-url sqlite:///data/scale_large.db --reset
+#   python data/scale_db.py --coaches 200 --players 20000 --sessions 1000000 --tests 5000000
+#
+# Usuarios: admin/admin, coachN/coachpass y playerN/playerpass (como seed_db.py).
+from __future__ import annotations
+# ─── PYTHONPATH raíz ─────────────────────────────────────────
+import sys, pathlib, random, time, argparse
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT))
+
+from datetime import datetime, timedelta
+from itertools import islice
+
+import bcrypt
+from sqlalchemy import create_engine, event, insert, select, func, text
+
+from models.base              import Base
+from models.user_model        import User, UserType
+from models.admin_model       import Admin
+from models.coach_model       import Coach
+from models.player_model      import Player
+from models.session_model     import Session, SessionStatus
+from models.test_model        import TestResult
+
+
+# coaches, players, sessions, tests
+PRESETS = {
+    "small":  (20,    1_000,     20_000,    50_000),
+    "medium": (100,   5_000,    200_000,   1_000_000),
+    "large":  (200,  20_000,  1_000_000,   5_000_000),
+}
+CHUNK_SIZE = 20_000
+
+FIRST_NAMES = ["Alejandro", "Lucía", "Hugo", "Martina", "Pablo", "Sofía", "Daniel", "Julia", "Álvaro", "Paula",
+               "Adrián", "Valeria", "David", "Emma", "Mario", "Daniela", "Diego", "Carla", "Javier", "Alba",
+               "Marcos", "Noa", "Sergio", "Sara", "Iván", "Carmen", "Leo", "Vega", "Manuel", "Claudia"]
+SURNAMES = ["García", "Rodríguez", "González", "Fernández", "López", "Martínez", "Sánchez", "Pérez", "Gómez",
+            "Martín", "Jiménez", "Ruiz", "Hernández", "Díaz", "Moreno", "Muñoz", "Álvarez", "Romero", "Alonso",
+            "Gutiérrez", "Navarro", "Torres", "Domínguez", "Vázquez", "Ramos", "Gil", "Ramírez", "Serrano"]
+LICENSES = ["UEFA Pro", "UEFA A", "UEFA B", "UEFA C", "Diploma Nacional"]
+SERVICES = ["Individual", "Grupo reducido", "Plan fuerza", "Plan técnico"]
+NOTES = ["Trabajo de conducción y pase", "Finalización tras control orientado", "Fuerza de tren inferior",
+         "Recuperación activa", "Rondos y toma de decisiones", "Velocidad de reacción", "Técnica de golpeo",
+         "Evaluación mensual", None, None]
+
+
+# ─────────────────────────────────────────────────────────────
+def _name(rng: random.Random) -> str:
+    return f"{rng.choice(FIRST_NAMES)} {rng.choice(SURNAMES)} {rng.choice(SURNAMES)}"
+
+
+def _phone(rng: random.Random) -> str:
+    return f"6{rng.randrange(10**8):08d}"
+
+
+def generate_users(rng, n_coaches, n_players, password_hashes):
+    """
+    Usuarios, perfiles de coach y de jugador con ids consecutivos: admin = 1,
+    coaches 2..n_coaches+1 y luego los jugadores.
+    """
+    registered = datetime(2024, 1, 1)
+    users, admins, coaches, players = [], [], [], []
+
+    users.append(dict(user_id=1, username="admin", name="Administrador", password_hash=password_hashes["admin"],
+                      email="admin@centro.com", phone="", user_type=UserType.admin, permit_level=10,
+                      fecha_registro=registered))
+    admins.append(dict(admin_id=1, user_id=1, role="superuser"))
+
+    for i in range(1, n_coaches + 1):
+        user_id = i + 1
+        users.append(dict(user_id=user_id, username=f"coach{i}", name=_name(rng),
+                          password_hash=password_hashes["coach"], email=f"coach{i}@ballers.com",
+                          phone=_phone(rng), user_type=UserType.coach, permit_level=5, fecha_registro=registered))
+        coaches.append(dict(coach_id=i, user_id=user_id, license=rng.choice(LICENSES)))
+
+    for i in range(1, n_players + 1):
+        user_id = n_coaches + 1 + i
+        users.append(dict(user_id=user_id, username=f"player{i}", name=_name(rng),
+                          password_hash=password_hashes["player"], email=f"player{i}@ballers.com",
+                          phone=_phone(rng), user_type=UserType.player, permit_level=1,
+                          fecha_registro=registered + timedelta(days=rng.randrange(540)),
+                          date_of_birth=datetime(rng.randint(2004, 2016), rng.randint(1, 12), rng.randint(1, 28))))
+        players.append(dict(player_id=i, user_id=user_id, service=rng.choice(SERVICES),
+                            enrolment=rng.randint(10, 60), notes=rng.choice(NOTES)))
+
+    return users, admins, coaches, players
+
+
+def generate_sessions(rng, n_sessions, n_coaches, n_players, now):
+    """
+    Sesiones de los últimos dos años y los próximos tres meses. Cada jugador
+    entrena casi siempre con "su" coach; las pasadas están en su mayoría
+    completadas y las futuras programadas.
+    """
+    main_coach = [rng.randint(1, n_coaches) for _ in range(n_players + 1)]
+    first_day = now - timedelta(days=730)
+    days = 730 + 90
+    for session_id in range(1, n_sessions + 1):
+        player_id = rng.randint(1, n_players)
+        coach_id = main_coach[player_id] if rng.random() < 0.8 else rng.randint(1, n_coaches)
+        start = first_day + timedelta(days=rng.randrange(days), minutes=rng.randrange(7 * 2, 21 * 2) * 30)
+        if start < now:
+            status = rng.choices((SessionStatus.COMPLETED, SessionStatus.CANCELED, SessionStatus.SCHEDULED),
+                                 (85, 10, 5))[0]
+        else:
+            status = SessionStatus.CANCELED if rng.random() < 0.05 else SessionStatus.SCHEDULED
+        yield dict(id=session_id, coach_id=coach_id, player_id=player_id, start_time=start,
+                   end_time=start + timedelta(hours=1), status=status, notes=rng.choice(NOTES),
+                   created_at=start - timedelta(days=rng.randint(1, 30)))
+
+
+def generate_tests(rng, n_tests, n_players, now):
+    """
+    Baterías de tests repartidas entre jugadores, cada una con una mejora
+    progresiva respecto a la anterior del mismo jugador. Las fechas se
+    reparten cada `interval` días hasta `now` (nunca después).
+    """
+    per_player, extra = divmod(n_tests, n_players)
+    test_id = 0
+    for player_id in range(1, n_players + 1):
+        count = per_player + (1 if player_id <= extra else 0)
+        if not count:
+            continue
+        interval = max(1, 730 // count)
+        first = now - timedelta(days=interval * count)
+        sprint, jumping = rng.uniform(5.0, 6.0), rng.uniform(38, 50)
+        weight, height = rng.randint(45, 80), rng.randint(150, 195)
+        for i in range(1, count + 1):
+            test_id += 1
+            # Variación horaria de cada test, sin acumularse entre tests
+            date = min(now, first + timedelta(days=interval * i, hours=rng.randint(0, 8)))
+            sprint = max(4.2, sprint - rng.uniform(-0.03, 0.06))
+            jumping = min(70, jumping + rng.uniform(-0.3, 0.6))
+            yield dict(id=test_id, player_id=player_id, test_name="battery", date=date,
+                       weight=weight + rng.randint(-2, 2), height=height,
+                       ball_control=rng.uniform(5, 10), control_pass=rng.uniform(5, 10),
+                       receive_scan=rng.uniform(5, 10), dribling_carriying=rng.uniform(5, 10),
+                       shooting=rng.uniform(5, 10), crossbar=rng.randint(0, 10), sprint=round(sprint, 2),
+                       t_test=rng.uniform(9, 11.5), jumping=round(jumping, 1))
+
+
+# ─────────────────────────────────────────────────────────────
+def _fast_sqlite(dbapi_connection, connection_record):
+    # Sin diario ni fsync: si la carga falla, se vuelve a generar la BD
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=OFF")
+    cursor.execute("PRAGMA synchronous=OFF")
+    cursor.close()
+
+
+def bulk_insert(engine, model, rows, chunk_size=CHUNK_SIZE) -> int:
+    """
+    Inserta `rows` (iterable de dicts) en bloques de `chunk_size`, un
+    executemany y una transacción por bloque.
+    """
+    rows = iter(rows)
+    total = 0
+    statement = insert(model)
+    while chunk := list(islice(rows, chunk_size)):
+        with engine.begin() as conn:
+            conn.execute(statement, chunk)
+        total += len(chunk)
+    return total
+
+
+def reset_sequences(engine, models) -> None:
+    """
+    Tras insertar con ids explícitos, adelanta las secuencias de PostgreSQL
+    al id máximo de cada tabla; si no, el siguiente INSERT de la aplicación
+    recibiría el id 1 y chocaría con la clave primaria. SQLite y MySQL ya
+    continúan a partir del máximo.
+    """
+    if engine.dialect.name != "postgresql":
+        return
+    with engine.begin() as conn:
+        for model in models:
+            table = model.__table__
+            column = table.autoincrement_column
+            if column is None:
+                continue
+            # Con la tabla vacía se deja en 1 sin consumir (is_called = false)
+            conn.execute(text(f"SELECT setval(pg_get_serial_sequence(:table, :column), "
+                              f"COALESCE(MAX({column.name}), 1), MAX({column.name}) IS NOT NULL) "
+                              f"FROM {table.name}"),
+                         {"table": table.name, "column": column.name})
+
+
+def generate(database_url, coaches, players, sessions, tests, seed=42, reset=False, chunk_size=CHUNK_SIZE,
+             now=None, verbose=True) -> dict:
+    """
+    Crea el esquema en `database_url` y lo rellena con los tamaños indicados.
+    Las fechas se reparten alrededor de `now` (por defecto, la hora actual).
+    Devuelve las filas insertadas por tabla y los segundos de cada paso.
+    """
+    if coaches < 1 or players < 1:
+        raise ValueError("Hacen falta al menos un coach y un jugador")
+
+    engine = create_engine(database_url)
+    if engine.dialect.name == "sqlite":
+        event.listen(engine, "connect", _fast_sqlite)
+
+    if reset:
+        Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    with engine.connect() as conn:
+        if conn.execute(select(func.count()).select_from(User)).scalar():
+            engine.dispose()
+            raise RuntimeError("La BD ya contiene datos; usa --reset para regenerarla")
+
+    rng = random.Random(seed)
+    now = (now or datetime.now()).replace(minute=0, second=0, microsecond=0)
+    # Un hash por contraseña para toda la carga (bcrypt tarda ~250 ms por llamada)
+    password_hashes = {role: bcrypt.hashpw(f"{role}pass".encode(), bcrypt.gensalt()).decode()
+                       for role in ("coach", "player")}
+    password_hashes["admin"] = bcrypt.hashpw(b"admin", bcrypt.gensalt()).decode()
+
+    users, admin_rows, coach_rows, player_rows = generate_users(rng, coaches, players, password_hashes)
+    steps = [
+        (User, users), (Admin, admin_rows), (Coach, coach_rows), (Player, player_rows),
+        (Session, generate_sessions(rng, sessions, coaches, players, now)),
+        (TestResult, generate_tests(rng, tests, players, now)),
+    ]
+    report = {"rows": {}, "seconds": {}}
+    for model, rows in steps:
+        start = time.perf_counter()
+        report["rows"][model.__tablename__] = bulk_insert(engine, model, rows, chunk_size)
+        report["seconds"][model.__tablename__] = round(time.perf_counter() - start, 2)
+        if verbose:
+            print(f"{model.__tablename__}: {report['rows'][model.__tablename__]} filas "
+                  f"en {report['seconds'][model.__tablename__]:.1f}s")
+
+    reset_sequences(engine, [model for model, _ in steps])
+    with engine.connect() as conn:
+        if engine.dialect.name == "sqlite":
+            conn.exec_driver_sql("ANALYZE")
+    engine.dispose()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generar una BD de prueba de tamaño configurable")
+    parser.add_argument("--database-url", default=f"sqlite:///{ROOT / 'data' / 'scale.db'}",
+                        help="BD de destino (por defecto data/scale.db, nunca la de la aplicación)")
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="small", help="Tamaños de partida")
+    parser.add_argument("--coaches", type=int, help="Número de coaches (sustituye al del preset)")
+    parser.add_argument("--players", type=int, help="Número de jugadores")
+    parser.add_argument("--sessions", type=int, help="Número de sesiones")
+    parser.add_argument("--tests", type=int, help="Número de resultados de tests")
+    parser.add_argument("--seed", type=int, default=42, help="Semilla del generador")
+    parser.add_argument("--now", type=datetime.fromisoformat,
+                        help="Fecha de referencia (AAAA-MM-DD) para repetir exactamente una BD anterior")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="Filas por inserción")
+    parser.add_argument("--reset", action="store_true", help="Borrar las tablas antes de generar")
+    args = parser.parse_args()
+
+    coaches, players, sessions, tests = PRESETS[args.preset]
+    start = time.perf_counter()
+    generate(args.database_url,
+             coaches=args.coaches if args.coaches is not None else coaches,
+             players=args.players if args.players is not None else players,
+             sessions=args.sessions if args.sessions is not None else sessions,
+             tests=args.tests if args.tests is not None else tests,
+             seed=args.seed, reset=args.reset, chunk_size=args.chunk_size, now=args.now)
+    print(f"BD generada en {time.perf_counter() - start:.1f}s ✔︎")
+
+
+if __name__ == "__main__":
+    main()
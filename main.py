@@ -1,9 +1,27 @@
-import pathlib, time, streamlit as st
-from common import login
+import pathlib, time, logging, streamlit as st
+from common.logging_config import setup_logging, log_context, log_duration
+from common.tracing import setup_tracing, span, KIND_SERVER
+from common.profiling import profile_render
+from common.warmup import start_warmup
+from common.health import start_health_monitor
+
+# ---------- logging y trazas (una vez por proceso) ----------
+setup_logging()
+setup_tracing()
+logger = logging.getLogger("ballers.render")
+
+# ---------- calentamiento y sondas de salud en segundo plano (una vez por proceso) ----------
+# Con tools/serve.py ya se lanzó antes de la primera sesión; aquí no hace nada.
+# Sin serve.py el endpoint /readyz no existe hasta la primera sesión (ver common/health.py).
+start_warmup()
+start_health_monitor()
+
+from common import login, auth
 from common.menu import generar_menu
 
 # ---------- helpers ----------
 def logout():
+    auth.end_session()
     for k in ("user_id", "user_type", "permit_level", "selected_page"):
         st.session_state.pop(k, None)
     st.rerun()
@@ -30,6 +48,10 @@ with c:
     st.image("assets/logo_white.png", width=300)
 
 # ---------- flujo principal ----------
+# Recarga o reconexión: la sesión se recupera desde la cookie firmada, sin pedir la contraseña
+auth.restore_session()
+auth.sync_cookie()
+
 if "user_id" not in st.session_state:
     # Sin sesión → ocultamos completamente el sidebar y lanzamos login
     st.markdown(
@@ -61,4 +83,11 @@ if selected:
     else:  # "Mi Perfil"
         import pages.ballers as page  # misma vista por ahora
 
-    page.show()
+    # Cada registro de la página lleva página, rol y usuario; al terminar se registra la duración.
+    # El render es la raíz de una traza con las consultas SQL y llamadas a Google como hijos.
+    # Si un admin lo ha pedido desde Diagnóstico, el render se perfila con cProfile
+    role = st.session_state["user_type"]
+    with log_context(page=selected, role=role, user_id=st.session_state["user_id"]):
+        with log_duration(logger, "render"), span(f"render {selected}", KIND_SERVER, page=selected, role=role), \
+                profile_render(selected, role=role):
+            page.show()
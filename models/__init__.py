@@ -6,4 +6,6 @@ from .player_model import Player
 from .admin_model import Admin
 from .session_model import Session
 from .test_model import TestResult
+from .calendar_sync_model import CalendarSyncState
+from .revoked_token_model import RevokedToken
 from .base import Base
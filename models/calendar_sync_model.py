@@ -0,0 +1,21 @@
+from sqlalchemy import Column, String, Boolean, DateTime
+from datetime import datetime, timezone
+from .user_model import Base
+
+class CalendarSyncState(Base):
+    __tablename__ = "calendar_sync_state"
+
+    calendar_id         = Column(String, primary_key=True)
+    sync_token          = Column(String)     # nextSyncToken de la última lectura de eventos
+    dirty               = Column(Boolean, default=False)   # Calendar avisó de cambios aún no traídos
+
+    # Canal de notificaciones push (events.watch)
+    channel_id          = Column(String)
+    channel_resource_id = Column(String)
+    channel_token       = Column(String)     # Secreto que Google devuelve en cada notificación
+    channel_expiration  = Column(DateTime)
+
+    last_notification_at = Column(DateTime)
+    last_pull_at        = Column(DateTime)
+    updated_at          = Column(DateTime, default=lambda: datetime.now(timezone.utc),
+                                 onupdate=lambda: datetime.now(timezone.utc))
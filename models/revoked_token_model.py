@@ -0,0 +1,11 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from datetime import datetime, timezone
+from .base import Base
+
+class RevokedToken(Base):
+    __tablename__ = "revoked_tokens"
+
+    jti        = Column(String, primary_key=True)            # Identificador del token (common/auth.py)
+    user_id    = Column(Integer, ForeignKey("users.user_id"), index=True)
+    expires_at = Column(DateTime, nullable=False, index=True)   # Después ya no hace falta guardarlo
+    revoked_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
@@ -21,6 +21,7 @@ class Session(Base):
     notes      = Column(String, nullable=True)
     created_at  = Column(DateTime, default=lambda: datetime.now(timezone.utc))
     calendar_event_id = Column(String, nullable=True)
+    calendar_event_hash = Column(String, nullable=True)   # Hash del evento en la última sincronización
 
     # Relaciones
     coach       = relationship("Coach", back_populates="sessions")
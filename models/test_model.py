@@ -1,10 +1,12 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime, timezone
 from .user_model import Base
 
 class TestResult(Base):
     __tablename__ = "test_results"
+    # Historial por jugador y último test de cada jugador (controllers/rankings_controller.py)
+    __table_args__ = (Index("ix_test_results_player_date", "player_id", "date"),)
 
     id                  = Column(Integer, primary_key=True)
     player_id           = Column(Integer, ForeignKey("players.player_id"), nullable=False)
@@ -1,473 +1,796 @@
 import streamlit as st
 import pandas as pd
+import altair as alt
 import os
-from datetime import datetime, timedelta
-from controllers.db_controller import get_session_local
+from datetime import datetime
+from sqlalchemy import select
+from controllers.query_cache import cached_frame
+from controllers.session_controller import session_frame, sessions_around
 from common.services.session_service import SessionService
+from common.services.dashboard_service import DashboardService
+from common.services.unit_of_work import unit_of_work
+from common.warmup import warmup_status
+from common.tracing import KIND_INTERNAL, traced, read_traces, trace_summary, span_rows
+from common import profiling, health
+from controllers.enrolment_controller import LOW_REMAINING, enrolment_badge
+from controllers.revenue_controller import get_revenue_analytics, session_years
+from controllers.utilization_controller import WEEKDAY_ORDER, coach_workload, coach_rates
+from controllers.test_ingestion_controller import DEVICE_PROFILES, read_device_csv, ingest_test_results
 from controllers.sheets_controller import get_financials, test_sheets_connection, reset_offline_mode
 from models.coach_model import Coach
 from models.player_model import Player
-from models.user_model import User
+from models.user_model import User, UserType
 from models.session_model import Session, SessionStatus
+from models.calendar_sync_model import CalendarSyncState
 # Importar las funciones de sincronización
-from controllers.calendar_controller import sync_db_to_calendar, sync_single_session
+from controllers.calendar_controller import CALENDAR_ID, sync_single_session, reconcile_calendar
 
-# Conexión a BD
-SessionLocal = get_session_local()
+def _format_unique(keys, formatter):
+    """
+    Formatea cada valor distinto una sola vez (días y horas se repiten mucho
+    entre sesiones) y devuelve una columna categórica.
+    """
+    codes, uniques = pd.factorize(keys)
+    return pd.Categorical.from_codes(codes, [formatter(value) for value in uniques])
 
-def show():
-    st.title("Administración")
-    user_type = st.session_state['user_type']
+def _minutes(times):
+    return times.dt.hour * 60 + times.dt.minute
 
-    if user_type == 'admin':
-        st.subheader("📊 Dashboard General")
+def _hhmm(minutes):
+    return f"{int(minutes) // 60:02d}:{int(minutes) % 60:02d}"
+
+def _session_table(sessions, include_coach=True):
+    """
+    Tabla de sesiones para mostrar, con fechas y horas formateadas por columnas.
+    """
+    table = pd.DataFrame({
+        "ID": sessions["id"].to_numpy(),
+        "🔄": pd.Categorical.from_codes(sessions["calendar_event_id"].notna().astype(int), ["❌", "✅"]),
+        "Fecha": _format_unique(sessions["start_time"].dt.normalize(), lambda day: day.strftime("%d/%m/%Y")),
+        # Clave única por par (inicio, fin) en minutos del día
+        "Hora": _format_unique(_minutes(sessions["start_time"]) * 1440 + _minutes(sessions["end_time"]),
+                               lambda key: f"{_hhmm(key // 1440)} - {_hhmm(key % 1440)}"),
+        "Jugador": sessions["player_name"].array,
+        "Entrenador": sessions["coach_name"].array,
+        "Estado": sessions["status"].array,
+    })
+    return table if include_coach else table.drop(columns=["Entrenador"])
+
+def _prepare_user_frame(users):
+    users["user_type"] = pd.Categorical(users["user_type"].map({t: t.value for t in UserType}),
+                                        categories=[t.value for t in UserType])
+    users["date_of_birth"] = pd.to_datetime(users["date_of_birth"]).dt.date
+    return users
+
+# --------------------------------
+# Secciones
+# --------------------------------
+# Cada sección es un fragmento: al interactuar con sus widgets solo se vuelve
+# a ejecutar esa sección, que queda registrada como su propia traza. Las
+# lecturas y escrituras usan transacciones cortas (unit_of_work) que no se
+# mantienen abiertas mientras se dibuja la página.
+# Las acciones que modifican datos usan st.rerun() para refrescar la página completa.
+
+@st.fragment
+@traced(kind=KIND_INTERNAL, require_parent=False)
+def _dashboard_section():
+    st.subheader("📊 Dashboard General")
+
+    # BD, Sheets y Calendar se consultan a la vez
+    dashboard = DashboardService.load()
+    stats = dashboard.stats
+    total_players = stats["total_players"]
+    total_coaches = stats["total_coaches"]
+    sessions_month = stats["sessions_month"]
+    sessions_week = stats["sessions_week"]
+
+    # Obtenemos datos financieros 
+    df_financial = dashboard.financials
+
+    ingresos_mensuales = df_financial['Ingresos'].sum() if 'Ingresos' in df_financial.columns else 0
+    gastos_mensuales = df_financial['Gastos'].sum() if 'Gastos' in df_financial.columns else 0
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("🏃‍♂️ Jugadores", f"{total_players}")
+        st.metric("🎯 Coaches", f"{total_coaches}")
+    with col2:
+        st.metric("📅 Sesiones Mes", f"{sessions_month}")
+        st.metric("📆 Sesiones Semana", f"{sessions_week}")
+    with col3:
+        st.metric("📈 Ingresos (€)", f"{ingresos_mensuales:,.2f} €")
+        st.metric("📉 Gastos (€)", f"{gastos_mensuales:,.2f} €")
+
+    # Estado de la sincronización con Google Calendar
+    calendar = dashboard.calendar
+    upcoming = calendar["upcoming_events"]
+    st.caption(f"🗓️ Calendar: {calendar['pending']} sesiones pendientes de sincronizar · "
+               f"{'cambios pendientes de traer' if calendar['dirty'] else 'sin cambios pendientes'}"
+               + (f" · {upcoming} eventos en los próximos 7 días" if upcoming is not None else " · sin conexión con la API"))
+
+    # Jugadores con el bono agotado o a punto de agotarse
+    ledger = dashboard.ledger
+    low = sorted((e for e in ledger.values() if e["enrolment"] and e["remaining"] <= LOW_REMAINING),
+                 key=lambda e: e["remaining"])
+    if low:
+        with st.expander(f"⚠️ {len(low)} jugadores con el bono agotado o a punto de agotarse"):
+            st.dataframe(pd.DataFrame([{
+                "Jugador": e["name"],
+                "Bono": enrolment_badge(e),
+                "Inscritas": e["enrolment"],
+                "Completadas": e["completed"],
+                "Programadas": e["scheduled"],
+                "Restantes": e["remaining"],
+            } for e in low]), use_container_width=True, hide_index=True)
+
+@st.fragment
+@traced(kind=KIND_INTERNAL, require_parent=False)
+def _sessions_table_section():
+    with unit_of_work() as db:
+        all_sessions = session_frame(db)
+
+    st.write("### Lista de Sesiones")
+    
+    # Filtros
+    col1, col2 = st.columns(2)
+    with col1:
+        filter_sync = st.selectbox("Filtrar por estado de sincronización:", 
+                                  ["Todas", "Sincronizadas", "No sincronizadas"])
+    with col2:
+        filter_status = st.selectbox("Filtrar por estado de sesión:", 
+                                    ["Todas"] + [status.value for status in SessionStatus])
+    
+    # Aplicar filtros
+    filtered_sessions = all_sessions
+    if filter_sync == "Sincronizadas":
+        filtered_sessions = filtered_sessions[filtered_sessions["calendar_event_id"].notna()]
+    elif filter_sync == "No sincronizadas":
+        filtered_sessions = filtered_sessions[filtered_sessions["calendar_event_id"].isna()]
+        
+    if filter_status != "Todas":
+        filtered_sessions = filtered_sessions[filtered_sessions["status"] == filter_status]
+    
+    if not filtered_sessions.empty:
+        df_sessions = _session_table(filtered_sessions)
+        st.dataframe(df_sessions, use_container_width=True, hide_index=True)
+    else:
+        st.info("No hay sesiones que coincidan con los filtros seleccionados.")
+
+# Sesiones que lista el selector de acciones
+ACTION_SESSIONS = 200
+
+@st.fragment
+@traced(kind=KIND_INTERNAL, require_parent=False)
+def _session_actions_section(coach_id=None, allow_edit=True):
+    # El selector solo lista las sesiones más próximas a hoy; las demás se eligen por ID
+    today = datetime.combine(datetime.now().date(), datetime.min.time())
+    with unit_of_work() as db:
+        sessions = sessions_around(db, today, ACTION_SESSIONS, coach_id=coach_id)
+    if sessions.empty:
+        return
+
+    st.write("### Acciones")
+
+    # Etiqueta legible para cada sesión del selector
+    table = _session_table(sessions)
+    labels = dict(zip(table["ID"], "#" + table["ID"].astype(str) + " · " + table["Fecha"].astype(str) + " "
+                      + table["Hora"].astype(str) + " · " + table["Jugador"].astype(str)))
+
+    # Permitir al usuario seleccionar una sesión para realizar acciones
+    session_ids = table["ID"].tolist()
+    pick_column, id_column = st.columns([3, 1])
+    with pick_column:
+        selected_session_id = st.selectbox("Selecciona una sesión:", session_ids, format_func=labels.get)
+    with id_column:
+        typed_id = st.number_input("…o escribe su ID:", min_value=0, step=1, value=0)
+    if typed_id:
+        selected_session_id = int(typed_id)
+
+    # Obtener la sesión seleccionada (un coach solo puede actuar sobre las suyas)
+    selected_session = SessionService.get(selected_session_id)
+    if selected_session and coach_id is not None and selected_session.coach_id != coach_id:
+        selected_session = None
+    if selected_session is None:
+        st.warning(f"No hay ninguna sesión con ID {selected_session_id}")
+
+    if selected_session:
+        # Crear botones para acciones
+        columns = iter(st.columns(4 if allow_edit else 3))
+        with next(columns):
+            if st.button("✅ Completar"):
+                SessionService.update(selected_session_id, status=SessionStatus.COMPLETED)
+                st.success(f"Sesión {selected_session_id} marcada como completada")
+                st.rerun()
+        if allow_edit:
+            with next(columns):
+                if st.button("📝 Modificar"):
+                    # Esta acción abriría un formulario para modificar
+                    st.session_state["editing_session"] = selected_session_id
+        with next(columns):
+            if st.button("⏸️ Cancelar"):
+                SessionService.update(selected_session_id, status=SessionStatus.CANCELED)
+                st.success(f"Sesión {selected_session_id} cancelada")
+                st.rerun()
+        with next(columns):
+            if st.button("🗑️ Eliminar"):
+                if SessionService.delete(selected_session_id):
+                    st.success(f"Sesión {selected_session_id} eliminada")
+                    st.rerun()
+                else:
+                    st.error(f"Error al eliminar la sesión {selected_session_id}")
+
+        # Si estamos en modo edición, mostrar formulario
+        if "editing_session" in st.session_state and st.session_state["editing_session"] == selected_session_id:
+            st.write("### Editar Sesión")
+
+            # Obtener información actual
+            current_start = selected_session.start_time
+            current_end = selected_session.end_time
+            current_notes = selected_session.notes or ""
+
+            # Formulario de edición
+            edit_date = st.date_input("Fecha", current_start.date())
+            col1, col2 = st.columns(2)
+            with col1:
+                edit_start_time = st.time_input("Hora inicio", current_start.time())
+            with col2:
+                edit_end_time = st.time_input("Hora fin", current_end.time())
+
+            edit_notes = st.text_area("Notas", current_notes)
+
+            if st.button("Guardar cambios"):
+                # Combinar fecha y hora
+                new_start = datetime.combine(edit_date, edit_start_time)
+                new_end = datetime.combine(edit_date, edit_end_time)
+
+                # Actualizar la sesión
+                SessionService.update(
+                    selected_session_id,
+                    start_time=new_start,
+                    end_time=new_end,
+                    notes=edit_notes
+                )
+
+                # Limpiar estado de edición y recargar
+                st.session_state.pop("editing_session", None)
+                st.success("Sesión actualizada correctamente")
+                st.rerun()
+
+            if st.button("Cancelar edición"):
+                st.session_state.pop("editing_session", None)
+                st.rerun(scope="fragment")
+
+@st.fragment
+@traced(kind=KIND_INTERNAL, require_parent=False)
+def _coach_sessions_section(coach_id):
+    with unit_of_work() as db:
+        sess_list = session_frame(db, coach_id=coach_id)
+
+    if not sess_list.empty:
+        df_sessions = _session_table(sess_list, include_coach=False)
+        st.dataframe(df_sessions, use_container_width=True, hide_index=True)
+    else:
+        st.info("No tienes sesiones programadas.")
+
+@st.fragment
+@traced(kind=KIND_INTERNAL, require_parent=False)
+def _sync_section():
+    # Mostrar advertencia sobre el modo offline
+    st.warning("""
+    **Modo de Sincronización Manual**
+
+    Debido a las limitaciones de tasa de la API de Google Calendar, se ha implementado un modo de sincronización manual controlada:
+
+    1. Las sesiones se crean y actualizan primero en la base de datos local
+    2. La sincronización con Google Calendar se realiza de forma manual y controlada
+    3. Las sesiones se sincronizan de una en una para evitar errores de límite de tasa
+
+    Esta estrategia evita los errores de "Rate Limit Exceeded".
+    """)
+
+    # Estadísticas y sesiones pendientes a partir de la tabla de sesiones cacheada
+    with unit_of_work() as db:
+        sessions = session_frame(db)
+    pending_sessions = sessions[sessions["calendar_event_id"].isna()]
+    pending_count = len(pending_sessions)
+    total_sessions = len(sessions)
+    synced_sessions = total_sessions - pending_count
+
+    st.write("### Estadísticas de Sincronización")
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Total de sesiones", f"{total_sessions}")
+    with col2:
+        st.metric("Sesiones sincronizadas", f"{synced_sessions}")
+    with col3:
+        sync_percent = (synced_sessions / total_sessions * 100) if total_sessions > 0 else 0
+        st.metric("Porcentaje sincronizado", f"{sync_percent:.1f}%")
+
+    # Sección de sincronización controlada
+    st.write("### Sincronización Manual")
+
+    if pending_count == 0:
+        st.success("¡Todas las sesiones están sincronizadas con Google Calendar!")
+    else:
+        st.info(f"Hay {pending_count} sesiones pendientes de sincronizar con Google Calendar")
+
+        # Mostrar la primera sesión pendiente
+        session = pending_sessions.iloc[0]
+        session_id = int(session["id"])
+
+        st.write("#### Próxima sesión a sincronizar:")
+        st.write(f"ID: {session_id}")
+        st.write(f"Coach: {session['coach_name']} (ID: {session['coach_id']})")
+        st.write(f"Jugador: {session['player_name']} (ID: {session['player_id']})")
+        st.write(f"Fecha: {session['start_time'].strftime('%d/%m/%Y')} - Hora: {session['start_time'].strftime('%H:%M')} a {session['end_time'].strftime('%H:%M')}")
+        st.write(f"Estado: {session['status']}")
+
+        if st.button("Sincronizar Esta Sesión con Google Calendar"):
+            with st.spinner("Sincronizando sesión con Google Calendar..."):
+                try:
+                    with unit_of_work() as db:
+                        result = sync_single_session(db, session_id)
+                    if result:
+                        st.success(f"¡Sesión {session_id} sincronizada correctamente!")
+                    else:
+                        st.error(f"Error al sincronizar la sesión {session_id}")
+                except Exception as e:
+                    st.error(f"Error durante la sincronización: {str(e)}")
+
+            st.rerun()
+
+    # Reconciliación completa por hash de contenido
+    st.write("### Reconciliación BD ↔ Calendar")
+    st.caption("Compara el contenido de cada sesión con su evento y solo envía o trae los cambios reales.")
+    if st.button("Ejecutar reconciliación completa"):
+        with st.spinner("Reconciliando sesiones con Google Calendar..."):
+            try:
+                with unit_of_work() as db:
+                    stats = reconcile_calendar(db)
+                st.success("Reconciliación completada")
+                st.write(stats)
+            except Exception as e:
+                st.error(f"Error durante la reconciliación: {str(e)}")
+
+    # Estado del canal de notificaciones push (tools/calendar_webhook.py)
+    st.write("### Notificaciones de Calendar")
+    # Solo lectura: sin fila de estado no hay canal ni cambios pendientes
+    with unit_of_work() as db:
+        sync_state = db.get(CalendarSyncState, CALENDAR_ID)
+        channel_id = sync_state.channel_id if sync_state else None
+        channel_expiration = sync_state.channel_expiration if sync_state else None
+        dirty = bool(sync_state and sync_state.dirty)
+        last_pull_at = sync_state.last_pull_at if sync_state else None
+    if channel_id:
+        st.write(f"Canal activo hasta: {channel_expiration:%d/%m/%Y %H:%M}")
+    else:
+        st.info("No hay canal de notificaciones activo; los cambios en Calendar se traen con la reconciliación.")
+    st.write(f"Cambios pendientes de traer: {'Sí' if dirty else 'No'}")
+    if last_pull_at:
+        st.write(f"Última lectura de Calendar: {last_pull_at:%d/%m/%Y %H:%M}")
+
+@st.fragment
+@traced(kind=KIND_INTERNAL, require_parent=False)
+def _finance_section():
+    # Obtener los datos financieros (ahora con respaldo en caso de error)
+    df = get_financials()
+
+    # Verificar si estamos usando datos de respaldo
+    if 'Mes' in df.columns and len(df) == 12 and df['Mes'][0] == 'Enero':
+        st.warning("""
+        **Datos financieros de respaldo**
+
+        Se están mostrando datos financieros simulados debido a un problema de conexión con Google Sheets.
+        Consulta la pestaña de "Diagnóstico" para más información.
+        """)
+
+    # Mostrar los datos
+    st.dataframe(df)
+
+    # Mostrar gráfico de ingresos vs gastos
+    if 'Ingresos' in df.columns and 'Gastos' in df.columns:
+        st.write("### Ingresos vs Gastos")
+        chart_data = df[['Mes', 'Ingresos', 'Gastos']].set_index('Mes') if 'Mes' in df.columns else df[['Ingresos', 'Gastos']]
+        st.line_chart(chart_data)
+
+    # Ingresos y gastos frente a la actividad registrada
+    st.write("### Rentabilidad por sesión")
+    with unit_of_work() as db:
+        years = session_years(db)
+    year = st.selectbox("Año:", years)
+    with unit_of_work() as db:
+        revenue = get_revenue_analytics(db, df, year)
+    if not revenue["covered"]:
+        st.warning(f"La hoja financiera no tiene cifras de {year}: solo se muestran las sesiones.")
+    elif revenue["assumed_year"]:
+        st.info(f"La hoja financiera no tiene columna \"Año\": se asume que sus cifras son de {year}.")
+    money = {"revenue": "Ingresos", "costs": "Gastos", "sessions": "Sesiones", "share": "% sesiones",
+             "revenue_per_session": "Ingreso / sesión", "cost_per_session": "Coste / sesión",
+             "margin_per_session": "Margen / sesión"}
+    euro = "{:,.2f} €"
+    euro_columns = ["Ingresos", "Gastos"]
+    shares = {"% sesiones": "{:.1%}"}
+
+    monthly = revenue["monthly"].assign(month=revenue["monthly"]["month"].dt.strftime("%Y-%m"))
+    st.dataframe(
+        monthly.rename(columns={"month": "Mes", **money}).set_index("Mes")
+        .style.format({"Ingresos": euro, "Gastos": euro, "Ingreso / sesión": euro,
+                       "Coste / sesión": euro, "Margen / sesión": euro, "Sesiones": "{:.0f}"}, na_rep="-"),
+        use_container_width=True,
+    )
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.write("#### Por coach")
+        by_coach = revenue["by_coach"].drop(columns=["coach_id"]).rename(columns={"coach_name": "Coach", **money})
+        st.dataframe(by_coach.set_index("Coach").style.format(euro, subset=euro_columns, na_rep="-")
+                     .format(shares), use_container_width=True)
+        st.bar_chart(by_coach.set_index("Coach")["Sesiones"])
+    with col2:
+        st.write("#### Por servicio")
+        by_service = revenue["by_service"].rename(columns={"service": "Servicio", **money})
+        st.dataframe(by_service.set_index("Servicio").style.format(euro, subset=euro_columns, na_rep="-")
+                     .format(shares), use_container_width=True)
+        st.bar_chart(by_service.set_index("Servicio")["Sesiones"])
+
+@st.fragment
+@traced(kind=KIND_INTERNAL, require_parent=False)
+def _workload_section():
+    with unit_of_work() as db:
+        rates = coach_rates(db)
+    col1, col2 = st.columns(2)
+    with col1:
+        coach_options = {"Todos": None, **dict(zip(rates["coach_name"], rates["coach_id"]))}
+        coach_name = st.selectbox("Coach:", list(coach_options))
+    with col2:
+        measure = st.selectbox("Medida:", ["sessions", "hours"],
+                               format_func={"sessions": "Sesiones", "hours": "Horas"}.get)
+
+    with unit_of_work() as db:
+        workload = coach_workload(db, coach_id=coach_options[coach_name])
+    if workload.empty:
+        st.info("No hay sesiones para mostrar.")
+    else:
+        # Con "Todos" se suman los coaches en cada celda día × hora
+        heatmap = workload.groupby(["day", "hour"], observed=True)[["sessions", "hours"]].sum().reset_index()
+        chart = alt.Chart(heatmap).mark_rect().encode(
+            x=alt.X("hour:O", title="Hora"),
+            y=alt.Y("day:O", title="Día", sort=WEEKDAY_ORDER),
+            color=alt.Color(f"{measure}:Q", title="Sesiones" if measure == "sessions" else "Horas"),
+            tooltip=["day", "hour", "sessions", alt.Tooltip("hours:Q", format=".1f")],
+        )
+        st.altair_chart(chart, use_container_width=True)
+
+    st.write("### Tasas por coach")
+    st.dataframe(
+        rates.drop(columns=["coach_id"]).rename(columns={
+            "coach_name": "Coach", "total": "Sesiones", "completed": "Completadas",
+            "scheduled": "Programadas", "canceled": "Canceladas", "hours": "Horas impartidas",
+            "completion_rate": "% completadas", "cancellation_rate": "% canceladas",
+        }).style.format({"Horas impartidas": "{:.1f}", "% completadas": "{:.0%}", "% canceladas": "{:.0%}"}, na_rep="-"),
+        use_container_width=True,
+    )
+
+@st.fragment
+@traced(kind=KIND_INTERNAL, require_parent=False)
+def _users_section():
+    with unit_of_work() as db:
+        users = cached_frame(db, select(User.user_id, User.username, User.name, User.email, User.phone,
+                                        User.date_of_birth, User.user_type, User.permit_level)
+                             .order_by(User.user_id), prepare=_prepare_user_frame)
+    if not users.empty:
+        df_users = users.rename(columns={
+            "user_id": "ID", "username": "Username", "name": "Nombre", "email": "Email",
+            "phone": "Teléfono", "date_of_birth": "Fecha Nacimiento",
+            "user_type": "Tipo Usuario", "permit_level": "Nivel Permiso",
+        })
+        st.dataframe(df_users, use_container_width=True, hide_index=True)
+    else:
+        st.write("No hay usuarios registrados.")
 
-        with SessionLocal() as db:
-            total_players = db.query(Player).count()
-            total_coaches = db.query(Coach).count()
-            now = datetime.now()
-            start_of_month = now.replace(day=1)
-            start_of_week = now - timedelta(days=now.weekday())
+@st.fragment
+@traced(kind=KIND_INTERNAL, require_parent=False)
+def _import_section():
+    profile = st.selectbox("Dispositivo:", list(DEVICE_PROFILES),
+                           format_func=lambda key: DEVICE_PROFILES[key]["label"])
+    uploaded = st.file_uploader("Exportación CSV", type=["csv"])
 
-            sessions_month = db.query(Session).filter(Session.start_time >= start_of_month).count()
-            sessions_week = db.query(Session).filter(Session.start_time >= start_of_week).count()
+    if uploaded is not None:
+        try:
+            frame = read_device_csv(uploaded, profile)
+        except ValueError as e:
+            st.error(str(e))
+            frame = None
 
-        # Obtenemos datos financieros 
-        df_financial = get_financials()
+        if frame is not None:
+            st.write(f"**Filas leídas:** {len(frame)}")
+            st.dataframe(frame.head(50), use_container_width=True)
 
-        ingresos_mensuales = df_financial['Ingresos'].sum() if 'Ingresos' in df_financial.columns else 0
-        gastos_mensuales = df_financial['Gastos'].sum() if 'Gastos' in df_financial.columns else 0
+            # Validación previa sin escribir en la BD
+            with unit_of_work() as db:
+                preview = ingest_test_results(db, frame, dry_run=True)
+            st.write(f"**Nuevos:** {preview['new']} · "
+                     f"**Duplicados:** {preview['duplicates']} · **Sin fecha:** {preview['invalid']}")
+            if preview["unmatched"]:
+                st.warning(f"Jugadores no encontrados: {', '.join(preview['unmatched'])}")
 
-        col1, col2, col3 = st.columns(3)
+            if st.button("Importar"):
+                try:
+                    with unit_of_work() as db:
+                        report = ingest_test_results(db, frame)
+                    st.success(f"Importados {report['inserted']} tests de {len(report['player_ids'])} jugadores")
+                except Exception as e:
+                    st.error(f"Error en la importación (no se ha guardado nada): {e}")
+
+@st.fragment
+@traced(kind=KIND_INTERNAL, require_parent=False)
+def _diagnostics_section():
+    st.write("### Calentamiento del servidor")
+    warmup = warmup_status()
+    if warmup["ready"]:
+        st.success("Servidor listo")
+    else:
+        st.info("Calentamiento en curso...")
+    for step, info in warmup["steps"].items():
+        icon = "✅" if info["ok"] else "❌"
+        st.write(f"{icon} **{step}:** {info['seconds']:.2f}s {info.get('error', '')}")
+
+    _health_section()
+
+    st.write("### Conexión a Google Sheets")
+    
+    # Implementar un botón para probar la conexión
+    if st.button("Probar conexión a Google Sheets"):
+        with st.spinner("Probando conexión..."):
+            result = test_sheets_connection()
+        
+        if result["success"]:
+            st.success(result["message"])
+            if result["details"]:
+                st.write(f"**Título de la hoja:** {result['details']['sheet_title']}")
+                st.write(f"**URL de la hoja:** {result['details']['sheet_url']}")
+        else:
+            st.error(result["message"])
+            if result["details"]:
+                st.write(f"**Tipo de error:** {result['details']['error_type']}")
+                st.write(f"**Mensaje de error:** {result['details']['error_message']}")
+    
+    # Opción para resetear el modo offline
+    if st.button("Resetear modo offline para Google Sheets"):
+        reset_offline_mode()
+        st.success("Modo offline reseteado. En el próximo acceso se intentará conectar a Google Sheets.")
+        
+    st.write("### Variables de Entorno")
+    from config import DATABASE_URL, SERVICE_ACCOUNT, GOOGLE_CALENDAR_ID, GOOGLE_SHEET_ID
+    
+    env_vars = {
+        "GOOGLE_SERVICE_ACCOUNT_JSON": SERVICE_ACCOUNT,
+        "GOOGLE_SHEET_ID": GOOGLE_SHEET_ID,
+        "GOOGLE_CALENDAR_ID": GOOGLE_CALENDAR_ID,
+        "DATABASE_URL": DATABASE_URL
+    }
+    
+    for var, value in env_vars.items():
+        file_exists = False
+        if var == "GOOGLE_SERVICE_ACCOUNT_JSON" and value:
+            file_exists = os.path.exists(value)
+            st.write(f"**{var}:** {value} {'✅ (archivo existe)' if file_exists else '❌ (archivo no existe)'}")
+        else:
+            st.write(f"**{var}:** {value}")
+            
+    # Información sobre base de datos
+    st.write("### Base de Datos")
+    try:
+        with unit_of_work() as db:
+            db_stats = {
+                "Usuarios": db.query(User).count(),
+                "Coaches": db.query(Coach).count(),
+                "Jugadores": db.query(Player).count(),
+                "Sesiones": db.query(Session).count(),
+                "Sesiones sincronizadas con Calendar": db.query(Session).filter(Session.calendar_event_id.isnot(None)).count()
+            }
+            
+            for stat, value in db_stats.items():
+                st.write(f"**{stat}:** {value}")
+    except Exception as e:
+        st.error(f"Error al conectar con la base de datos: {str(e)}")
+
+    _profiling_controls()
+
+    # Trazas de los últimos renders (common/tracing.py)
+    st.write("### Trazas")
+    traces = read_traces(limit=100)
+    if not traces:
+        st.info("Todavía no hay trazas registradas.")
+        return
+    summaries = pd.DataFrame([trace_summary(spans) for spans in traces])
+    summaries["start"] = pd.to_datetime(summaries["start"], unit="s", utc=True).dt.tz_convert("Europe/Madrid")
+    slow_only = st.checkbox("Solo las más lentas (top 20)")
+    if slow_only:
+        summaries = summaries.nlargest(20, "duration_ms")
+    st.dataframe(
+        summaries.drop(columns=["trace_id"]).rename(columns={
+            "start": "Inicio", "name": "Traza", "duration_ms": "Total (ms)", "sql_ms": "SQL (ms)",
+            "sql_count": "Consultas", "google_ms": "Google (ms)", "google_count": "Llamadas Google",
+            "spans": "Spans", "errors": "Errores",
+        }).style.format({"Inicio": lambda t: t.strftime("%d/%m %H:%M:%S"), "Total (ms)": "{:.0f}",
+                         "SQL (ms)": "{:.0f}", "Google (ms)": "{:.0f}"}),
+        use_container_width=True, hide_index=True,
+    )
+
+    # Desglose de una traza: dónde se fue el tiempo
+    labels = dict(zip(summaries["trace_id"], summaries["start"].dt.strftime("%H:%M:%S") + " · " + summaries["name"]
+                      + " · " + summaries["duration_ms"].round().astype(int).astype(str) + " ms"))
+    trace_id = st.selectbox("Traza:", list(labels), format_func=labels.get)
+    spans = next(spans for spans in traces if spans[0]["traceId"] == trace_id)
+    rows = pd.DataFrame(span_rows(spans))
+    rows["name"] = ["\u2003" * depth + name for depth, name in zip(rows["depth"], rows["name"])]
+    st.dataframe(
+        rows.drop(columns=["depth"]).rename(columns={
+            "name": "Span", "offset_ms": "Inicio (ms)", "duration_ms": "Duración (ms)", "detail": "Detalle",
+        }).style.format({"Inicio (ms)": "{:.1f}", "Duración (ms)": "{:.1f}"}),
+        use_container_width=True, hide_index=True,
+    )
+
+HEALTH_ICONS = {"ok": "🟢", "degraded": "🟡", "down": "🔴", "unknown": "⚪", "not_configured": "⚪"}
+
+def _health_section():
+    # Sondas periódicas de BD, Sheets y Calendar (common/health.py)
+    st.write("### Salud de dependencias")
+    report = health.health_report()
+    st.write(f"{HEALTH_ICONS[report['status']]} **Estado global:** {report['status']} · "
+             f"{'listo' if report['ready'] else 'calentando'}")
+    st.dataframe(
+        pd.DataFrame([{
+            "Dependencia": name, "Estado": f"{HEALTH_ICONS[check['status']]} {check['status']}",
+            "p50 (ms)": check["p50_ms"], "p95 (ms)": check["p95_ms"], "p99 (ms)": check["p99_ms"],
+            "Errores": check["error_rate"], "Sondas": check["samples"],
+            "Último error": f"{check['last_error_at']} · {check['last_error']}" if check["last_error"] else "",
+        } for name, check in report["checks"].items()]).style.format(
+            {"p50 (ms)": "{:.0f}", "p95 (ms)": "{:.0f}", "p99 (ms)": "{:.0f}", "Errores": "{:.1%}"}, na_rep="-"),
+        use_container_width=True, hide_index=True,
+    )
+    st.button("Ejecutar sondas ahora", on_click=health.run_probes)
+
+    with st.expander("Histograma de latencias"):
+        histogram = pd.DataFrame([
+            {"Dependencia": name, "Latencia": bucket, "Sondas": count}
+            for name, check in report["checks"].items() if check["samples"]
+            for bucket, count in check["histogram"].items()
+        ])
+        if histogram.empty:
+            st.info("Todavía no hay sondas registradas.")
+        else:
+            st.altair_chart(alt.Chart(histogram).mark_bar().encode(
+                x=alt.X("Latencia:N", sort=list(histogram["Latencia"].unique())),
+                y="Sondas:Q", color="Dependencia:N", xOffset="Dependencia:N",
+            ), use_container_width=True)
+
+def _take_memory_snapshot():
+    st.session_state["memory_report"] = profiling.take_memory_snapshot()
+
+def _stop_memory_tracing():
+    profiling.stop_memory_tracing()
+    st.session_state.pop("memory_report", None)
+
+def _profiling_controls():
+    # cProfile del siguiente render de una página
+    st.write("### Perfilado")
+    col1, col2 = st.columns([2, 1])
+    with col1:
+        page = st.selectbox("Página a perfilar:", ["Administración", "Ballers"])
+    with col2:
+        st.write("")
+        st.button("Perfilar el siguiente render", on_click=profiling.arm_profile, args=(page,))
+    armed = profiling.armed_pages()
+    if armed:
+        st.info(f"Se perfilará el siguiente render de: {', '.join(armed)}")
+
+    captured = profiling.profiles()
+    if captured:
+        index = st.selectbox("Perfil:", range(len(captured)), format_func=lambda i: (
+            f"{captured[i]['at']:%H:%M:%S} · {captured[i]['page']} ({captured[i]['role']}) · {captured[i]['seconds']:.2f}s"))
+        profile = captured[index]
+        st.dataframe(
+            pd.DataFrame(profile["top"]).rename(columns={
+                "function": "Función", "ncalls": "Llamadas", "tottime": "Propio (s)", "cumtime": "Acumulado (s)",
+            }).style.format({"Propio (s)": "{:.4f}", "Acumulado (s)": "{:.4f}"}),
+            use_container_width=True, hide_index=True,
+        )
+        name = f"{profile['page']}_{profile['at']:%Y%m%d_%H%M%S}"
+        col1, col2 = st.columns(2)
         with col1:
-            st.metric("🏃‍♂️ Jugadores", f"{total_players}")
-            st.metric("🎯 Coaches", f"{total_coaches}")
+            st.download_button("Descargar .prof", profile["prof"], file_name=f"{name}.prof")
         with col2:
-            st.metric("📅 Sesiones Mes", f"{sessions_month}")
-            st.metric("📆 Sesiones Semana", f"{sessions_week}")
-        with col3:
-            st.metric("📈 Ingresos (€)", f"{ingresos_mensuales:,.2f} €")
-            st.metric("📉 Gastos (€)", f"{gastos_mensuales:,.2f} €")
+            st.download_button("Descargar .json", profiling.report_json(profile), file_name=f"{name}.json",
+                               mime="application/json")
+
+    # Memoria con tracemalloc
+    st.write("### Memoria")
+    if not profiling.memory_tracing():
+        st.caption("tracemalloc registra cada asignación: actívalo solo mientras diagnosticas.")
+        st.button("Activar tracemalloc", on_click=profiling.start_memory_tracing)
+        return
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.button("Tomar instantánea", on_click=_take_memory_snapshot)
+    with col2:
+        st.button("Desactivar tracemalloc", on_click=_stop_memory_tracing)
+
+    report = st.session_state.get("memory_report")
+    if report:
+        col1, col2 = st.columns(2)
+        col1.metric("Memoria trazada", f"{report['traced_kb'] / 1024:.1f} MB")
+        col2.metric("Pico", f"{report['peak_kb'] / 1024:.1f} MB")
+        st.write("#### Líneas que más memoria retienen")
+        st.dataframe(pd.DataFrame(report["top"]).rename(columns={
+            "site": "Línea", "size_kb": "KB", "count": "Bloques"}).style.format({"KB": "{:.1f}"}),
+            use_container_width=True, hide_index=True)
+        if report["growth"] is not None:
+            st.write(f"#### Crecimiento desde {report['since']}")
+            st.dataframe(pd.DataFrame(report["growth"]).rename(columns={
+                "site": "Línea", "size_diff_kb": "Δ KB", "count_diff": "Δ bloques", "size_kb": "KB"})
+                .style.format({"Δ KB": "{:+.1f}", "KB": "{:.1f}"}),
+                use_container_width=True, hide_index=True)
+        st.download_button("Descargar instantánea .json", profiling.report_json(report),
+                           file_name=f"memoria_{report['at'].replace(':', '')}.json", mime="application/json")
+
+# --------------------------------
+# Página
+# --------------------------------
+
+def show():
+    st.title("Administración")
+    user_type = st.session_state['user_type']
+
+    if user_type == 'admin':
+        _dashboard_section()
 
     # Pestañas para navegar entre las secciones
     tabs = []
     if user_type == 'admin':
-        tabs = ["Ver sesiones/CRUD sesiones", "Sincronización Calendar", "Informe Financiero", "Usuarios", "Diagnóstico"]
+        tabs = ["Ver sesiones/CRUD sesiones", "Sincronización Calendar", "Informe Financiero", "Carga de coaches", "Usuarios", "Importar tests", "Diagnóstico"]
     elif user_type == 'coach':
         tabs = ["Mis sesiones"]
 
     selected_tab = st.selectbox("Selecciona una opción:", tabs)
 
-    with SessionLocal() as db:
+    if selected_tab == "Ver sesiones/CRUD sesiones" and user_type == 'admin':
+        st.subheader("Gestión de Sesiones (Admin)")
+        _sessions_table_section()
+        _session_actions_section()
 
-        if selected_tab == "Ver sesiones/CRUD sesiones" and user_type == 'admin':
-            st.subheader("Gestión de Sesiones (Admin)")
-            
-            # Mostrar todas las sesiones en formato tabla
-            st.write("### Lista de Sesiones")
-            all_sessions = db.query(Session).all()
-            
-            # Filtros
-            col1, col2 = st.columns(2)
-            with col1:
-                filter_sync = st.selectbox("Filtrar por estado de sincronización:", 
-                                          ["Todas", "Sincronizadas", "No sincronizadas"])
-            with col2:
-                filter_status = st.selectbox("Filtrar por estado de sesión:", 
-                                            ["Todas"] + [status.value for status in SessionStatus])
-            
-            # Aplicar filtros
-            filtered_sessions = all_sessions
-            if filter_sync == "Sincronizadas":
-                filtered_sessions = [s for s in filtered_sessions if s.calendar_event_id]
-            elif filter_sync == "No sincronizadas":
-                filtered_sessions = [s for s in filtered_sessions if not s.calendar_event_id]
-                
-            if filter_status != "Todas":
-                filtered_sessions = [s for s in filtered_sessions if s.status.value == filter_status]
-            
-            # Generar datos para la tabla
-            session_data = []
-            for s in filtered_sessions:
-                # Obtener información del coach y jugador
-                coach = db.query(Coach).filter_by(coach_id=s.coach_id).first()
-                player = db.query(Player).filter_by(player_id=s.player_id).first()
-                
-                coach_name = "Desconocido"
-                player_name = "Desconocido"
-                
-                if coach:
-                    coach_user = db.query(User).filter_by(user_id=coach.user_id).first()
-                    if coach_user and coach_user.name:
-                        coach_name = coach_user.name
-                
-                if player:
-                    player_user = db.query(User).filter_by(user_id=player.user_id).first()
-                    if player_user and player_user.name:
-                        player_name = player_user.name
-                
-                # Determinar el símbolo de sincronización
-                sync_status = "✅" if s.calendar_event_id else "❌"
-                
-                # Formato de fecha y hora
-                fecha = s.start_time.strftime('%d/%m/%Y')
-                hora_inicio = s.start_time.strftime('%H:%M')
-                hora_fin = s.end_time.strftime('%H:%M')
-                
-                # Agregar los datos
-                session_data.append({
-                    "ID": s.id,
-                    "🔄": sync_status,
-                    "Fecha": fecha,
-                    "Hora": f"{hora_inicio} - {hora_fin}",
-                    "Jugador": player_name,
-                    "Entrenador": coach_name,
-                    "Estado": s.status.value,
-                })
-            
-            # Crear el DataFrame
-            if session_data:
-                df_sessions = pd.DataFrame(session_data)
-                st.dataframe(df_sessions, use_container_width=True)
-                
-                # Sección para acciones de sesión
-                st.write("### Acciones")
-                
-                # Permitir al usuario seleccionar una sesión para realizar acciones
-                session_ids = [s["ID"] for s in session_data]
-                selected_session_id = st.selectbox("Selecciona una sesión:", session_ids)
-                
-                # Obtener la sesión seleccionada
-                selected_session = db.query(Session).filter(Session.id == selected_session_id).first()
-                
-                if selected_session:
-                    # Crear botones para acciones
-                    col1, col2, col3, col4 = st.columns(4)
-                    with col1:
-                        if st.button("✅ Completar"):
-                            SessionService.update(db, selected_session_id, status=SessionStatus.COMPLETED)
-                            st.success(f"Sesión {selected_session_id} marcada como completada")
-                            st.rerun()
-                    with col2:
-                        if st.button("📝 Modificar"):
-                            # Esta acción abriría un formulario para modificar
-                            st.session_state["editing_session"] = selected_session_id
-                    with col3:
-                        if st.button("⏸️ Cancelar"):
-                            SessionService.update(db, selected_session_id, status=SessionStatus.CANCELED)
-                            st.success(f"Sesión {selected_session_id} cancelada")
-                            st.rerun()
-                    with col4:
-                        if st.button("🗑️ Eliminar"):
-                            if SessionService.delete(db, selected_session_id):
-                                st.success(f"Sesión {selected_session_id} eliminada")
-                                st.rerun()
-                            else:
-                                st.error(f"Error al eliminar la sesión {selected_session_id}")
-                    
-                    # Si estamos en modo edición, mostrar formulario
-                    if "editing_session" in st.session_state and st.session_state["editing_session"] == selected_session_id:
-                        st.write("### Editar Sesión")
-                        
-                        # Obtener información actual
-                        current_start = selected_session.start_time
-                        current_end = selected_session.end_time
-                        current_notes = selected_session.notes or ""
-                        
-                        # Formulario de edición
-                        edit_date = st.date_input("Fecha", current_start.date())
-                        col1, col2 = st.columns(2)
-                        with col1:
-                            edit_start_time = st.time_input("Hora inicio", current_start.time())
-                        with col2:
-                            edit_end_time = st.time_input("Hora fin", current_end.time())
-                        
-                        edit_notes = st.text_area("Notas", current_notes)
-                        
-                        if st.button("Guardar cambios"):
-                            # Combinar fecha y hora
-                            new_start = datetime.combine(edit_date, edit_start_time)
-                            new_end = datetime.combine(edit_date, edit_end_time)
-                            
-                            # Actualizar la sesión
-                            SessionService.update(
-                                db, 
-                                selected_session_id, 
-                                start_time=new_start,
-                                end_time=new_end,
-                                notes=edit_notes
-                            )
-                            
-                            # Limpiar estado de edición y recargar
-                            st.session_state.pop("editing_session", None)
-                            st.success("Sesión actualizada correctamente")
-                            st.rerun()
-                        
-                        if st.button("Cancelar edición"):
-                            st.session_state.pop("editing_session", None)
-                            st.rerun()
-            else:
-                st.info("No hay sesiones que coincidan con los filtros seleccionados.")
-                        
-        elif selected_tab == "Sincronización Calendar" and user_type == 'admin':
-            st.subheader("Sincronización con Google Calendar")
-            
-            # Mostrar advertencia sobre el modo offline
-            st.warning("""
-            **Modo de Sincronización Manual**
-            
-            Debido a las limitaciones de tasa de la API de Google Calendar, se ha implementado un modo de sincronización manual controlada:
-            
-            1. Las sesiones se crean y actualizan primero en la base de datos local
-            2. La sincronización con Google Calendar se realiza de forma manual y controlada
-            3. Las sesiones se sincronizan de una en una para evitar errores de límite de tasa
-            
-            Esta estrategia evita los errores de "Rate Limit Exceeded".
-            """)
-            
-            # Contador de sesiones pendientes
-            pending_sessions = db.query(Session).filter(Session.calendar_event_id.is_(None)).all()
-            pending_count = len(pending_sessions)
-            
-            # Estadísticas de sincronización
-            total_sessions = db.query(Session).count()
-            synced_sessions = db.query(Session).filter(Session.calendar_event_id.isnot(None)).count()
-            
-            st.write("### Estadísticas de Sincronización")
-            col1, col2, col3 = st.columns(3)
-            with col1:
-                st.metric("Total de sesiones", f"{total_sessions}")
-            with col2:
-                st.metric("Sesiones sincronizadas", f"{synced_sessions}")
-            with col3:
-                sync_percent = (synced_sessions / total_sessions * 100) if total_sessions > 0 else 0
-                st.metric("Porcentaje sincronizado", f"{sync_percent:.1f}%")
-            
-            # Sección de sincronización controlada
-            st.write("### Sincronización Manual")
-            
-            if pending_count == 0:
-                st.success("¡Todas las sesiones están sincronizadas con Google Calendar!")
-            else:
-                st.info(f"Hay {pending_count} sesiones pendientes de sincronizar con Google Calendar")
-                
-                # Mostrar la primera sesión pendiente
-                if pending_sessions:
-                    session = pending_sessions[0]
-                    
-                    st.write("#### Próxima sesión a sincronizar:")
-                    
-                    # Obtener información adicional
-                    coach = db.query(Coach).filter_by(coach_id=session.coach_id).first()
-                    player = db.query(Player).filter_by(player_id=session.player_id).first()
-                    
-                    coach_name = "Desconocido"
-                    player_name = "Desconocido"
-                    
-                    if coach:
-                        coach_user = db.query(User).filter_by(user_id=coach.user_id).first()
-                        if coach_user and coach_user.name:
-                            coach_name = coach_user.name
-                        
-                    if player:
-                        player_user = db.query(User).filter_by(user_id=player.user_id).first()
-                        if player_user and player_user.name:
-                            player_name = player_user.name
-                    
-                    st.write(f"ID: {session.id}")
-                    st.write(f"Coach: {coach_name} (ID: {session.coach_id})")
-                    st.write(f"Jugador: {player_name} (ID: {session.player_id})")
-                    st.write(f"Fecha: {session.start_time.strftime('%d/%m/%Y')} - Hora: {session.start_time.strftime('%H:%M')} a {session.end_time.strftime('%H:%M')}")
-                    st.write(f"Estado: {session.status.value}")
-                    
-                    if st.button("Sincronizar Esta Sesión con Google Calendar"):
-                        with st.spinner("Sincronizando sesión con Google Calendar..."):
-                            try:
-                                result = sync_single_session(db, session.id)
-                                if result:
-                                    st.success(f"¡Sesión {session.id} sincronizada correctamente!")
-                                else:
-                                    st.error(f"Error al sincronizar la sesión {session.id}")
-                            except Exception as e:
-                                st.error(f"Error durante la sincronización: {str(e)}")
-                                
-                        st.rerun()
-
-        elif selected_tab == "Mis sesiones" and user_type == 'coach':
-            st.subheader("Mis Sesiones (Coach)")
-            coach = db.query(Coach).filter_by(user_id=st.session_state['user_id']).first()
-            if coach:
-                # Obtener todas las sesiones del coach
-                sess_list = db.query(Session).filter_by(coach_id=coach.coach_id).all()
-                
-                # Crear datos para la tabla
-                session_data = []
-                for s in sess_list:
-                    # Obtener información del jugador
-                    player = db.query(Player).filter_by(player_id=s.player_id).first()
-                    player_name = "Desconocido"
-                    
-                    if player:
-                        player_user = db.query(User).filter_by(user_id=player.user_id).first()
-                        if player_user and player_user.name:
-                            player_name = player_user.name
-                    
-                    # Determinar el símbolo de sincronización
-                    sync_status = "✅" if s.calendar_event_id else "❌"
-                    
-                    # Formato de fecha y hora
-                    fecha = s.start_time.strftime('%d/%m/%Y')
-                    hora_inicio = s.start_time.strftime('%H:%M')
-                    hora_fin = s.end_time.strftime('%H:%M')
-                    
-                    # Agregar los datos
-                    session_data.append({
-                        "ID": s.id,
-                        "🔄": sync_status,
-                        "Fecha": fecha,
-                        "Hora": f"{hora_inicio} - {hora_fin}",
-                        "Jugador": player_name,
-                        "Estado": s.status.value
-                    })
-                
-                # Crear el DataFrame
-                if session_data:
-                    df_sessions = pd.DataFrame(session_data)
-                    st.dataframe(df_sessions, use_container_width=True)
-                    
-                    # Acciones para sesiones
-                    st.write("### Acciones")
-                    
-                    # Permitir al usuario seleccionar una sesión para realizar acciones
-                    session_ids = [s["ID"] for s in session_data]
-                    selected_session_id = st.selectbox("Selecciona una sesión:", session_ids)
-                    
-                    # Crear botones para acciones
-                    col1, col2, col3 = st.columns(3)
-                    with col1:
-                        if st.button("✅ Completar"):
-                            SessionService.update(db, selected_session_id, status=SessionStatus.COMPLETED)
-                            st.success(f"Sesión {selected_session_id} marcada como completada")
-                            st.rerun()
-                    with col2:
-                        if st.button("⏸️ Cancelar"):
-                            SessionService.update(db, selected_session_id, status=SessionStatus.CANCELED)
-                            st.success(f"Sesión {selected_session_id} cancelada")
-                            st.rerun()
-                    with col3:
-                        if st.button("🗑️ Eliminar"):
-                            if SessionService.delete(db, selected_session_id):
-                                st.success(f"Sesión {selected_session_id} eliminada")
-                                st.rerun()
-                            else:
-                                st.error(f"Error al eliminar la sesión {selected_session_id}")
-                else:
-                    st.info("No tienes sesiones programadas.")
-            else:
-                st.error("Perfil de coach no encontrado.")
+    elif selected_tab == "Sincronización Calendar" and user_type == 'admin':
+        st.subheader("Sincronización con Google Calendar")
+        _sync_section()
 
-        elif selected_tab == "Informe Financiero" and user_type == 'admin':
-            st.subheader("Informe Financiero")
-            
-            # Obtener los datos financieros (ahora con respaldo en caso de error)
-            df = get_financials()
-            
-            # Verificar si estamos usando datos de respaldo
-            if 'Mes' in df.columns and len(df) == 12 and df['Mes'][0] == 'Enero':
-                st.warning("""
-                **Datos financieros de respaldo**
-                
-                Se están mostrando datos financieros simulados debido a un problema de conexión con Google Sheets.
-                Consulta la pestaña de "Diagnóstico" para más información.
-                """)
-            
-            # Mostrar los datos
-            st.dataframe(df)
-            
-            # Mostrar gráfico de ingresos vs gastos
-            if 'Ingresos' in df.columns and 'Gastos' in df.columns:
-                st.write("### Ingresos vs Gastos")
-                chart_data = df[['Mes', 'Ingresos', 'Gastos']].set_index('Mes') if 'Mes' in df.columns else df[['Ingresos', 'Gastos']]
-                st.line_chart(chart_data)
-
-        elif selected_tab == "Usuarios" and user_type == 'admin':
-            st.subheader("Gestión de Usuarios")
-            users = db.query(User).all()
-            if users:
-                user_data = []
-                for user in users:
-                    user_data.append({
-                        "ID": user.user_id,
-                        "Username": user.username,
-                        "Nombre": user.name,
-                        "Email": user.email,
-                        "Teléfono": user.phone,
-                        "Fecha Nacimiento": user.date_of_birth,
-                        "Tipo Usuario": user.user_type.value,
-                        "Nivel Permiso": user.permit_level
-                    })
-                df_users = pd.DataFrame(user_data)
-                st.dataframe(df_users, use_container_width=True)
-            else:
-                st.write("No hay usuarios registrados.")
-                
-        elif selected_tab == "Diagnóstico" and user_type == 'admin':
-            st.subheader("Diagnóstico del Sistema")
-            
-            st.write("### Conexión a Google Sheets")
-            
-            # Implementar un botón para probar la conexión
-            if st.button("Probar conexión a Google Sheets"):
-                with st.spinner("Probando conexión..."):
-                    result = test_sheets_connection()
-                
-                if result["success"]:
-                    st.success(result["message"])
-                    if result["details"]:
-                        st.write(f"**Título de la hoja:** {result['details']['sheet_title']}")
-                        st.write(f"**URL de la hoja:** {result['details']['sheet_url']}")
-                else:
-                    st.error(result["message"])
-                    if result["details"]:
-                        st.write(f"**Tipo de error:** {result['details']['error_type']}")
-                        st.write(f"**Mensaje de error:** {result['details']['error_message']}")
-            
-            # Opción para resetear el modo offline
-            if st.button("Resetear modo offline para Google Sheets"):
-                reset_offline_mode()
-                st.success("Modo offline reseteado. En el próximo acceso se intentará conectar a Google Sheets.")
-                
-            st.write("### Variables de Entorno")
-            from config import DATABASE_URL, SERVICE_ACCOUNT, GOOGLE_CALENDAR_ID, GOOGLE_SHEET_ID
-            
-            env_vars = {
-                "GOOGLE_SERVICE_ACCOUNT_JSON": SERVICE_ACCOUNT,
-                "GOOGLE_SHEET_ID": GOOGLE_SHEET_ID,
-                "GOOGLE_CALENDAR_ID": GOOGLE_CALENDAR_ID,
-                "DATABASE_URL": DATABASE_URL
-            }
-            
-            for var, value in env_vars.items():
-                file_exists = False
-                if var == "GOOGLE_SERVICE_ACCOUNT_JSON" and value:
-                    file_exists = os.path.exists(value)
-                    st.write(f"**{var}:** {value} {'✅ (archivo existe)' if file_exists else '❌ (archivo no existe)'}")
-                else:
-                    st.write(f"**{var}:** {value}")
-                    
-            # Información sobre base de datos
-            st.write("### Base de Datos")
-            try:
-                with SessionLocal() as db:
-                    db_stats = {
-                        "Usuarios": db.query(User).count(),
-                        "Coaches": db.query(Coach).count(),
-                        "Jugadores": db.query(Player).count(),
-                        "Sesiones": db.query(Session).count(),
-                        "Sesiones sincronizadas con Calendar": db.query(Session).filter(Session.calendar_event_id.isnot(None)).count()
-                    }
-                    
-                    for stat, value in db_stats.items():
-                        st.write(f"**{stat}:** {value}")
-            except Exception as e:
-                st.error(f"Error al conectar con la base de datos: {str(e)}")
\ No newline at end of file
+    elif selected_tab == "Mis sesiones" and user_type == 'coach':
+        st.subheader("Mis Sesiones (Coach)")
+        with unit_of_work() as db:
+            coach_id = db.query(Coach.coach_id).filter_by(user_id=st.session_state['user_id']).scalar()
+        if coach_id:
+            _coach_sessions_section(coach_id)
+            _session_actions_section(coach_id=coach_id, allow_edit=False)
+        else:
+            st.error("Perfil de coach no encontrado.")
+
+    elif selected_tab == "Informe Financiero" and user_type == 'admin':
+        st.subheader("Informe Financiero")
+        _finance_section()
+
+    elif selected_tab == "Carga de coaches" and user_type == 'admin':
+        st.subheader("Carga y utilización de coaches")
+        _workload_section()
+
+    elif selected_tab == "Usuarios" and user_type == 'admin':
+        st.subheader("Gestión de Usuarios")
+        _users_section()
+
+    elif selected_tab == "Importar tests" and user_type == 'admin':
+        st.subheader("Importar resultados de tests")
+        _import_section()
+
+    elif selected_tab == "Diagnóstico" and user_type == 'admin':
+        st.subheader("Diagnóstico del Sistema")
+        _diagnostics_section()
@@ -1,38 +1,42 @@
 import streamlit as st
-from controllers.db_controller import get_session_local
 from datetime import datetime
+from sqlalchemy import select
+from controllers.query_cache import cached_select
 from models.player_model import Player
-from models.test_model import TestResult
+from models.user_model import User
+from controllers.player_analytics_controller import (
+    METRIC_COLUMNS, METRIC_LABELS, player_progression,
+)
+from controllers.rankings_controller import get_rankings
+from controllers.test_results_controller import query_metric_series
+from controllers.enrolment_controller import get_enrolment_ledger, enrolment_badge
 from common.services.session_service import SessionService  # Importamos la nueva clase del servicio
-import matplotlib.pyplot as plt
-
-# Conexión a BD
-SessionLocal = get_session_local()
+from common.services.player_service import PlayerService
+from common.services.unit_of_work import unit_of_work
+from common.services.chart_service import show_progression_chart
 
 
 def show():
     st.title("Ballers Profiles")
 
     # Filtrar lista de jugadores según rol
-    with SessionLocal() as db:
+    with unit_of_work() as db:
+        stmt = select(Player.player_id, User.name).join(Player, Player.user_id == User.user_id)
         if st.session_state['user_type'] == 'player':
-            players = db.query(Player).filter_by(user_id=st.session_state['user_id']).all()
-        else:
-            players = db.query(Player).all()
-        names = [p.user.name for p in players]
+            stmt = stmt.where(Player.user_id == st.session_state['user_id'])
+        rows = cached_select(db, stmt)
+        ledger = get_enrolment_ledger(db)
 
-    selected = st.selectbox("Select Player", names)
+    names = [row["name"] for row in rows]
+    badges = {row["name"]: enrolment_badge(ledger.get(row["player_id"])) for row in rows}
+    selected = st.selectbox("Select Player", names, format_func=lambda name: f"{name} · {badges[name]}")
     if not selected:
         return
 
-    with SessionLocal() as db:
-        if st.session_state['user_type'] == 'player':
-            p = db.query(Player).filter_by(user_id=st.session_state['user_id']).first()
-        else:
-            p = (db.query(Player)
-                .join(Player.user)
-                .filter(Player.user.has(name=selected))
-                .first())
+    if st.session_state['user_type'] == 'player':
+        p = PlayerService.get_profile(user_id=st.session_state['user_id'])
+    else:
+        p = PlayerService.get_profile(name=selected)
     if not p:
         st.error("Jugador no encontrado")
         return
@@ -40,42 +44,87 @@ def show():
     # Datos personales y físicos
     st.subheader("Datos Personales y Físicos")
     st.write({
-        "Nombre": p.user.name,
-        "Email": p.user.email,
-        "Teléfono": p.user.phone,
-        "Fecha Nacimiento": p.user.date_of_birth,
+        "Nombre": p.name,
+        "Email": p.email,
+        "Teléfono": p.phone,
+        "Fecha Nacimiento": p.date_of_birth,
         **({"Peso": getattr(p, "weight", None), "Altura": getattr(p, "height", None)})  
     })
 
     # Datos de servicio
     st.subheader("Datos de Servicio")
     st.write({"Servicio": p.service, "Sesiones inscritas": p.enrolment, "Notas": p.notes})
+    entry = ledger.get(p.player_id)
+    if entry is not None:
+        st.write(f"**Bono:** {enrolment_badge(entry)}")
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Completadas", entry["completed"])
+        col2.metric("Programadas", entry["scheduled"])
+        col3.metric("Canceladas", entry["canceled"])
+        col4.metric("Restantes", entry["remaining"])
 
     # Tests y progresión
     st.subheader("Resultados de Tests y Progresión")
-    tests = db.query(TestResult).filter_by(player_id=p.player_id).all()
-    if tests:
-        for t in tests:
-            st.write(f"{t.date.date()} - {t.test_name}: {getattr(t, t.test_name, t.value)}")
-        dates = [t.date for t in tests if t.test_name == 'sprint']
-        values = [t.sprint for t in tests if t.test_name == 'sprint']
-        if dates and values:
-            plt.figure()
-            plt.plot(dates, values)
-            plt.title('Progresión Sprint')
-            plt.xlabel('Fecha')
-            plt.ylabel('Tiempo (s)')
-            st.pyplot(plt)
+    with unit_of_work() as db:
+        progression = player_progression(db, p.player_id)
+    if progression is not None:
+        # Resumen de progresión de todas las métricas
+        summary = progression["summary"]
+        st.dataframe(
+            summary[["n_tests", "first", "latest", "delta", "rolling_mean", "trend_per_30d", "personal_best", "personal_best_date"]]
+            .rename(index=METRIC_LABELS, columns={
+                "n_tests": "Tests", "first": "Primero", "latest": "Último", "delta": "Δ anterior",
+                "rolling_mean": "Media móvil", "trend_per_30d": "Tendencia / 30 días",
+                "personal_best": "Mejor marca", "personal_best_date": "Fecha mejor marca",
+            }),
+            use_container_width=True,
+        )
+
+        # Posición frente al resto de la academia (mismo grupo de edad)
+        with unit_of_work() as db:
+            ranking = get_rankings().for_player(db, p.player_id)
+        if ranking is not None:
+            st.write(f"### Posición en la academia ({ranking['age_group'].iloc[0]})")
+            st.dataframe(
+                ranking[["value", "percentile", "z_score", "group_size"]]
+                .rename(index=METRIC_LABELS, columns={
+                    "value": "Último valor", "percentile": "Percentil", "z_score": "Z-score", "group_size": "Jugadores en el grupo",
+                }),
+                use_container_width=True,
+            )
+
+        # Gráfico: la BD agrupa por semana o mes si hay más tests de los que caben
+        metric = st.selectbox("Métrica", METRIC_COLUMNS, format_func=METRIC_LABELS.get)
+        with unit_of_work() as db:
+            series = query_metric_series(db, p.player_id, bucket="auto")
+        show_progression_chart(p.player_id, series, metric, progression["last_date"])
+
+        # Historial de tests en una ventana de fechas
+        st.write("### Historial")
+        col1, col2 = st.columns(2)
+        with col1:
+            window = st.date_input("Periodo", value=(progression["first_date"].date(), progression["last_date"].date()))
+        with col2:
+            granularity = st.selectbox("Agrupar por", ["auto", None, "week", "month"], format_func={
+                "auto": "Automático", None: "Sin agrupar", "week": "Semana", "month": "Mes",
+            }.get)
+        if isinstance(window, (list, tuple)) and len(window) == 2:
+            start = datetime.combine(window[0], datetime.min.time())
+            end = datetime.combine(window[1], datetime.max.time())
+            with unit_of_work() as db:
+                table = query_metric_series(db, p.player_id, start=start, end=end, bucket=granularity,
+                                            aggregates=("mean",))
+            labels = {"n_tests": "Tests", **METRIC_LABELS, **{f"{m}_mean": METRIC_LABELS[m] for m in METRIC_COLUMNS}}
+            st.dataframe(table.set_index("date").rename(columns=labels), use_container_width=True)
     else:
         st.write("No hay resultados de tests para este jugador.")
 
     # Calendario de sesiones
     st.subheader("Sesiones de Entrenamiento (Calendario)")
-    events = SessionService.list_for_player(p.user.email)  # Usamos el servicio para obtener las sesiones
-    if events:
-        for e in events:
-            start = e['start'].get('dateTime', e['start'].get('date'))
-            status = e.get('status', 'confirmed')
-            st.write(f"{start} - {status}")
+    sessions = SessionService.list_for_player(p.player_id)  # Usamos el servicio para obtener las sesiones
+    if sessions:
+        for session in sessions:
+            st.write(f"{session.start_time:%Y-%m-%d %H:%M} - {session.status.value} · {session.coach_name}")
     else:
         st.write("No hay sesiones en el calendario.")
+
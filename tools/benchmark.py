@@ -0,0 +1,396 @@
+# tools/benchmark.py
+# Benchmarks de las rutas calientes (servicios de sesiones, tabla de sesiones
+# del admin, contadores del dashboard, perfil de jugador, Sheets, sincronización
+# con Calendar y render de páginas) sobre BDs generadas con data/scale_db.py.
+# Google se sustituye por el emulador local de tools/fake_google.py.
+#
+# Cada tamaño se mide en un proceso aparte (la configuración se lee al
+# importar) y sobre una copia de la BD, así que las escrituras no se acumulan
+# entre ejecuciones. Los resultados se guardan en data/benchmarks/ en JSON.
+#
+#   python tools/benchmark.py --sizes small medium
+#   python tools/benchmark.py --sizes small --compare data/benchmarks/20261019_1200_a5735d5.json
+#   python tools/benchmark.py --compare-only antes.json despues.json
+import sys, os, pathlib, argparse
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import json
+import time
+import random
+import shutil
+import platform
+import statistics
+import subprocess
+import tempfile
+from datetime import datetime, timedelta
+
+RESULTS_DIR = ROOT / "data" / "benchmarks"
+BENCH_NOW = datetime(2026, 1, 15, 12)   # Fecha de referencia fija: misma BD en todos los commits
+LINKED_SESSIONS = 20_000                 # Sesiones enlazadas a eventos del emulador
+REMOTE_CHANGES = 0.10                    # Fracción de eventos cambiados en Calendar por ronda
+REGRESSION_THRESHOLD = 10.0              # % de empeoramiento de la mediana que se marca
+
+# Script de AppTest para los casos de página: solo el render de la página
+PAGE_SCRIPT = """
+import {module} as page
+page.show()
+"""
+
+
+# ─────────────────────────────────────────────────────────────
+# Medición
+# ─────────────────────────────────────────────────────────────
+
+def measure(func, rounds, setup=None, warmup=1):
+    """
+    Ejecuta `func` `warmup + rounds` veces (como benchmark.pedantic de
+    pytest-benchmark): `setup()` prepara cada ronda fuera del tiempo medido y
+    devuelve los argumentos de `func`. Devuelve estadísticas en milisegundos.
+    """
+    times, result = [], None
+    for i in range(warmup + rounds):
+        args = setup() if setup else ()
+        start = time.perf_counter()
+        result = func(*args)
+        elapsed = time.perf_counter() - start
+        if i >= warmup:
+            times.append(elapsed * 1000)
+    times.sort()
+    stats = {
+        "rounds": rounds,
+        "min_ms": times[0],
+        "max_ms": times[-1],
+        "mean_ms": statistics.fmean(times),
+        "median_ms": statistics.median(times),
+        "stddev_ms": statistics.stdev(times) if len(times) > 1 else 0.0,
+        "p95_ms": times[min(len(times) - 1, max(0, -(-95 * len(times) // 100) - 1))],
+        "ops": 1000 / statistics.fmean(times) if statistics.fmean(times) else None,
+    }
+    return stats, result
+
+
+# ─────────────────────────────────────────────────────────────
+# Casos (proceso hijo, con DATABASE_URL y Google apuntando a la copia y al emulador)
+# ─────────────────────────────────────────────────────────────
+
+def _link_calendar(fake, limit):
+    """
+    Enlaza las `limit` sesiones más recientes con eventos idénticos en el
+    emulador (mismo hash que en la BD). Devuelve los ids de evento.
+    """
+    from sqlalchemy import update
+    from common.services.unit_of_work import unit_of_work
+    from controllers.calendar_controller import (CALENDAR_TZ, _query_sessions_with_people, build_event_payload,
+                                                 compute_event_hash)
+    from models.session_model import Session
+
+    events, links = [], []
+    with unit_of_work() as db:
+        rows = _query_sessions_with_people(db).order_by(Session.id.desc()).limit(limit).all()
+        for session, coach_name, coach_email, player_name, player_email in rows:
+            payload = build_event_payload(session, coach_name, player_name, coach_email, player_email)
+            event_id = f"bench{session.id}"
+            links.append({"id": session.id, "calendar_event_id": event_id,
+                          "calendar_event_hash": compute_event_hash(payload)})
+            events.append({
+                "id": event_id, "summary": payload["summary"], "description": payload["description"],
+                "start": {"dateTime": payload["start"], "timeZone": CALENDAR_TZ},
+                "end": {"dateTime": payload["end"], "timeZone": CALENDAR_TZ},
+                "attendees": [{"email": email} for email in payload["attendees"]],
+                "status": "cancelled" if session.id % 50 == 0 else "confirmed",
+            })
+        db.execute(update(Session), links)
+    fake.load_events(events)
+    return [event["id"] for event in events]
+
+
+def _change_remote(fake, event_ids, fraction, rng, label):
+    # Cambios hechos "en Calendar": la siguiente sincronización los trae a la BD
+    for event_id in rng.sample(event_ids, max(1, int(len(event_ids) * fraction))):
+        fake.patch_event(event_id, {"description": f"Cambio remoto {label} {event_id}"})
+
+
+def run_cases(size, rounds, slow_rounds, fake):
+    from sqlalchemy import select, func
+    from streamlit.testing.v1 import AppTest
+
+    from common.services.async_runner import run_async
+    from common.services.player_service import PlayerService
+    from common.services.session_service import SessionService
+    from common.services.unit_of_work import unit_of_work
+    from common.warmup import is_ready, start_warmup
+    from controllers import sheets_controller
+    from controllers.calendar_controller import reconcile_calendar, sync_calendar_to_db
+    from controllers.dashboard_controller import dashboard_stats
+    from controllers.query_cache import query_cache
+    from controllers.session_controller import session_frame
+    from controllers.sheets_controller import fetch_financials
+    from models.coach_model import Coach
+    from models.player_model import Player
+    from models.session_model import Session
+    from pages.admin import _session_table
+
+    rng = random.Random(1234)
+    with unit_of_work() as db:
+        coach_ids = db.execute(select(Coach.coach_id)).scalars().all()
+        players = db.execute(select(Player.player_id, Player.user_id)).all()
+        session_ids = db.execute(select(Session.id)).scalars().all()
+        total_sessions = db.execute(select(func.count(Session.id))).scalar()
+
+    results = {}
+
+    def record(name, stats, **extra):
+        results[name] = {**stats, **extra}
+        print(f"  {name:<28} mediana {stats['median_ms']:10.2f} ms  p95 {stats['p95_ms']:10.2f} ms", flush=True)
+
+    # --- Servicio de sesiones ---
+    def create():
+        start = BENCH_NOW + timedelta(days=rng.randint(1, 60), hours=rng.randint(8, 20))
+        return SessionService.create(rng.choice(coach_ids), rng.choice(players).player_id, start,
+                                     start + timedelta(hours=1), "benchmark")
+    record("session.create", measure(create, rounds)[0])
+
+    record("session.update", measure(
+        lambda: SessionService.update(rng.choice(session_ids), notes=f"benchmark {rng.random()}"), rounds)[0])
+
+    record("session.delete", measure(SessionService.delete, rounds, setup=lambda: (create().id,))[0])
+
+    # --- Tabla de sesiones del admin (consulta + DataFrame + formato) ---
+    def session_table():
+        with unit_of_work() as db:
+            return _session_table(session_frame(db))
+    record("admin.session_table.cold", measure(session_table, rounds, setup=lambda: query_cache.clear() or ())[0],
+           rows=total_sessions)
+    record("admin.session_table.warm", measure(session_table, rounds)[0], rows=total_sessions)
+
+    # --- Dashboard y perfil de jugador ---
+    def counts():
+        with unit_of_work() as db:
+            return dashboard_stats(db)
+    record("dashboard.counts", measure(counts, rounds)[0])
+
+    record("player.profile", measure(lambda: PlayerService.get_profile(user_id=rng.choice(players).user_id),
+                                     rounds)[0])
+    record("player.sessions", measure(lambda: SessionService.list_for_player(rng.choice(players).player_id),
+                                      rounds)[0])
+
+    # --- Google Sheets (emulador) sin caché ---
+    def reset_financials():
+        fetch_financials.clear()
+        sheets_controller.sheets_offline_mode = False
+        return ()
+    stats, frame = measure(lambda: run_async(fetch_financials()), rounds, setup=reset_financials)
+    if "Año" not in frame.columns:
+        raise RuntimeError("fetch_financials devolvió los datos de respaldo: el emulador no respondió")
+    record("sheets.fetch_financials", stats, rows=len(frame))
+
+    # --- Sincronización con Calendar (emulador) ---
+    event_ids = _link_calendar(fake, min(LINKED_SESSIONS, total_sessions))
+    round_no = iter(range(10**6))
+
+    def full_sync_setup():
+        _change_remote(fake, event_ids, REMOTE_CHANGES, rng, next(round_no))
+        return ()
+
+    def full_sync():
+        with unit_of_work() as db:
+            return reconcile_calendar(db, create_missing=False)
+    stats, sync_stats = measure(full_sync, slow_rounds, setup=full_sync_setup)
+    record("calendar.reconcile", stats, sessions=total_sessions, linked=len(event_ids),
+           sessions_per_s=total_sessions / (stats["median_ms"] / 1000), last_round=sync_stats)
+
+    def incremental_setup():
+        _change_remote(fake, event_ids, REMOTE_CHANGES / 10, rng, next(round_no))
+        return ()
+
+    def incremental_sync():
+        with unit_of_work() as db:
+            return sync_calendar_to_db(db)
+    stats, sync_stats = measure(incremental_sync, slow_rounds, setup=incremental_setup)
+    changed = max(1, int(len(event_ids) * REMOTE_CHANGES / 10))
+    record("calendar.incremental", stats, changed=changed,
+           events_per_s=changed / (stats["median_ms"] / 1000), last_round=sync_stats)
+
+    # --- Render de páginas (AppTest, reruns de la misma sesión) ---
+    # Como en producción: se mide después del calentamiento. Se ejecuta solo
+    # page.show(), sin main.py: su loading() añade una espera fija de 1 s
+    start_warmup()
+    deadline = time.time() + 120
+    while not is_ready() and time.time() < deadline:
+        time.sleep(0.1)
+    player_user = players[0].user_id
+    for name, user_id, user_type, module in (("page.admin", 1, "admin", "pages.admin"),
+                                             ("page.ballers.player", player_user, "player", "pages.ballers")):
+        app = AppTest.from_string(PAGE_SCRIPT.format(module=module), default_timeout=300)
+        app.session_state["user_id"] = user_id
+        app.session_state["user_type"] = user_type
+
+        def render():
+            app.run()
+            if app.exception:
+                raise RuntimeError(f"{name}: {app.exception[0].value}")
+        record(name, measure(render, slow_rounds)[0])
+
+    return results
+
+
+def worker(size, database_url, output, rounds, slow_rounds):
+    """
+    Proceso hijo: levanta el emulador de Google, configura la aplicación para
+    usarlo junto con la copia de la BD y ejecuta todos los casos.
+    """
+    from tools.fake_google import FakeGoogle, write_service_account
+
+    fake = FakeGoogle().start()
+    credentials = pathlib.Path(output).with_suffix(".credentials.json")
+    write_service_account(credentials, fake.endpoint)
+    os.environ.update({
+        "DATABASE_URL": database_url,
+        "GOOGLE_API_ENDPOINT": fake.endpoint,
+        "GOOGLE_SERVICE_ACCOUNT_JSON": str(credentials),
+        "GOOGLE_SERVICE_ACCOUNT_FILE": str(credentials),
+        "GOOGLE_SHEET_ID": "local",
+        "GOOGLE_CALENDAR_ID": "primary",
+        "CACHE_BACKEND": "memory",
+        "TRACE_ENABLED": "false",
+        "LOG_LEVEL": "WARNING",
+        "HEALTH_PORT": "0",
+        "HEALTH_PROBE_INTERVAL": "3600",
+    })
+    os.chdir(ROOT)   # main.py usa rutas relativas (assets/, styles/)
+
+    from common.logging_config import setup_logging
+    setup_logging(fmt="text")
+
+    results = run_cases(size, rounds, slow_rounds, fake)
+    fake.shutdown()
+    pathlib.Path(output).write_text(json.dumps(results, default=str))
+
+
+# ─────────────────────────────────────────────────────────────
+# Orquestación y comparación
+# ─────────────────────────────────────────────────────────────
+
+def _git(*args):
+    try:
+        return subprocess.run(["git", *args], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _bench_database(size, seed, rebuild):
+    """
+    BD de referencia del tamaño dado, generada una vez y reutilizada.
+    """
+    from data.scale_db import PRESETS, generate
+
+    path = ROOT / "data" / f"bench_{size}_s{seed}.db"
+    if rebuild and path.exists():
+        path.unlink()
+    if not path.exists():
+        print(f"Generando BD {size} en {path}...")
+        generate(f"sqlite:///{path}", *PRESETS[size], seed=seed, now=BENCH_NOW, verbose=False)
+    return path
+
+
+def run(sizes, rounds, slow_rounds, seed, rebuild):
+    report = {
+        "meta": {
+            "commit": _git("rev-parse", "--short", "HEAD"),
+            "dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+            "date": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "rounds": rounds,
+            "slow_rounds": slow_rounds,
+            "seed": seed,
+        },
+        "results": {},
+    }
+    for size in sizes:
+        source = _bench_database(size, seed, rebuild)
+        with tempfile.TemporaryDirectory() as tmp:
+            database = pathlib.Path(tmp) / source.name
+            shutil.copyfile(source, database)
+            output = pathlib.Path(tmp) / "results.json"
+            log = pathlib.Path(tmp) / "worker.log"
+            print(f"[{size}]")
+            # El log del proceso hijo (y los avisos de Streamlit fuera de "streamlit run") solo se
+            # muestra si falla
+            with open(log, "w") as stderr:
+                proc = subprocess.run([sys.executable, __file__, "--worker", size, f"sqlite:///{database}",
+                                         str(output), "--rounds", str(rounds), "--slow-rounds", str(slow_rounds)],
+                                        cwd=ROOT, stderr=stderr)
+            if proc.returncode:
+                print(log.read_text()[-5000:], file=sys.stderr)
+                raise SystemExit(f"El benchmark {size} ha fallado")
+            report["results"][size] = json.loads(output.read_text())
+
+    RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+    path = RESULTS_DIR / f"{datetime.now():%Y%m%d_%H%M%S}_{report['meta']['commit'] or 'nogit'}.json"
+    path.write_text(json.dumps(report, indent=2, default=str))
+    print(f"Resultados en {path}")
+    return path
+
+
+def compare(old_path, new_path, threshold=REGRESSION_THRESHOLD):
+    """
+    Compara las medianas de dos ejecuciones. Devuelve el número de casos que
+    empeoran más de `threshold` %.
+    """
+    old, new = (json.loads(pathlib.Path(p).read_text()) for p in (old_path, new_path))
+    print(f"Comparando {old['meta']['commit']} ({old['meta']['date']}) -> {new['meta']['commit']} "
+          f"({new['meta']['date']})")
+    regressions = 0
+    for size, cases in new["results"].items():
+        previous = old["results"].get(size, {})
+        print(f"[{size}]")
+        for name, stats in cases.items():
+            if name not in previous:
+                print(f"  {name:<28} {'':>12}   {stats['median_ms']:10.2f} ms  (nuevo)")
+                continue
+            before, after = previous[name]["median_ms"], stats["median_ms"]
+            delta = (after - before) / before * 100 if before else 0.0
+            flag = ""
+            if delta > threshold:
+                flag, regressions = "  << REGRESIÓN", regressions + 1
+            elif delta < -threshold:
+                flag = "  mejora"
+            print(f"  {name:<28} {before:10.2f} ms -> {after:10.2f} ms  {delta:+7.1f}%{flag}")
+    return regressions
+
+
+def main():
+    from data.scale_db import PRESETS
+
+    parser = argparse.ArgumentParser(description="Benchmarks de controladores, servicios y páginas")
+    parser.add_argument("--sizes", nargs="+", choices=sorted(PRESETS), default=["small"],
+                        help="Tamaños de BD (presets de data/scale_db.py)")
+    parser.add_argument("--rounds", type=int, default=20, help="Rondas de los casos rápidos")
+    parser.add_argument("--slow-rounds", type=int, default=3, help="Rondas de sincronización y render de páginas")
+    parser.add_argument("--seed", type=int, default=42, help="Semilla de las BDs generadas")
+    parser.add_argument("--rebuild", action="store_true", help="Regenerar las BDs de referencia")
+    parser.add_argument("--compare", metavar="JSON", help="Comparar el resultado con una ejecución anterior")
+    parser.add_argument("--compare-only", nargs=2, metavar=("ANTES", "DESPUES"), help="Solo comparar dos ficheros")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD,
+                        help="%% de empeoramiento que cuenta como regresión")
+    parser.add_argument("--fail-on-regression", action="store_true", help="Salir con código 1 si hay regresiones")
+    parser.add_argument("--worker", nargs=3, metavar=("SIZE", "URL", "OUTPUT"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker(*args.worker, rounds=args.rounds, slow_rounds=args.slow_rounds)
+        return
+
+    if args.compare_only:
+        regressions = compare(*args.compare_only, threshold=args.threshold)
+    else:
+        path = run(args.sizes, args.rounds, args.slow_rounds, args.seed, args.rebuild)
+        regressions = compare(args.compare, path, threshold=args.threshold) if args.compare else 0
+    if regressions and args.fail_on_regression:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+# tools/calendar_webhook.py
+# Receptor de notificaciones push de Google Calendar (events.watch).
+#
+#   python tools/calendar_webhook.py --address https://mi-dominio/calendar-webhook
+#   python tools/calendar_webhook.py --local     # canal local para probar con fake_calendar_push.py
+#
+# Con --local las lecturas incrementales tampoco van a Google: si
+# GOOGLE_API_ENDPOINT no apunta ya a un emulador, se arranca aquí
+# tools/fake_google.py con una cuenta de servicio propia (no hacen falta
+# credenciales reales).
+import sys, os, pathlib, argparse, tempfile
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+
+
+def _start_local_google():
+    """
+    Arranca el emulador de Google y apunta a él la configuración. Debe
+    llamarse antes de importar los controladores (leen el entorno al importarse).
+    """
+    from tools.fake_google import FakeGoogle, write_service_account
+
+    fake = FakeGoogle().start()
+    credentials = write_service_account(pathlib.Path(tempfile.mkdtemp()) / "fake_service_account.json",
+                                        fake.endpoint)
+    os.environ.update({
+        "GOOGLE_API_ENDPOINT": fake.endpoint,
+        "GOOGLE_SERVICE_ACCOUNT_JSON": str(credentials),
+        "GOOGLE_SERVICE_ACCOUNT_FILE": str(credentials),
+    })
+    print(f"Emulador de Google en {fake.endpoint}")
+    return fake
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Receptor de notificaciones de Google Calendar")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8502)
+    parser.add_argument("--address", help="URL HTTPS pública a la que Google enviará las notificaciones")
+    parser.add_argument("--local", action="store_true", help="Crear un canal local sin llamar a Google")
+    parser.add_argument("--renew-interval", type=int, default=3600,
+                        help="Segundos entre comprobaciones de caducidad del canal")
+    args = parser.parse_args()
+
+    if not args.local and not args.address:
+        parser.error("Indica --address o usa --local")
+    if args.local and not os.getenv("GOOGLE_API_ENDPOINT"):
+        _start_local_google()
+
+    from common.logging_config import setup_logging
+    from controllers.db_controller import get_session_local
+    from controllers.calendar_watch_controller import (
+        CalendarWebhookReceiver, renew_watch_channel, start_local_channel,
+    )
+
+    setup_logging(fmt="text")
+
+    SessionLocal = get_session_local()
+    with SessionLocal() as db:
+        if args.local:
+            state = start_local_channel(db)
+            print(f"Canal local: {state.channel_id}")
+        else:
+            renew_watch_channel(db, args.address)
+
+    receiver = CalendarWebhookReceiver(args.host, args.port,
+                                       address=None if args.local else args.address,
+                                       renew_interval=args.renew_interval)
+    try:
+        receiver.serve_forever()
+    except KeyboardInterrupt:
+        receiver.shutdown()
+
+
+if __name__ == "__main__":
+    main()
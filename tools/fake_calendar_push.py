@@ -0,0 +1,52 @@
+# tools/fake_calendar_push.py
+# Sustituto local de Google: envía al receptor una notificación con las mismas
+# cabeceras que events.watch, usando el canal guardado en la BD.
+#
+#   python tools/fake_calendar_push.py --url http://localhost:8502 --state exists
+import sys, pathlib, argparse
+import urllib.request
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+
+from controllers.db_controller import get_session_local
+from controllers.calendar_controller import get_sync_state
+
+_message_number = 0
+
+
+def send_notification(url, channel_id, channel_token, resource_state="exists", resource_id="local"):
+    """
+    Envía una notificación push como lo haría Google Calendar y devuelve el código HTTP.
+    """
+    global _message_number
+    _message_number += 1
+    request = urllib.request.Request(url, data=b"", method="POST", headers={
+        "X-Goog-Channel-ID": channel_id,
+        "X-Goog-Channel-Token": channel_token,
+        "X-Goog-Resource-ID": resource_id,
+        "X-Goog-Resource-State": resource_state,
+        "X-Goog-Message-Number": str(_message_number),
+    })
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simula una notificación push de Google Calendar")
+    parser.add_argument("--url", default="http://localhost:8502")
+    parser.add_argument("--state", default="exists", choices=["sync", "exists", "not_exists"])
+    args = parser.parse_args()
+
+    with get_session_local()() as db:
+        state = get_sync_state(db)
+        if not state.channel_id:
+            sys.exit("No hay canal registrado; arranca el receptor con --local")
+        status = send_notification(args.url, state.channel_id, state.channel_token,
+                                   args.state, state.channel_resource_id or "local")
+    print(f"Respuesta del receptor: {status}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+# tools/fake_google.py
+# Emulador local de las APIs de Google que usa la aplicación (token OAuth de la
+# cuenta de servicio, lectura de Sheets y eventos de Calendar), para medir y
+# probar sin red ni cuotas. Las llamadas van aquí con GOOGLE_API_ENDPOINT.
+#
+#   python tools/fake_google.py --port 8504 --credentials data/fake_service_account.json
+#   GOOGLE_API_ENDPOINT=http://localhost:8504/ GOOGLE_SERVICE_ACCOUNT_JSON=data/fake_service_account.json \
+#       GOOGLE_SHEET_ID=local streamlit run main.py
+import sys, pathlib, argparse
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+
+import json
+import time
+import uuid
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs, unquote
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+MONTHS = ["Enero", "Febrero", "Marzo", "Abril", "Mayo", "Junio", "Julio", "Agosto", "Septiembre", "Octubre",
+          "Noviembre", "Diciembre"]
+
+
+def financial_rows(rows=24, first_year=2024):
+    """
+    Hoja financiera con las columnas que lee la aplicación, una fila por mes
+    (o varias por mes si `rows` supera los meses del periodo).
+    """
+    values = [["Mes", "Año", "Ingresos", "Gastos", "Beneficio"]]
+    for i in range(rows):
+        income, costs = 5000 + (i * 37) % 1500, 4000 + (i * 23) % 1200
+        values.append([MONTHS[i % 12], first_year + (i // 12) % 3, income, costs, income - costs])
+    return values
+
+
+def write_service_account(path, endpoint):
+    """
+    Escribe una cuenta de servicio con una clave RSA nueva cuyo token_uri
+    apunta al emulador: google-auth firma y pide el token como con Google.
+    """
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    pem = key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                            serialization.NoEncryption()).decode()
+    info = {
+        "type": "service_account",
+        "project_id": "ballers-local",
+        "private_key_id": uuid.uuid4().hex,
+        "private_key": pem,
+        "client_email": "ballers@ballers-local.iam.gserviceaccount.com",
+        "client_id": "0",
+        "token_uri": f"{endpoint}token",
+    }
+    pathlib.Path(path).write_text(json.dumps(info, indent=2))
+    return path
+
+
+def _public(event):
+    return {k: v for k, v in event.items() if k != "_seq"} if event else event
+
+
+class FakeGoogle:
+    """
+    Estado del emulador: filas de la hoja y eventos del calendario. Cada
+    cambio de un evento recibe un número de secuencia, que hace de syncToken.
+    """
+
+    def __init__(self, sheet_values=None, latency_ms=0):
+        self.sheet_values = sheet_values or financial_rows()
+        self.latency_ms = latency_ms
+        self.events = {}        # id -> evento (con "_seq")
+        self.requests = 0
+        self._seq = 0
+        self._lock = threading.Lock()
+        self._server = None
+
+    @property
+    def endpoint(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def load_events(self, events):
+        """
+        Sustituye los eventos del calendario (diccionarios con "id").
+        """
+        with self._lock:
+            self.events = {}
+            for event in events:
+                self._store(dict(event))
+
+    def _store(self, event):
+        self._seq += 1
+        event["_seq"] = self._seq
+        event.setdefault("status", "confirmed")
+        self.events[event["id"]] = event
+        return event
+
+    # --------------------------------
+    # Calendar
+    # --------------------------------
+
+    def list_events(self, query):
+        page_size = int(query.get("maxResults", 250))
+        offset = int(query.get("pageToken", 0))
+        with self._lock:
+            if "syncToken" in query:
+                since = int(query["syncToken"])
+                events = [e for e in self.events.values() if e["_seq"] > since]
+            else:
+                events = list(self.events.values())
+                if query.get("showDeleted", "false") != "true":
+                    events = [e for e in events if e["status"] != "cancelled"]
+                if "timeMin" in query:
+                    events = [e for e in events if e["end"]["dateTime"] >= query["timeMin"][:19]]
+                if "timeMax" in query:
+                    events = [e for e in events if e["start"]["dateTime"] < query["timeMax"][:19]]
+            seq = self._seq
+        page = [_public(e) for e in events[offset:offset + page_size]]
+        response = {"kind": "calendar#events", "items": page}
+        if offset + page_size < len(events):
+            response["nextPageToken"] = str(offset + page_size)
+        else:
+            response["nextSyncToken"] = str(seq)
+        return response
+
+    def insert_event(self, body):
+        with self._lock:
+            return _public(self._store({**body, "id": uuid.uuid4().hex}))
+
+    def patch_event(self, event_id, body):
+        with self._lock:
+            if event_id not in self.events:
+                return None
+            return _public(self._store({**self.events[event_id], **body}))
+
+    def delete_event(self, event_id):
+        with self._lock:
+            if event_id not in self.events:
+                return False
+            self._store({**self.events[event_id], "status": "cancelled"})
+            return True
+
+    # --------------------------------
+    # Servidor
+    # --------------------------------
+
+    def start(self, host="127.0.0.1", port=0):
+        self._server = ThreadingHTTPServer((host, port), _make_handler(self))
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name="fake-google", daemon=True).start()
+        return self
+
+    def shutdown(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+
+def _make_handler(fake):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _reply(self, code, data=None):
+            body = json.dumps(data).encode() if data is not None else b""
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _body(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            return json.loads(self.rfile.read(length) or b"{}") if length else {}
+
+        def _route(self, method):
+            fake.requests += 1
+            if fake.latency_ms:
+                time.sleep(fake.latency_ms / 1000)
+            url = urlsplit(self.path)
+            parts = [unquote(p) for p in url.path.strip("/").split("/")]
+            query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+
+            if parts == ["token"] and method == "POST":
+                self.rfile.read(int(self.headers.get("Content-Length") or 0))   # JWT firmado: no se valida
+                return self._reply(200, {"access_token": "local-token", "expires_in": 3600, "token_type": "Bearer"})
+
+            if parts[:2] == ["v4", "spreadsheets"] and method == "GET":
+                if len(parts) == 3:
+                    return self._reply(200, {"spreadsheetId": parts[2], "properties": {"title": "Ballers (local)"}})
+                if len(parts) == 5 and parts[3] == "values":
+                    return self._reply(200, {"range": parts[4], "majorDimension": "ROWS",
+                                             "values": fake.sheet_values})
+
+            if parts[:3] == ["calendar", "v3", "calendars"] and len(parts) >= 5 and parts[4] == "events":
+                event_id = parts[5] if len(parts) > 5 else None
+                if method == "GET" and event_id is None:
+                    return self._reply(200, fake.list_events(query))
+                if method == "POST" and event_id is None:
+                    return self._reply(200, fake.insert_event(self._body()))
+                if method == "GET":
+                    event = _public(fake.events.get(event_id))
+                    return self._reply(200, event) if event else self._reply(404, {"error": {"code": 404}})
+                if method in ("PATCH", "PUT"):
+                    event = fake.patch_event(event_id, self._body())
+                    return self._reply(200, event) if event else self._reply(404, {"error": {"code": 404}})
+                if method == "DELETE":
+                    return self._reply(204) if fake.delete_event(event_id) else self._reply(404, {"error": {"code": 404}})
+
+            self._reply(404, {"error": {"code": 404, "message": f"Ruta no emulada: {method} {url.path}"}})
+
+        def do_GET(self):
+            self._route("GET")
+
+        def do_POST(self):
+            self._route("POST")
+
+        def do_PATCH(self):
+            self._route("PATCH")
+
+        def do_PUT(self):
+            self._route("PUT")
+
+        def do_DELETE(self):
+            self._route("DELETE")
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Emulador local de Google Sheets y Calendar")
+    parser.add_argument("--port", type=int, default=8504)
+    parser.add_argument("--credentials", default="data/fake_service_account.json",
+                        help="Dónde escribir la cuenta de servicio del emulador")
+    parser.add_argument("--sheet-rows", type=int, default=24, help="Filas de la hoja financiera")
+    parser.add_argument("--latency-ms", type=int, default=0, help="Retardo añadido a cada petición")
+    args = parser.parse_args()
+
+    fake = FakeGoogle(financial_rows(args.sheet_rows), args.latency_ms).start("127.0.0.1", args.port)
+    write_service_account(args.credentials, fake.endpoint)
+    print(f"Emulador en {fake.endpoint}")
+    print(f"  GOOGLE_API_ENDPOINT={fake.endpoint} GOOGLE_SERVICE_ACCOUNT_JSON={args.credentials} GOOGLE_SHEET_ID=local")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        fake.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+# tools/fake_redis.py
+# Servidor mínimo compatible con Redis (protocolo RESP) para probar en local la
+# caché compartida entre varias réplicas sin instalar Redis.
+# Soporta PING, AUTH, SELECT, GET, SET (EX/PX/NX/XX), DEL, EXISTS, INCR, PEXPIRE,
+# FLUSHDB y EVAL solo con el script de borrado condicional de common/cache.py.
+#
+#   python tools/fake_redis.py --port 6379
+#   CACHE_BACKEND=redis CACHE_REDIS_URL=redis://localhost:6379/0 streamlit run main.py
+import argparse
+import threading
+import time
+import socketserver
+
+# Mismo texto que common.cache.DELETE_IF_SCRIPT (sin importar la aplicación)
+DELETE_IF_SCRIPT = ('if redis.call("GET", KEYS[1]) == ARGV[1] then '
+                    'return redis.call("DEL", KEYS[1]) else return 0 end')
+
+_data = {}    # key -> (value, expires_at | None)
+_lock = threading.Lock()
+
+
+def _get(key):
+    entry = _data.get(key)
+    if entry is None:
+        return None
+    value, expires_at = entry
+    if expires_at is not None and expires_at < time.time():
+        del _data[key]
+        return None
+    return value
+
+
+def _execute(args):
+    command = args[0].upper()
+    if command == b"PING":
+        return b"+PONG\r\n"
+    if command in (b"AUTH", b"SELECT"):
+        return b"+OK\r\n"
+    with _lock:
+        if command == b"GET":
+            value = _get(args[1])
+            return b"$-1\r\n" if value is None else b"$%d\r\n%s\r\n" % (len(value), value)
+        if command == b"SET":
+            key, value = args[1], args[2]
+            expires_at, only_new, only_existing = None, False, False
+            options = [a.upper() for a in args[3:]]
+            for i, option in enumerate(options):
+                if option == b"EX":
+                    expires_at = time.time() + int(args[4 + i])
+                elif option == b"PX":
+                    expires_at = time.time() + int(args[4 + i]) / 1000
+                elif option == b"NX":
+                    only_new = True
+                elif option == b"XX":
+                    only_existing = True
+            exists = _get(key) is not None
+            if (only_new and exists) or (only_existing and not exists):
+                return b"$-1\r\n"
+            _data[key] = (value, expires_at)
+            return b"+OK\r\n"
+        if command == b"DEL":
+            removed = sum(1 for key in args[1:] if _get(key) is not None and _data.pop(key, None))
+            return b":%d\r\n" % removed
+        if command == b"EXISTS":
+            return b":%d\r\n" % sum(1 for key in args[1:] if _get(key) is not None)
+        if command == b"INCR":
+            value = int(_get(args[1]) or 0) + 1
+            _data[args[1]] = (str(value).encode(), _data.get(args[1], (None, None))[1])
+            return b":%d\r\n" % value
+        if command == b"PEXPIRE":
+            if _get(args[1]) is None:
+                return b":0\r\n"
+            _data[args[1]] = (_data[args[1]][0], time.time() + int(args[2]) / 1000)
+            return b":1\r\n"
+        if command == b"EVAL" and args[1].decode() == DELETE_IF_SCRIPT:
+            # KEYS[1] = args[3], ARGV[1] = args[4]
+            if _get(args[3]) == args[4]:
+                del _data[args[3]]
+                return b":1\r\n"
+            return b":0\r\n"
+        if command == b"FLUSHDB":
+            _data.clear()
+            return b"+OK\r\n"
+    return b"-ERR unknown command '%s'\r\n" % command
+
+
+class RESPHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            if not line.startswith(b"*"):
+                self.wfile.write(b"-ERR protocol error\r\n")
+                return
+            args = []
+            for _ in range(int(line[1:-2])):
+                length = int(self.rfile.readline()[1:-2])
+                args.append(self.rfile.read(length + 2)[:-2])
+            self.wfile.write(_execute(args))
+
+
+class FakeRedisServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor compatible con Redis para pruebas locales")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6379)
+    args = parser.parse_args()
+
+    with FakeRedisServer((args.host, args.port), RESPHandler) as server:
+        print(f"Fake Redis escuchando en {args.host}:{args.port}")
+        server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
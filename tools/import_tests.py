@@ -0,0 +1,35 @@
+# tools/import_tests.py
+# Importación masiva de resultados de tests desde exportaciones CSV de dispositivos.
+#
+#   python tools/import_tests.py sprint_2025-05-10.csv --profile timing_gates
+#   python tools/import_tests.py saltos.csv --profile jump_mat --dry-run
+import sys, pathlib, argparse
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+
+from common.logging_config import setup_logging
+from controllers.db_controller import get_session_local
+from controllers.test_ingestion_controller import DEVICE_PROFILES, read_device_csv, ingest_test_results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Importar resultados de tests desde CSV")
+    parser.add_argument("files", nargs="+", help="Ficheros CSV exportados por el dispositivo")
+    parser.add_argument("--profile", choices=sorted(DEVICE_PROFILES), default="ballers",
+                        help="Perfil de columnas del dispositivo")
+    parser.add_argument("--dry-run", action="store_true", help="Validar sin insertar nada")
+    args = parser.parse_args()
+
+    setup_logging(fmt="text")
+    SessionLocal = get_session_local()
+    for path in args.files:
+        frame = read_device_csv(path, args.profile)
+        with SessionLocal() as db:
+            report = ingest_test_results(db, frame, dry_run=args.dry_run)
+        print(f"{path}: {report['rows']} filas, {report['new']} nuevas, {report['inserted']} insertadas, "
+              f"{report['duplicates']} duplicadas, {report['invalid']} sin fecha")
+        if report["unmatched"]:
+            print(f"  Jugadores no encontrados: {', '.join(report['unmatched'])}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,574 @@
+# tools/load_test.py
+# Prueba de carga: N usuarios simultáneos (admins, coaches y jugadores) contra
+# un único proceso de Streamlit. Cada usuario es un cliente headless que habla
+# el mismo protocolo que el navegador (websocket /_stcore/stream con BackMsg y
+# ForwardMsg): inicia sesión con el formulario, pulsa botones y cambia
+# selectores, y espera a que termine cada ejecución del script.
+#
+# Arranca su propio servidor sobre una copia de una BD de data/scale_db.py
+# (usuarios admin/admin, coachN/coachpass, playerN/playerpass), con Google
+# emulado por tools/fake_google.py, y mide en el servidor las escrituras y
+# commits de la BD (donde se notan las esperas por el bloqueo de SQLite).
+#
+#   python tools/load_test.py --admins 2 --coaches 10 --players 20 --duration 120
+#   python tools/load_test.py --preset medium --coaches 30 --think-time 2 --output carga.json
+import sys, os, pathlib, argparse
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import json
+import time
+import random
+import shutil
+import asyncio
+import socket
+import tempfile
+import threading
+import subprocess
+from collections import defaultdict
+
+SERVER_START_TIMEOUT = 60     # segundos
+RUN_TIMEOUT = 120             # segundos por acción
+LOCK_WAIT_MS = 100            # Escrituras/commits más lentos cuentan como espera de bloqueo
+STATS_INTERVAL = 1.0          # segundos entre volcados de las métricas del servidor
+
+
+# ─────────────────────────────────────────────────────────────
+# Cliente headless de Streamlit
+# ─────────────────────────────────────────────────────────────
+
+class ScriptError(Exception):
+    pass
+
+
+class StreamlitClient:
+    """
+    Una sesión de navegador: guarda los widgets de la última ejecución y sus
+    valores, y envía reruns como lo hace el frontend.
+    """
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip("/")
+        self._ws = None
+        self._reader = None
+        self._page_script_hash = ""
+        self._widgets = {}         # id -> (tipo, proto del elemento, fragment_id)
+        self._values = {}          # id -> WidgetState con el valor actual
+        self._cache = {}           # hash -> ForwardMsg (mensajes cacheables ya recibidos)
+        self._exceptions = []
+        self._finished = None
+
+    async def connect(self):
+        from tornado.websocket import websocket_connect
+        self._ws = await websocket_connect(f"ws{self.base_url[4:]}/_stcore/stream", subprotocols=["streamlit"],
+                                           max_message_size=256 * 1024 * 1024)
+        self._reader = asyncio.ensure_future(self._read_loop())
+        # La primera ejecución la pide el cliente, como al abrir la página
+        await self.rerun()
+
+    async def close(self):
+        if self._ws is not None:
+            self._ws.close()
+        if self._reader is not None:
+            self._reader.cancel()
+
+    # --- Recepción ---
+
+    async def _resolve(self, msg):
+        from tornado.httpclient import AsyncHTTPClient
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+        if msg.WhichOneof("type") != "ref_hash":
+            if msg.metadata.cacheable:
+                self._cache[msg.hash] = msg
+            return msg
+        cached = self._cache.get(msg.ref_hash)
+        if cached is None:
+            response = await AsyncHTTPClient().fetch(f"{self.base_url}/_stcore/message?hash={msg.ref_hash}")
+            cached = ForwardMsg()
+            cached.ParseFromString(response.body)
+            self._cache[msg.ref_hash] = cached
+        resolved = type(cached)()
+        resolved.CopyFrom(cached)
+        resolved.metadata.CopyFrom(msg.metadata)
+        return resolved
+
+    async def _read_loop(self):
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+        while True:
+            data = await self._ws.read_message()
+            if data is None:
+                if self._finished is not None and not self._finished.done():
+                    self._finished.set_exception(ConnectionError("Websocket cerrado por el servidor"))
+                return
+            msg = ForwardMsg()
+            msg.ParseFromString(data)
+            msg = await self._resolve(msg)
+            kind = msg.WhichOneof("type")
+
+            if kind == "new_session":
+                self._page_script_hash = msg.new_session.page_script_hash
+                if not msg.new_session.fragment_ids_this_run:
+                    # Ejecución completa: la página se vuelve a dibujar entera
+                    self._widgets.clear()
+                    self._exceptions.clear()
+            elif kind == "delta" and msg.delta.WhichOneof("type") == "new_element":
+                element = msg.delta.new_element
+                element_type = element.WhichOneof("type")
+                if element_type == "exception":
+                    self._exceptions.append(element.exception.message)
+                    continue
+                proto = getattr(element, element_type)
+                widget_id = getattr(proto, "id", "") if hasattr(proto, "id") else ""
+                if widget_id:
+                    self._widgets[widget_id] = (element_type, proto, msg.delta.fragment_id)
+            elif kind == "script_finished":
+                status = msg.script_finished
+                if status != ForwardMsg.FINISHED_EARLY_FOR_RERUN and self._finished and not self._finished.done():
+                    self._finished.set_result(status)
+
+    # --- Envío ---
+
+    def _client_state(self, trigger=None, fragment_id=""):
+        from streamlit.proto.ClientState_pb2 import ClientState
+
+        state = ClientState(page_script_hash=self._page_script_hash, fragment_id=fragment_id)
+        for widget_id, value in self._values.items():
+            if widget_id in self._widgets:
+                state.widget_states.widgets.append(value)
+        if trigger is not None:
+            state.widget_states.widgets.append(trigger)
+        return state
+
+    async def rerun(self, trigger=None, fragment_id=""):
+        """
+        Pide una ejecución y espera a que termine (incluidas las que lance
+        st.rerun). Lanza ScriptError si la página muestra una excepción.
+        """
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+
+        self._finished = asyncio.get_running_loop().create_future()
+        message = BackMsg()
+        message.rerun_script.CopyFrom(self._client_state(trigger, fragment_id))
+        await self._ws.write_message(message.SerializeToString(), binary=True)
+        await asyncio.wait_for(self._finished, RUN_TIMEOUT)
+        if self._exceptions:
+            raise ScriptError(self._exceptions[0][:200])
+
+    # --- Widgets ---
+
+    def find(self, element_type, label):
+        for widget_id, (kind, proto, fragment_id) in self._widgets.items():
+            if kind == element_type and proto.label == label:
+                return widget_id, proto, fragment_id
+        return None
+
+    def has(self, element_type, label):
+        return self.find(element_type, label) is not None
+
+    def _require(self, element_type, label):
+        found = self.find(element_type, label)
+        if found is None:
+            raise ScriptError(f"No se encuentra {element_type} '{label}'")
+        return found
+
+    def set_text(self, label, value):
+        # Los campos de un formulario se envían al pulsar su botón de envío
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+        widget_id, _, _ = self._require("text_input", label)
+        self._values[widget_id] = WidgetState(id=widget_id, string_value=value)
+
+    def options(self, label):
+        return list(self._require("selectbox", label)[1].options)
+
+    async def select(self, label, index):
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+        widget_id, _, fragment_id = self._require("selectbox", label)
+        self._values[widget_id] = WidgetState(id=widget_id, int_value=index)
+        await self.rerun(fragment_id=fragment_id)
+
+    async def click(self, label):
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+        widget_id, _, fragment_id = self._require("button", label)
+        await self.rerun(trigger=WidgetState(id=widget_id, trigger_value=True), fragment_id=fragment_id)
+
+
+# ─────────────────────────────────────────────────────────────
+# Guiones por rol
+# ─────────────────────────────────────────────────────────────
+
+async def login(client, username, password):
+    client.set_text("Usuario", username)
+    client.set_text("Contraseña", password)
+    await client.click("Iniciar sesión")
+    if not client.has("button", "🔓 Cerrar sesión"):
+        raise ScriptError(f"No se pudo iniciar sesión como {username}")
+
+
+async def admin_actions(client, rng, scheduled):
+    """
+    Admin: abre la gestión de sesiones y filtra la tabla; de vez en cuando
+    vuelve al informe financiero.
+    """
+    tabs = client.options("Selecciona una opción:")
+    if not client.has("selectbox", "Filtrar por estado de sincronización:"):
+        yield "admin.sessions_tab", client.select("Selecciona una opción:", tabs.index("Ver sesiones/CRUD sesiones"))
+        return
+    if rng.random() < 0.1:
+        yield "admin.finance_tab", client.select("Selecciona una opción:", tabs.index("Informe Financiero"))
+        return
+    label = rng.choice(["Filtrar por estado de sincronización:", "Filtrar por estado de sesión:"])
+    yield "admin.filter_sessions", client.select(label, rng.randrange(len(client.options(label))))
+
+
+def _session_id(label):
+    # Etiquetas del selector de sesiones: "#id · fecha hora · jugador"
+    return int(label[1:].split(" ", 1)[0])
+
+
+async def coach_actions(client, rng, scheduled):
+    """
+    Coach: elige una de sus sesiones programadas y la marca como completada.
+    `scheduled` son los ids aún programados, compartidos por todos los
+    usuarios: completar una sesión ya completada no escribe nada en la BD.
+    """
+    label = "Selecciona una sesión:"
+    if not client.has("selectbox", label):
+        yield "coach.reload", client.rerun()
+        return
+    options = client.options(label)
+    pending = [i for i, option in enumerate(options) if _session_id(option) in scheduled]
+    if not pending:
+        yield "coach.reload", client.rerun()
+        return
+    index = rng.choice(pending)
+    # Se retira antes de pulsar para que otro usuario con el mismo coach no la repita
+    scheduled.discard(_session_id(options[index]))
+    yield "coach.select_session", client.select(label, index)
+    yield "coach.complete_session", client.click("✅ Completar")
+
+
+async def player_actions(client, rng, scheduled):
+    """
+    Jugador: vuelve a abrir su perfil y cambia la métrica del gráfico.
+    """
+    if rng.random() < 0.5 and client.has("selectbox", "Métrica"):
+        yield "player.change_metric", client.select("Métrica", rng.randrange(len(client.options("Métrica"))))
+    else:
+        yield "player.open_profile", client.click("👤 Mi Perfil")
+
+
+ROLE_ACTIONS = {"admin": admin_actions, "coach": coach_actions, "player": player_actions}
+
+
+class Recorder:
+    def __init__(self):
+        self.samples = []     # (acción, inicio, ms, ok, error)
+
+    async def timed(self, action, awaitable):
+        start = time.perf_counter()
+        try:
+            await awaitable
+        except Exception as e:
+            self.samples.append((action, start, (time.perf_counter() - start) * 1000, False,
+                                 f"{type(e).__name__}: {e}"))
+            return False
+        self.samples.append((action, start, (time.perf_counter() - start) * 1000, True, None))
+        return True
+
+
+async def virtual_user(base_url, role, username, password, deadline, think_time, rng, recorder, scheduled):
+    client = StreamlitClient(base_url)
+    try:
+        if not await recorder.timed(f"{role}.open", client.connect()):
+            return
+        if not await recorder.timed(f"{role}.login", login(client, username, password)):
+            return
+        while time.perf_counter() < deadline:
+            async for action, awaitable in ROLE_ACTIONS[role](client, rng, scheduled):
+                if not await recorder.timed(action, awaitable):
+                    # Tras un error se recarga la página, como haría el usuario
+                    await recorder.timed(f"{role}.reload", client.rerun())
+                    break
+            await asyncio.sleep(think_time * rng.uniform(0.5, 1.5))
+    finally:
+        await client.close()
+
+
+# ─────────────────────────────────────────────────────────────
+# Servidor instrumentado (proceso hijo)
+# ─────────────────────────────────────────────────────────────
+
+def _instrument_database(stats_path):
+    """
+    Mide en todas las engines y sesiones del proceso la duración de las
+    sentencias de escritura y de los commits, y cuenta los "database is
+    locked". Vuelca las métricas a `stats_path` cada segundo.
+    """
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+    from sqlalchemy.orm import Session
+
+    lock = threading.Lock()
+    stats = {"write_ms": [], "commit_ms": [], "locked_errors": 0, "statements": 0}
+
+    @event.listens_for(Engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("load_test_start", []).append(time.perf_counter())
+
+    @event.listens_for(Engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = (time.perf_counter() - conn.info["load_test_start"].pop()) * 1000
+        with lock:
+            stats["statements"] += 1
+            if statement.lstrip()[:6].upper() in ("INSERT", "UPDATE", "DELETE"):
+                stats["write_ms"].append(elapsed)
+
+    @event.listens_for(Engine, "handle_error")
+    def _error(context):
+        if context.connection is not None:
+            context.connection.info.get("load_test_start", [None]).pop()
+        if "database is locked" in str(context.original_exception):
+            with lock:
+                stats["locked_errors"] += 1
+
+    @event.listens_for(Session, "before_commit")
+    def _before_commit(session):
+        session.info["load_test_commit"] = time.perf_counter()
+
+    @event.listens_for(Session, "after_commit")
+    def _after_commit(session):
+        start = session.info.pop("load_test_commit", None)
+        if start is not None:
+            with lock:
+                stats["commit_ms"].append((time.perf_counter() - start) * 1000)
+
+    def _dump():
+        while True:
+            time.sleep(STATS_INTERVAL)
+            with lock:
+                data = json.dumps(stats)
+            pathlib.Path(stats_path).write_text(data)
+
+    threading.Thread(target=_dump, name="load-test-stats", daemon=True).start()
+
+
+def serve_worker(port, stats_path):
+    from streamlit.web import cli as stcli
+    from tools.fake_google import FakeGoogle, write_service_account
+
+    fake = FakeGoogle().start()
+    credentials = pathlib.Path(stats_path).with_suffix(".credentials.json")
+    write_service_account(credentials, fake.endpoint)
+    os.environ.update({
+        "GOOGLE_API_ENDPOINT": fake.endpoint,
+        "GOOGLE_SERVICE_ACCOUNT_JSON": str(credentials),
+        "GOOGLE_SERVICE_ACCOUNT_FILE": str(credentials),
+        "GOOGLE_SHEET_ID": "local",
+        "GOOGLE_CALENDAR_ID": "primary",
+        "CACHE_BACKEND": "memory",
+        "TRACE_ENABLED": "false",
+        "LOG_LEVEL": "WARNING",
+        "HEALTH_PORT": "0",
+        "HEALTH_PROBE_INTERVAL": "3600",
+    })
+    os.chdir(ROOT)
+    _instrument_database(stats_path)
+
+    from common.logging_config import setup_logging
+    from common.warmup import start_warmup
+    setup_logging()
+    start_warmup()
+    sys.argv = ["streamlit", "run", str(ROOT / "main.py"), "--server.port", str(port), "--server.headless", "true",
+                "--browser.gatherUsageStats", "false"]
+    sys.exit(stcli.main())
+
+
+# ─────────────────────────────────────────────────────────────
+# Informe
+# ─────────────────────────────────────────────────────────────
+
+def _percentiles(values):
+    if not values:
+        return {"count": 0}
+    values = sorted(values)
+    pick = lambda p: values[min(len(values) - 1, max(0, -(-p * len(values) // 100) - 1))]
+    return {"count": len(values), "p50_ms": pick(50), "p95_ms": pick(95), "p99_ms": pick(99), "max_ms": values[-1]}
+
+
+def build_report(samples, elapsed, server_stats, config):
+    actions = defaultdict(list)
+    errors = defaultdict(list)
+    for action, _, ms, ok, error in samples:
+        if ok:
+            actions[action].append(ms)
+        else:
+            errors[action].append(error)
+
+    report = {"config": config, "elapsed_s": elapsed,
+              "throughput_per_s": sum(ok for *_, ok, _ in samples) / elapsed if elapsed else None,
+              "actions": {}, "database": None}
+    for action in sorted(set(actions) | set(errors)):
+        report["actions"][action] = {**_percentiles(actions[action]), "errors": len(errors[action]),
+                                     "per_s": len(actions[action]) / elapsed if elapsed else None,
+                                     "sample_errors": sorted(set(errors[action]))[:3]}
+    if server_stats:
+        waits = [ms for ms in server_stats["write_ms"] + server_stats["commit_ms"] if ms >= LOCK_WAIT_MS]
+        report["database"] = {
+            "statements": server_stats["statements"],
+            "writes": _percentiles(server_stats["write_ms"]),
+            "commits": _percentiles(server_stats["commit_ms"]),
+            "lock_waits": {"count": len(waits), "total_ms": sum(waits), "threshold_ms": LOCK_WAIT_MS},
+            "locked_errors": server_stats["locked_errors"],
+        }
+    return report
+
+
+def print_report(report):
+    print(f"\n{report['elapsed_s']:.0f}s, {report['throughput_per_s']:.2f} acciones/s")
+    print(f"{'Acción':<26}{'n':>6}{'err':>5}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}  (ms)")
+    for action, row in report["actions"].items():
+        if row["count"]:
+            print(f"{action:<26}{row['count']:>6}{row['errors']:>5}{row['p50_ms']:>9.0f}{row['p95_ms']:>9.0f}"
+                  f"{row['p99_ms']:>9.0f}{row['max_ms']:>9.0f}")
+        else:
+            print(f"{action:<26}{0:>6}{row['errors']:>5}")
+        for error in row["sample_errors"]:
+            print(f"    {error}")
+    database = report["database"]
+    if database:
+        print(f"\nBD: {database['statements']} sentencias, {database['locked_errors']} 'database is locked'")
+        for name in ("writes", "commits"):
+            row = database[name]
+            if row["count"]:
+                print(f"  {name:<8} n={row['count']} p50={row['p50_ms']:.1f} p95={row['p95_ms']:.1f} "
+                      f"p99={row['p99_ms']:.1f} max={row['max_ms']:.1f} ms")
+        waits = database["lock_waits"]
+        print(f"  esperas >= {waits['threshold_ms']} ms: {waits['count']} ({waits['total_ms'] / 1000:.1f}s en total)")
+
+
+# ─────────────────────────────────────────────────────────────
+# Orquestación
+# ─────────────────────────────────────────────────────────────
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_healthy(base_url, process):
+    import urllib.request
+    deadline = time.time() + SERVER_START_TIMEOUT
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise SystemExit("El servidor de Streamlit ha terminado al arrancar")
+        try:
+            with urllib.request.urlopen(f"{base_url}/_stcore/health", timeout=1) as response:
+                if response.status == 200:
+                    return
+        except OSError:
+            time.sleep(0.3)
+    raise SystemExit("El servidor de Streamlit no ha respondido a tiempo")
+
+
+def _users(args, n_coaches, n_players):
+    rng = random.Random(args.seed)
+    users = [("admin", "admin", "admin")] * args.admins
+    users += [("coach", f"coach{rng.randint(1, n_coaches)}", "coachpass") for _ in range(args.coaches)]
+    users += [("player", f"player{rng.randint(1, n_players)}", "playerpass") for _ in range(args.players)]
+    return users
+
+
+def _scheduled_sessions(database):
+    """
+    Ids de las sesiones programadas de la BD de la prueba.
+    """
+    from sqlalchemy import create_engine, select
+    from models.session_model import Session, SessionStatus
+
+    engine = create_engine(f"sqlite:///{database}")
+    try:
+        with engine.connect() as conn:
+            return set(conn.execute(select(Session.id).where(Session.status == SessionStatus.SCHEDULED)).scalars())
+    finally:
+        engine.dispose()
+
+
+async def run_users(base_url, users, duration, ramp_up, think_time, seed, scheduled):
+    recorder = Recorder()
+    start = time.perf_counter()
+    deadline = start + duration
+
+    async def launch(index, user):
+        await asyncio.sleep(ramp_up * index / max(1, len(users)))
+        await virtual_user(base_url, *user, deadline, think_time, random.Random(seed + index), recorder,
+                           scheduled)
+
+    await asyncio.gather(*(launch(i, user) for i, user in enumerate(users)))
+    return recorder.samples, time.perf_counter() - start
+
+
+def main():
+    from data.scale_db import PRESETS, generate
+
+    parser = argparse.ArgumentParser(description="Prueba de carga con usuarios simultáneos")
+    parser.add_argument("--admins", type=int, default=2)
+    parser.add_argument("--coaches", type=int, default=5)
+    parser.add_argument("--players", type=int, default=10)
+    parser.add_argument("--duration", type=float, default=60, help="Segundos de carga")
+    parser.add_argument("--ramp-up", type=float, default=10, help="Segundos hasta que todos los usuarios entran")
+    parser.add_argument("--think-time", type=float, default=1.0, help="Pausa media entre acciones (s)")
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="small", help="Tamaño de la BD de prueba")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Guardar el informe en JSON")
+    parser.add_argument("--serve-worker", nargs=2, metavar=("PORT", "STATS"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve_worker:
+        serve_worker(*args.serve_worker)
+        return
+
+    n_coaches, n_players, _, _ = PRESETS[args.preset]
+    source = ROOT / "data" / f"load_{args.preset}_s{args.seed}.db"
+    if not source.exists():
+        print(f"Generando BD {args.preset} en {source}...")
+        generate(f"sqlite:///{source}", *PRESETS[args.preset], seed=args.seed, verbose=False)
+
+    users = _users(args, n_coaches, n_players)
+    with tempfile.TemporaryDirectory() as tmp:
+        database = pathlib.Path(tmp) / source.name
+        shutil.copyfile(source, database)
+        stats_path = pathlib.Path(tmp) / "db_stats.json"
+        port = _free_port()
+        base_url = f"http://127.0.0.1:{port}"
+        env = {**os.environ, "DATABASE_URL": f"sqlite:///{database}"}
+        with open(pathlib.Path(tmp) / "server.log", "w") as log:
+            server = subprocess.Popen([sys.executable, __file__, "--serve-worker", str(port), str(stats_path)],
+                                      cwd=ROOT, env=env, stdout=log, stderr=subprocess.STDOUT)
+            try:
+                _wait_healthy(base_url, server)
+                print(f"{len(users)} usuarios ({args.admins} admins, {args.coaches} coaches, {args.players} "
+                      f"jugadores) durante {args.duration:.0f}s contra {base_url}")
+                samples, elapsed = asyncio.run(run_users(base_url, users, args.duration, args.ramp_up,
+                                                         args.think_time, args.seed, _scheduled_sessions(database)))
+                time.sleep(STATS_INTERVAL * 1.5)   # Último volcado de métricas
+            finally:
+                server.terminate()
+                try:
+                    server.wait(10)
+                except subprocess.TimeoutExpired:
+                    server.kill()
+        server_stats = json.loads(stats_path.read_text()) if stats_path.exists() else None
+
+    config = {k: v for k, v in vars(args).items() if k not in ("serve_worker", "output")}
+    report = build_report(samples, elapsed, server_stats, config)
+    print_report(report)
+    if args.output:
+        pathlib.Path(args.output).write_text(json.dumps(report, indent=2))
+        print(f"\nInforme guardado en {args.output}")
+
+
+if __name__ == "__main__":
+    main()
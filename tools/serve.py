@@ -0,0 +1,30 @@
+# tools/serve.py
+# Arranca Streamlit en este mismo proceso después de lanzar el calentamiento,
+# para que engine, caché y módulos estén listos antes de la primera sesión
+# (main.py solo se ejecuta cuando se conecta el primer navegador). También abre
+# ya el endpoint de salud (/healthz, /readyz): obligatorio detrás de un balanceador.
+#
+#   python tools/serve.py [opciones de "streamlit run"]
+import sys, os, pathlib
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+os.chdir(ROOT)   # main.py usa rutas relativas (assets/, styles/)
+
+from streamlit.web import cli as stcli
+from common.logging_config import setup_logging
+from common.tracing import setup_tracing
+from common.warmup import start_warmup
+from common.health import start_health_monitor
+
+
+def main():
+    setup_logging()
+    setup_tracing()
+    start_warmup()
+    start_health_monitor()
+    sys.argv = ["streamlit", "run", str(ROOT / "main.py"), *sys.argv[1:]]
+    sys.exit(stcli.main())
+
+
+if __name__ == "__main__":
+    main()